@@ -0,0 +1,473 @@
+# api_server.py
+# Streamlit 없이 services 계층을 JSON 으로 내주는 HTTP API (표준 라이브러리 asyncio 만 사용).
+#   python api_server.py --port 8080
+#   curl -XPOST localhost:8080/auth/login -d '{"username":"a","password":"b"}'   → {"token": ...}
+#   curl -H "Authorization: Bearer <token>" localhost:8080/feed?scope=following
+# - 이벤트 루프는 소켓만 다루고, 파일 I/O 가 있는 services 호출은 크기가 정해진 스레드 풀에서 실행
+# - 같은 GET 이 동시에 여러 개 오면 한 번만 실행하고 결과(직렬화한 바이트)를 나눠 준다
+# - 로그인은 토큰 세션(메모리, 유휴 만료). st.session_state 의 auth_user_id 를 대신한다
+# - HTTP/1.1 keep-alive, 요청 본문은 JSON(최대 1MB)
+import argparse
+import asyncio
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from repo.csv_repo import ConflictError, ReadOnlyError
+from repo.replication import replication_status
+from services.auth import try_login, try_signup
+from services.posts import create_post, get_post, soft_delete_post, restore_post
+from services.feed_query import FeedQuery, feed
+from services.comments import create_comment, list_comments, delete_comment, count_comments
+from services.reactions import toggle_like, count_likes, user_liked
+from services.follows import follow, unfollow, get_following, get_followers
+from services.tags import list_posts_by_hashtag
+from services.profile import get_profile, update_profile
+from services.notifications import unread_count, list_notifications, mark_all_read
+
+WORKERS = 8              # services 호출을 돌리는 스레드 수
+MAX_PENDING = 256        # 풀에 넣고 기다리는 호출 상한(넘으면 빈자리가 날 때까지 대기)
+MAX_BODY = 1 << 20
+SESSION_IDLE_SEC = 7 * 24 * 3600
+FEED_MAX = 500
+
+_STATUS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+_log = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------
+# 토큰 세션
+# ----------------------------
+class SessionStore:
+    """토큰 → (user_id, 마지막 사용 시각). 유휴 시간이 지나면 만료"""
+
+    def __init__(self, idle_sec: int = SESSION_IDLE_SEC):
+        self.idle_sec = idle_sec
+        self._sessions: Dict[str, List] = {}
+        self._guard = threading.Lock()
+
+    def create(self, user_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        with self._guard:
+            self._sessions[token] = [user_id, time.time()]
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        now = time.time()
+        with self._guard:
+            s = self._sessions.get(token)
+            if s is None:
+                return None
+            if now - s[1] > self.idle_sec:
+                del self._sessions[token]
+                return None
+            s[1] = now
+            return s[0]
+
+    def revoke(self, token: str) -> None:
+        with self._guard:
+            self._sessions.pop(token, None)
+
+
+# ----------------------------
+# 요청 / 라우팅
+# ----------------------------
+class Request:
+    __slots__ = ("method", "path", "params", "query", "body", "user_id", "token")
+
+    def __init__(self, method: str, path: str, query: Dict[str, str], body: Any, token: str):
+        self.method, self.path, self.query, self.body, self.token = method, path, query, body, token
+        self.params: Dict[str, str] = {}
+        self.user_id: Optional[str] = None
+
+    def field(self, name: str, required: bool = True) -> Any:
+        value = self.body.get(name) if isinstance(self.body, dict) else None
+        if required and (value is None or value == ""):
+            raise ApiError(400, f"'{name}' is required")
+        return value
+
+    def int_arg(self, name: str, default: int, hi: int) -> int:
+        try:
+            return max(1, min(int(self.query.get(name, default)), hi))
+        except ValueError:
+            raise ApiError(400, f"'{name}' must be an integer")
+
+
+# (메서드, 경로 패턴, 처리 함수, 로그인 필요, 동시 요청 합치기)
+# coalesce: "shared" 는 누가 보든 같은 응답, "viewer" 는 보는 사람별로 합친다
+_routes: List[Tuple[str, "re.Pattern", Callable[[Request], Any], bool, Optional[str]]] = []
+
+
+def route(method: str, pattern: str, auth: bool = True, coalesce: Optional[str] = None):
+    regex = re.compile("^" + re.sub(r"{(\w+)}", r"(?P<\1>[^/]+)", pattern) + "$")
+
+    def deco(fn):
+        _routes.append((method, regex, fn, auth, coalesce))
+        return fn
+    return deco
+
+
+def _public_user(row: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if row is None:
+        return None
+    return {k: v for k, v in row.items() if k != "password_hash"}
+
+
+def _post_or_404(post_id: str) -> Dict[str, str]:
+    post = get_post(post_id)
+    if post is None or post.get("is_deleted") == "1":
+        raise ApiError(404, "post not found")
+    return post
+
+
+# ---- auth ----
+@route("POST", "/auth/signup", auth=False)
+def _signup(req: Request):
+    uid = try_signup(req.field("username"), req.field("password"), req.field("display_name", False))
+    return 201, {"user_id": uid}
+
+
+@route("POST", "/auth/login", auth=False)
+def _login(req: Request):
+    uid = try_login(req.field("username"), req.field("password"))
+    if uid is None:
+        raise ApiError(401, "invalid username or password")
+    return {"user_id": uid, "token": SESSIONS.create(uid)}
+
+
+@route("POST", "/auth/logout")
+def _logout(req: Request):
+    SESSIONS.revoke(req.token)
+    return {"ok": True}
+
+
+# ---- profile ----
+@route("GET", "/me")
+def _me(req: Request):
+    return _public_user(get_profile(req.user_id))
+
+
+@route("PATCH", "/me")
+def _update_me(req: Request):
+    update_profile(req.user_id, display_name=req.field("display_name", False), bio=req.field("bio", False))
+    return _public_user(get_profile(req.user_id))
+
+
+@route("GET", "/users/{user_id}", coalesce="shared")
+def _user(req: Request):
+    prof = _public_user(get_profile(req.params["user_id"]))
+    if prof is None:
+        raise ApiError(404, "user not found")
+    return prof
+
+
+@route("GET", "/users/{user_id}/followers", coalesce="shared")
+def _followers(req: Request):
+    return sorted(get_followers(req.params["user_id"]))
+
+
+@route("GET", "/users/{user_id}/following", coalesce="shared")
+def _following(req: Request):
+    return sorted(get_following(req.params["user_id"]))
+
+
+@route("POST", "/users/{user_id}/follow")
+def _follow(req: Request):
+    return {"following": True, "changed": follow(req.user_id, req.params["user_id"])}
+
+
+@route("DELETE", "/users/{user_id}/follow")
+def _unfollow(req: Request):
+    return {"following": False, "changed": unfollow(req.user_id, req.params["user_id"])}
+
+
+# ---- posts / feed ----
+@route("GET", "/feed", coalesce="viewer")
+def _feed(req: Request):
+    """?scope=all|following &tag= &q= &sort=recent|likes|comments|hot &window=24h|7d|30d|all &limit="""
+    sort = req.query.get("sort") or "recent"
+    q = FeedQuery(
+        tag=req.query.get("tag") or "",
+        authors=get_following(req.user_id) if req.query.get("scope") == "following" else None,
+        search=req.query.get("q") or "",
+        sort=sort,
+        window=req.query.get("window", "all"),
+        # 최신순/인기순은 한 페이지만 채우면 되고, 다른 정렬은 최신 FEED_MAX 개 안에서 순위를 매긴다
+        limit=req.int_arg("limit", 50, FEED_MAX) if sort in ("recent", "hot") else FEED_MAX,
+    )
+    return feed(q)[:req.int_arg("limit", 50, FEED_MAX)]
+
+
+@route("POST", "/posts")
+def _create_post(req: Request):
+    pid = create_post(req.user_id, req.field("content", False) or "", req.field("original_post_id", False))
+    return 201, get_post(pid)
+
+
+@route("GET", "/posts/{post_id}", coalesce="shared")
+def _post(req: Request):
+    post = dict(_post_or_404(req.params["post_id"]))
+    post["likes"] = count_likes(post["post_id"])
+    post["comments"] = count_comments(post["post_id"])
+    return post
+
+
+@route("DELETE", "/posts/{post_id}")
+def _delete_post(req: Request):
+    soft_delete_post(req.params["post_id"], req.user_id)
+    return {"ok": True}
+
+
+@route("POST", "/posts/{post_id}/restore")
+def _restore_post(req: Request):
+    restore_post(req.params["post_id"], req.user_id)
+    return {"ok": True}
+
+
+@route("POST", "/posts/{post_id}/like")
+def _like(req: Request):
+    post_id = _post_or_404(req.params["post_id"])["post_id"]
+    liked, likes = toggle_like(post_id, req.user_id)
+    return {"liked": liked, "likes": likes}
+
+
+@route("GET", "/posts/{post_id}/liked")
+def _liked(req: Request):
+    return {"liked": user_liked(req.params["post_id"], req.user_id)}
+
+
+# ---- comments / tags ----
+@route("GET", "/posts/{post_id}/comments", coalesce="shared")
+def _comments(req: Request):
+    return list_comments(req.params["post_id"])
+
+
+@route("POST", "/posts/{post_id}/comments")
+def _create_comment(req: Request):
+    post_id = _post_or_404(req.params["post_id"])["post_id"]
+    cid = create_comment(post_id, req.user_id, req.field("content"), req.field("parent_comment_id", False))
+    return 201, {"comment_id": cid}
+
+
+@route("DELETE", "/comments/{comment_id}")
+def _delete_comment(req: Request):
+    delete_comment(req.params["comment_id"], req.user_id)
+    return {"ok": True}
+
+
+@route("GET", "/tags/{tag}", coalesce="shared")
+def _tag(req: Request):
+    return list_posts_by_hashtag(req.params["tag"].lstrip("#").lower())
+
+
+# ---- notifications ----
+@route("GET", "/notifications")
+def _notifications(req: Request):
+    items, cursor = list_notifications(req.user_id, req.int_arg("limit", 20, 100), req.query.get("cursor"))
+    return {"items": items, "cursor": cursor}
+
+
+@route("GET", "/notifications/unread")
+def _unread(req: Request):
+    return {"unread": unread_count(req.user_id)}
+
+
+@route("POST", "/notifications/read")
+def _read_all(req: Request):
+    mark_all_read(req.user_id)
+    return {"unread": 0}
+
+
+# ---- replication ----
+@route("GET", "/status/replication", auth=False)
+def _replication(req: Request):
+    return replication_status()
+
+
+# ----------------------------
+# 서버
+# ----------------------------
+SESSIONS = SessionStore()
+
+
+class ApiServer:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.max_pending = max_pending
+        self.inflight: Dict[tuple, "asyncio.Future"] = {}
+        self.stats = {"requests": 0, "coalesced": 0}
+
+    async def _run(self, fn: Callable, req: Request) -> Tuple[int, bytes]:
+        """스레드 풀에서 처리 함수를 돌리고 (상태, JSON 바이트) 로"""
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, _invoke, fn, req)
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+        parts = urlsplit(target)
+        path = unquote(parts.path).rstrip("/") or "/"
+        query = dict(parse_qsl(parts.query))
+        auth = headers.get("authorization", "")
+        token = auth[7:].strip() if auth.lower().startswith("bearer ") else ""
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return _error(400, "body must be JSON")
+        req = Request(method, path, query, payload, token)
+
+        allowed = False
+        for m, regex, fn, needs_auth, coalesce in _routes:
+            match = regex.match(path)
+            if not match:
+                continue
+            allowed = True
+            if m != method:
+                continue
+            req.params = match.groupdict()
+            if needs_auth:
+                req.user_id = SESSIONS.resolve(token) if token else None
+                if req.user_id is None:
+                    return _error(401, "login required")
+            if not coalesce:
+                return await self._run(fn, req)
+            # 같은 읽기(경로 + 쿼리 + 보는 사람)가 실행 중이면 그 결과를 기다린다
+            key = (path, tuple(sorted(query.items())), req.user_id if coalesce == "viewer" else None)
+            fut = self.inflight.get(key)
+            if fut is not None:
+                self.stats["coalesced"] += 1
+                return await asyncio.shield(fut)
+            fut = self.inflight[key] = asyncio.get_running_loop().create_future()
+            try:
+                result = await self._run(fn, req)
+                fut.set_result(result)
+                return result
+            except BaseException as e:
+                fut.set_exception(e)
+                fut.exception()  # 기다리는 쪽이 없어도 경고가 나지 않게
+                raise
+            finally:
+                del self.inflight[key]
+        return _error(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, body = _error(413, "body too large")
+                    keep = False
+                else:
+                    data = await reader.readexactly(length) if length else b""
+                    self.stats["requests"] += 1
+                    status, body = await self.dispatch(method.upper(), target, headers, data)
+                    conn = headers.get("connection", "").lower()
+                    keep = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+                writer.write(
+                    f"HTTP/1.1 {status} {_STATUS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        self.slots = asyncio.Semaphore(self.max_pending)
+        server = await asyncio.start_server(self.handle, host, port, limit=64 * 1024)
+        addr = ", ".join(str(s.getsockname()) for s in server.sockets)
+        print(f"[api] listening on {addr} ({self.pool._max_workers} workers)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def _json(status: int, obj: Any) -> Tuple[int, bytes]:
+    return status, json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _error(status: int, message: str) -> Tuple[int, bytes]:
+    return _json(status, {"error": message})
+
+
+def _invoke(fn: Callable[[Request], Any], req: Request) -> Tuple[int, bytes]:
+    """풀 스레드에서 실행: services 예외를 HTTP 상태로 바꾸고 결과를 직렬화까지 해 둔다"""
+    try:
+        result = fn(req)
+        status, obj = result if isinstance(result, tuple) else (200, result)
+        return _json(status, obj)
+    except ApiError as e:
+        return _error(e.status, str(e))
+    except PermissionError as e:
+        return _error(403, str(e))
+    except ReadOnlyError as e:
+        # 읽기 전용 복제본: 쓰기는 primary 로 보내야 한다
+        return _error(503, str(e))
+    except ConflictError as e:
+        # 같은 테이블에 쓰기가 몰려 재시도 한도를 넘김 → 클라이언트가 다시 시도
+        return _error(409, str(e))
+    except (ValueError, KeyError) as e:
+        return _error(400, str(e))
+    except Exception:
+        _log.exception("%s %s failed", req.method, req.path)
+        return _error(500, "internal error")
+
+
+def _start_background_jobs() -> None:
+    # app.py 와 같은 프로세스당 작업: 스냅샷으로 예열, 아카이브·로그 보관·스냅샷 저장, 복제본이면 복제
+    from services.snapshot import load_snapshot, start_background_snapshots
+    from services.compaction import start_background_compaction
+    from services.log_archive import start_background_archiving
+    from repo.replication import start_background_replication
+    load_snapshot()
+    start_background_compaction()
+    start_background_archiving()
+    start_background_snapshots()
+    start_background_replication()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="services 계층 JSON API 서버")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=WORKERS, help="services 호출 스레드 수")
+    ap.add_argument("--no-background", action="store_true", help="스냅샷/보관 등 백그라운드 작업을 띄우지 않음")
+    args = ap.parse_args()
+    if not args.no_background:
+        _start_background_jobs()
+    try:
+        asyncio.run(ApiServer(workers=args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
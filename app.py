@@ -2,7 +2,6 @@ import os
 import re
 import html
 import streamlit as st
-import pandas as pd
 
 from services.auth import (
     try_signup, try_login,
@@ -14,17 +13,26 @@ from services.auth import get_username
 from datetime import datetime, timedelta
 
 from services.posts import (
-    create_post, list_feed, get_post,
+    create_post, list_user_posts, get_post,
     soft_delete_post, restore_post
 )
-from services.reactions import toggle_like, count_likes, user_liked
-from services.tags import list_posts_by_hashtag, add_hashtags
+from services.reactions import toggle_like, count_likes
 from services.comments import create_comment, list_comments, count_comments
-from services.follows import follow, unfollow, is_following, get_following
-from repo.csv_repo import read_csv
-
-from services.profile import get_profile, update_profile
-from services.follows import get_followers  # 새 함수
+from services.reposts import repost_count, collapse_reposts
+from services.feed_query import FeedQuery, feed
+from services.activity import query_events, EVENT_TYPES
+from services.follows import follow, unfollow
+from repo.csv_repo import select_where, is_replica
+
+from services.profile import get_profile
+# 무거운 의존성(pandas/numpy)이나 특정 화면에서만 쓰는 서비스는 처음 쓰는 곳에서 import 한다:
+# services.analytics · services.ranking · services.tag_index · services.recommend · update_profile
+from services.viewer import (
+    get_viewer, clear_viewer,
+    note_like, note_follow, note_post_created, note_profile_updated
+)
+from services.follows import get_followers, suggested_follows  # 새 함수
+from services.notifications import unread_count, list_notifications, mark_all_read, notification_text
 # ---- App Setup --------------------------------------------------------------
 st.set_page_config(page_title="My Social Feed", page_icon="🗞️", layout="centered")
 st.title("My Social Feed")
@@ -37,31 +45,27 @@ POSTS_PATH = os.path.join(DATA_DIR, "posts.csv")
 POST_TAGS_PATH = os.path.join(DATA_DIR, "post_hashtags.csv")
 ACTIVITY_PATH = os.path.join(DATA_DIR, "activity_log.csv")
 
-# ---- Helpers ----------------------------------------------------------------
-def _all_posts_map() -> dict:
-    rows = read_csv(POSTS_PATH) if os.path.exists(POSTS_PATH) else []
-    return {r["post_id"]: r for r in rows}
+# 프로세스당 한 번: 스냅샷으로 캐시/인덱스 예열, 아카이브·로그 보관·스냅샷 저장 작업 시작
+@st.cache_resource
+def _start_background_jobs():
+    from services.snapshot import load_snapshot, start_background_snapshots
+    from services.compaction import start_background_compaction
+    from services.log_archive import start_background_archiving
+    from repo.replication import start_background_replication
+    load_snapshot()
+    start_background_compaction()
+    start_background_archiving()
+    start_background_snapshots()
+    start_background_replication()  # 복제본일 때만 primary 를 따라감
+    return True
+
+_start_background_jobs()
+if is_replica():
+    st.info("이 노드는 읽기 전용 복제본입니다. 글쓰기·좋아요·팔로우는 primary 노드에서 해 주세요.")
 
+# ---- Helpers ----------------------------------------------------------------
 def _post_hashtags(post_id: str):
-    if not os.path.exists(POST_TAGS_PATH):
-        return []
-    return [row["hashtag"] for row in read_csv(POST_TAGS_PATH) if row["post_id"] == post_id]
-
-def _matches_query(post_row: dict, q: str, all_posts_map: dict) -> bool:
-    """
-    q(소문자)로 본문/작성자 매칭.
-    - 일반 글: 자신의 content/author_id 검사
-    - 리포스트: 원본이 있으면 원본 content/author_id로 검사
-    """
-    q = (q or "").strip().lower()
-    if not q:
-        return True
-    # 리포스트면 원본 row로 스왑
-    orig_id = post_row.get("original_post_id", "")
-    row = all_posts_map.get(orig_id, post_row) if orig_id else post_row
-    content = (row.get("content") or "").lower()
-    author  = (row.get("author_id") or "").lower()
-    return (q in content) or (q in author)
+    return select_where(POST_TAGS_PATH, "hashtag", {"post_id": post_id})
 
 def _highlight(text: str, q: str) -> str:
     """
@@ -87,69 +91,37 @@ def _highlight(text: str, q: str) -> str:
         esc = pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", esc)
     return esc
 
-def _created_at_dt(row: dict) -> datetime:
-    """ISO created_at → datetime (파싱 실패 시 1970-01-01 반환)"""
-    try:
-        return datetime.fromisoformat(row.get("created_at", ""))
-    except Exception:
-        return datetime(1970, 1, 1)
+# 사이드바 기간 → 인기순 랭킹 윈도우 / 기간 필터 일수
+HOT_WINDOWS = {"전체": "all", "24시간": "24h", "7일": "7d", "30일": "30d"}
+PERIOD_DAYS = {"24시간": 1, "7일": 7, "30일": 30}
+
+# 사이드바 정렬 → 피드 질의 정렬
+SORT_MODES = {"최신순": "recent", "좋아요순": "likes", "댓글순": "comments", "인기순(hot)": "hot"}
 
 def _load_posts(scope: str):
     """
     scope: 'all' | 'following'
-    - 해시태그 필터가 있으면 우선 적용
-    - following: 내가 팔로우한 사람들 + 나 자신만
-    - 마지막 단계에서 '검색' 키워드 필터 적용
-    - (추가) 기간 필터 + 정렬
+    해시태그 / 팔로잉 범위 / 검색어 / 기간 / 정렬을 FeedQuery 하나로 넘기면
+    services.feed_query 가 가장 선택적인 인덱스부터 읽고, 최신 500개를 채우면 멈춘 뒤 정렬한다.
+    인기순은 미리 정렬된 랭킹 상위부터 조건에 맞는 500개를 가져온다.
+    - following: 내가 팔로우한 사람들의 글만 (내 글 제외)
+    - 검색은 본문/작성자, 리포스트는 원본 기준
     """
-    # 1) 해시태그 필터 우선
-    if st.session_state.get("filter_tag"):
-        post_ids = set(list_posts_by_hashtag(st.session_state["filter_tag"]))
-        rows = list_feed(limit=500)
-        rows = [r for r in rows if r["post_id"] in post_ids]
-    else:
-        rows = list_feed(limit=500)
-
-    # 2) 팔로잉 범위 필터
-    if scope == "following":
-        following = get_following(CURRENT_USER) or set()
-        # 내 글은 제외하고, 내가 팔로우한 사람들의 글만
-        rows = [r for r in rows if r["author_id"] in following]
-
-    # 3) 키워드 검색 필터(본문/작성자, 리포스트는 원본 기준)
-    q = (st.session_state.get("search_q", "") or "").strip().lower()
-    if q:
-        all_map = _all_posts_map()
-        rows = [r for r in rows if _matches_query(r, q, all_map)]
-
-    # 4) 기간 필터
     period = st.session_state.get("sort_period", "전체")
-    now = datetime.now()
-    if period == "24시간":
-        cutoff = now - timedelta(days=1)
-        rows = [r for r in rows if _created_at_dt(r) >= cutoff]
-    elif period == "7일":
-        cutoff = now - timedelta(days=7)
-        rows = [r for r in rows if _created_at_dt(r) >= cutoff]
-    elif period == "30일":
-        cutoff = now - timedelta(days=30)
-        rows = [r for r in rows if _created_at_dt(r) >= cutoff]
-
-    # 5) 정렬
-    mode = st.session_state.get("sort_mode", "최신순")
-    if mode == "최신순":
-        rows.sort(key=lambda r: _created_at_dt(r), reverse=True)
-    elif mode == "좋아요순":
-        rows.sort(key=lambda r: (count_likes(r["post_id"]), _created_at_dt(r)), reverse=True)
-    elif mode == "댓글순":
-        rows.sort(key=lambda r: (count_comments(r["post_id"]), _created_at_dt(r)), reverse=True)
-
-    return rows
-
-def _activity_rows(limit=100):
-    rows = read_csv(ACTIVITY_PATH) if os.path.exists(ACTIVITY_PATH) else []
-    rows.sort(key=lambda r: r["created_at"], reverse=True)
-    return rows[:limit]
+    q = FeedQuery(
+        tag=st.session_state.get("filter_tag") or "",
+        authors=set(VIEWER.following) if scope == "following" else None,
+        search=st.session_state.get("search_q", "") or "",
+        since=FeedQuery.since_days(PERIOD_DAYS.get(period)),
+        sort=SORT_MODES.get(st.session_state.get("sort_mode", "최신순"), "recent"),
+        window=HOT_WINDOWS.get(period, "all"),
+        limit=500,
+    )
+    return feed(q)
+
+# 활동 로그 뷰어(query_events) 표시 컬럼/페이지 크기
+ACTIVITY_VIEW_COLUMNS = ["created_at", "event_type", "actor_id", "target_type", "target_id", "metadata"]
+ACTIVITY_PAGE_SIZE = 50
 
 
 MAX_TAGS = 5
@@ -179,6 +151,264 @@ def _normalize_tag(raw: str) -> str:
     return s
 
 
+# ---- Feed Fragments ----------------------------------------------------------
+# 좋아요/댓글 같은 상호작용은 해당 fragment 만 다시 실행한다(st.rerun(scope="fragment")).
+# 피드 구성이 바뀌는 동작(새 글/리포스트/삭제/태그 필터/페이지 이동)만 전체 rerun.
+
+def _open_profile(user_id: str):
+    st.session_state["nav_to"] = "내 프로필"
+    st.session_state["view_user_id"] = user_id
+    st.rerun()
+
+@st.fragment
+def _like_button(post_id: str, enabled: bool):
+    viewer = get_viewer(st.session_state, CURRENT_USER)  # fragment 단독 rerun 대비 재검증
+    liked_now = post_id in viewer.liked
+    like_label = f"{'❤️' if liked_now else '🤍'} 좋아요 ({count_likes(post_id)})"
+    if st.button(like_label, key=f"like-{post_id}", disabled=not enabled):
+        liked, _ = toggle_like(post_id, CURRENT_USER)
+        note_like(viewer, post_id, liked)
+        st.toast(("좋아요 해제", "좋아요 추가")[liked])
+        st.rerun(scope="fragment")
+
+def _comment_author(c: dict, key_prefix: str, avatar_width: int):
+    c_author = c["author_id"]
+    c_disp = get_display_name(c_author) or c_author
+    c_handle = get_username(c_author) or c_author
+    c_prof = get_profile(c_author) or {}
+    c_avatar = c_prof.get("avatar_path") or ""
+
+    c1, c2 = st.columns([0.10, 0.90])
+    with c1:
+        if c_avatar and os.path.exists(c_avatar):
+            st.image(c_avatar, width=avatar_width)
+    with c2:
+        if st.button(
+            f"{c_disp} · @{c_handle}",
+            key=f"{key_prefix}-{c['post_id']}-{c['comment_id']}",
+            use_container_width=False
+        ):
+            _open_profile(c_author)
+        st.caption(c["created_at"])
+    return c2
+
+@st.fragment
+def _comment_section(post_id: str, enabled: bool, active_query: str):
+    st.markdown("---")
+    cm_key = f"open_comments_{post_id}"
+    is_open = st.session_state.get(cm_key, False)
+
+    # 상단 토글 버튼 (개수 표시)
+    topc1, topc2 = st.columns([0.8, 0.2])
+    with topc1:
+        if st.button(
+            f"💬 댓글 {count_comments(post_id)}개 {'닫기' if is_open else '열기'}",
+            key=f"cm-toggle-{post_id}",
+            disabled=not enabled
+        ):
+            st.session_state[cm_key] = not is_open
+            st.rerun(scope="fragment")
+    with topc2:
+        pass
+
+    if not is_open:
+        return
+
+    comments = list_comments(post_id)
+    roots = [c for c in comments if not c["parent_comment_id"]]
+    replies_by_parent = {}
+    for c in comments:
+        pid = c["parent_comment_id"]
+        if pid:
+            replies_by_parent.setdefault(pid, []).append(c)
+
+    for c in roots:
+        # 루트 댓글
+        with st.container():
+            body_col = _comment_author(c, "open-prof-c", 32)
+            with body_col:
+                if active_query:
+                    st.markdown(_highlight(c["content"], active_query), unsafe_allow_html=True)
+                else:
+                    st.write(c["content"])
+
+        # 대댓글 목록
+        for rc in replies_by_parent.get(c["comment_id"], []):
+            body_col = _comment_author(rc, "open-prof-r", 28)
+            with body_col:
+                if active_query:
+                    st.markdown(_highlight(rc["content"], active_query), unsafe_allow_html=True)
+                else:
+                    st.write(rc["content"])
+
+        # 대댓글 입력
+        with st.expander("↳ 대댓글 달기", expanded=False):
+            form_key = f"rform-{post_id}-{c['comment_id']}"
+            with st.form(form_key, clear_on_submit=True):
+                col_in, col_btn = st.columns([0.80, 0.20])
+                with col_in:
+                    sub = st.text_input(
+                        label="대댓글 달기",
+                        key=f"rinput-{post_id}-{c['comment_id']}",
+                        placeholder="대댓글을 입력하세요",
+                        label_visibility="collapsed",
+                    )
+                with col_btn:
+                    sbm = st.form_submit_button("등록", disabled=not enabled, use_container_width=True)
+                if sbm:
+                    try:
+                        create_comment(
+                            post_id=post_id,
+                            author_id=CURRENT_USER,
+                            content=sub,
+                            parent_comment_id=c["comment_id"],
+                        )
+                        st.toast("대댓글 작성 완료!")
+                        st.rerun(scope="fragment")
+                    except Exception as e:
+                        st.error(f"오류: {e}")
+
+    # 루트 댓글 작성
+    with st.form(f"comment-{post_id}", clear_on_submit=True):
+        comment_text = st.text_input("댓글 달기", placeholder="댓글을 입력하세요")
+        c_submit = st.form_submit_button("등록", disabled=not enabled)
+        if c_submit:
+            try:
+                create_comment(post_id=post_id, author_id=CURRENT_USER, content=comment_text)
+                st.toast("댓글 작성 완료!")
+                st.rerun(scope="fragment")
+            except Exception as e:
+                st.error(f"오류: {e}")
+
+@st.fragment
+def _post_card(post_id: str, active_query: str, reposted_by: tuple = ()):
+    # fragment 단독 rerun 에서도 최신 상태를 쓰도록 자기 데이터는 직접 읽는다
+    p = get_post(post_id)
+    if p is None:
+        return
+    with st.container(border=True):
+        # 묶어 보기: 같은 원본의 리포스트들을 한 카드로
+        if reposted_by:
+            names = ", ".join(get_display_name(u) or u for u in reposted_by[:3])
+            more = f" 외 {len(reposted_by) - 3}명" if len(reposted_by) > 3 else ""
+            st.caption(f"🔁 {len(reposted_by)}명이 리포스트 · {names}{more}")
+        # 상단: 작성자/시간 + 프로필 보기
+        left, right = st.columns([0.70, 0.30])
+        with left:
+            author_id = p["author_id"]
+            author_disp = get_display_name(author_id) or author_id
+            author_handle = get_username(author_id) or author_id
+            _prof = get_profile(author_id) or {}
+            _avatar = _prof.get("avatar_path") or ""
+
+            header_cols = st.columns([0.12, 0.88])
+            with header_cols[0]:
+                if _avatar and os.path.exists(_avatar):
+                    st.image(_avatar, width=40)
+            with header_cols[1]:
+                st.caption(f"{p['created_at']}")
+                if st.button(
+                    f"{author_disp} · @{author_handle}",
+                    key=f"open-prof-{p['post_id']}",
+                    use_container_width=False
+                ):
+                    _open_profile(author_id)
+
+        with right:
+            if p["author_id"] != CURRENT_USER:
+                if st.button("프로필 보기", key=f"viewprof-{p['post_id']}"):
+                    _open_profile(p["author_id"])
+
+        is_repost = bool(p["original_post_id"])
+        interactions_enabled = True
+        tags_to_show = []
+
+        # 본문/원본 표시 및 정책 처리
+        if is_repost:
+            st.caption("🔁 리포스트")
+            orig = get_post(p["original_post_id"])
+            if (orig is None) or (orig.get("is_deleted") == "1"):
+                st.warning("삭제된 게시물")
+                if orig is not None:
+                    st.caption(f"원본 메타: 작성자 {orig.get('author_id','?')} · {orig.get('created_at','?')}")
+                else:
+                    st.caption("원본 메타: 알 수 없음")
+                interactions_enabled = False
+                tags_to_show = []
+            else:
+                st.caption(f"원본: {orig['author_id']} · {orig['created_at']}")
+                orig_content = orig.get("content") or "_(본문 없음)_"
+                if active_query:
+                    st.markdown(_highlight(orig_content, active_query), unsafe_allow_html=True)
+                else:
+                    st.write(orig_content)
+                tags_to_show = _post_hashtags(orig["post_id"])
+        else:
+            content_to_show = p["content"] if p["content"] else "_(본문 없음)_"
+            if active_query:
+                st.markdown(_highlight(content_to_show, active_query), unsafe_allow_html=True)
+            else:
+                st.write(content_to_show)
+            tags_to_show = _post_hashtags(p["post_id"])
+
+        # 해시태그 칩
+        if tags_to_show:
+            tag_cols = st.columns(min(4, len(tags_to_show)))
+            for i, t in enumerate(tags_to_show):
+                with tag_cols[i % len(tag_cols)]:
+                    if st.button(f"#{t}", key=f"tag-{p['post_id']}-{t}"):
+                        st.session_state["filter_tag"] = t
+                        st.rerun()
+
+        # 하단 버튼: 좋아요 / 리포스트 / 댓글
+        cols = st.columns(3)
+        with cols[0]:
+            _like_button(p["post_id"], interactions_enabled)
+
+        with cols[1]:
+            n_rt = repost_count(p["original_post_id"] or p["post_id"])
+            rt_label = f"🔁 리포스트 {n_rt}" if n_rt else "🔁 리포스트"
+            if st.button(rt_label, key=f"rt-{p['post_id']}", disabled=not interactions_enabled):
+                try:
+                    rt_id = create_post(author_id=CURRENT_USER, content="", original_post_id=p["post_id"])
+                    note_post_created(VIEWER, rt_id)
+                    st.success("리포스트 완료!")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"오류: {e}")
+
+        with cols[2]:
+            if st.button("💬 댓글", key=f"cm-btn-{p['post_id']}", disabled=not interactions_enabled):
+                k = f"open_comments_{p['post_id']}"
+                st.session_state[k] = not st.session_state.get(k, False)
+                st.rerun(scope="fragment")
+
+        # 삭제/복구 UI (내 글만)
+        is_my_post = (p["author_id"] == CURRENT_USER)
+        if is_my_post:
+            with st.expander("게시물 관리", expanded=False):
+                c1, c2 = st.columns(2)
+                with c1:
+                    if st.button("🗑️ 삭제", key=f"del-{p['post_id']}"):
+                        try:
+                            soft_delete_post(p["post_id"], CURRENT_USER)
+                            st.success("삭제 완료 (소프트 딜리트)")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"오류: {e}")
+                with c2:
+                    if st.button("↩️ 복구(실험용)", key=f"restore-{p['post_id']}"):
+                        try:
+                            restore_post(p["post_id"], CURRENT_USER)
+                            st.success("복구 완료")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"오류: {e}")
+
+    # ----- 댓글 섹션 --------------------------------------------------
+    _comment_section(p["post_id"], interactions_enabled, active_query)
+
+
 # ---- Auth Gate (로그인/회원가입) --------------------------------------------
 if CURRENT_USER is None:
     st.header("🔐 로그인 / 회원가입")
@@ -243,6 +473,9 @@ if CURRENT_USER is None:
 
     st.stop()
 
+# 로그인 사용자 기준 정보(팔로잉/좋아요/내 프로필/내 글)는 세션에 한 번 만들어 재사용
+VIEWER = get_viewer(st.session_state, CURRENT_USER)
+
 # ---- Main Menu (Feed / Profile) --------------------------------------------
 
 if "nav_to" in st.session_state:
@@ -253,19 +486,23 @@ if "main_menu" not in st.session_state:
     st.session_state["main_menu"] = "피드"
 
 # 라디오 생성 (유일한 라디오, key='main_menu')
-menu = st.sidebar.radio("메뉴", ["피드", "내 프로필"], horizontal=True, key="main_menu")
+_unread = unread_count(CURRENT_USER)
+menu = st.sidebar.radio(
+    "메뉴", ["피드", "내 프로필", "알림"], horizontal=True, key="main_menu",
+    format_func=lambda m: f"알림 ({_unread})" if m == "알림" and _unread else m,
+)
 if menu == "피드" and st.session_state.get("view_user_id"):
     st.session_state.pop("view_user_id", None)
 
 if menu == "피드":
     # ---- Tabs -------------------------------------------------------------------
-    tab_feed, tab_activity = st.tabs(["📰 피드", "🗂️ 활동 로그"])
+    tab_feed, tab_activity, tab_stats = st.tabs(["📰 피드", "🗂️ 활동 로그", "📊 분석"])
 
     with tab_feed:
         # ---- Sidebar: Account / Scope / Hashtag / Search ------------------------
         with st.sidebar:
-            _disp = get_display_name(CURRENT_USER)
-            _handle = get_username(CURRENT_USER)
+            _disp = VIEWER.display_name
+            _handle = VIEWER.username
             st.markdown(f"**계정:** {_disp} · @{_handle}")
 
             # (선택) 개발자 정보 보기 - 내부 ID를 원할 때만 토글로 노출
@@ -275,6 +512,7 @@ if menu == "피드":
 
             if st.button("로그아웃", key="logout-btn"):
                 set_current_user_id(st, None)
+                clear_viewer(st.session_state)
                 st.success("로그아웃 되었습니다.")
                 st.rerun()
 
@@ -289,6 +527,8 @@ if menu == "피드":
         )
         # 현재 선택을 세션에 반영
         st.session_state["scope"] = scope
+        st.sidebar.checkbox("리포스트 묶어 보기", key="collapse_reposts",
+                            help="같은 원본의 리포스트를 'N명이 리포스트' 카드 하나로 표시")
 
         st.sidebar.header("해시태그 필터")
         filter_tag = st.sidebar.text_input("해시태그(# 없이 입력)", value=st.session_state.get("filter_tag", ""))
@@ -319,8 +559,8 @@ if menu == "피드":
         st.sidebar.header("정렬/기간")
         sort_mode = st.sidebar.selectbox(
             "정렬",
-            options=["최신순", "좋아요순", "댓글순"],
-            index={"최신순": 0, "좋아요순": 1, "댓글순": 2}.get(st.session_state.get("sort_mode", "최신순"), 0),
+            options=["최신순", "좋아요순", "댓글순", "인기순(hot)"],
+            index={"최신순": 0, "좋아요순": 1, "댓글순": 2, "인기순(hot)": 3}.get(st.session_state.get("sort_mode", "최신순"), 0),
         )
         st.session_state["sort_mode"] = sort_mode
 
@@ -367,87 +607,23 @@ if menu == "피드":
 
 
         # ---- New Post Form (본문 왼쪽 / 해시태그 오른쪽) ------------------------
-        with st.form("new_post", clear_on_submit=False):
-            left, right = st.columns([0.70, 0.30])
+        # 태그 입력/추천은 폼 밖에 둔다: 폼 안 위젯은 제출할 때만 값이 반영되어 입력 중인 태그로 추천할 수 없다
+        left, right = st.columns([0.70, 0.30])
 
-            # 왼쪽: 본문
-            with left:
+        # 왼쪽: 본문 + 게시
+        with left:
+            with st.form("new_post", clear_on_submit=False):
                 content = st.text_area(
                     "무슨 생각을 하고 있나요?",
                     max_chars=280,
                     height=120,
                     placeholder="텍스트를 입력하세요. 예) 오늘도 코딩!"
                 )
-
-            # 오른쪽: 해시태그 (보조)
-            with right:
-                st.caption("해시태그 (선택) · 최대 5개")
-                # 위젯 생성 전에만 초기화 플래그 처리(예외 방지)
-                if st.session_state.get("clear_new_tag_input", False):
-                    st.session_state["new_tag_input"] = ""
-                    st.session_state["clear_new_tag_input"] = False
-
-                new_tag_raw = st.text_input(
-                    "태그 입력 (쉼표 구분)",
-                    value=st.session_state.get("new_tag_input", ""),
-                    placeholder="예) python, streamlit",
-                    key="new_tag_input",
-                )
-
-                def _normalize_tag(raw: str) -> str:
-                    s = (raw or "").strip()
-                    if not s:
-                        return ""
-                    if s.startswith("#"):
-                        s = s[1:]
-                    s = s.lower()
-                    s = re.sub(r"\s+", "-", s)
-                    s = re.sub(r"[^0-9a-zA-Zㄱ-ㅎ가-힣_-]", "", s)
-                    return s if 1 <= len(s) <= 30 else ""
-
-                def _add_tags_from_raw(raw: str):
-                    if not raw:
-                        return
-                    parts = [p.strip() for p in raw.split(",") if p.strip()]
-                    for p in parts:
-                        t = _normalize_tag(p)
-                        if not t:
-                            continue
-                        if t in st.session_state["draft_tags"]:
-                            st.toast(f"이미 추가된 태그: #{t}")
-                            continue
-                        if len(st.session_state["draft_tags"]) >= 5:
-                            st.toast("태그는 최대 5개까지 가능해요.")
-                            break
-                        st.session_state["draft_tags"].append(t)
-
-                c_add, c_clear = st.columns([0.5, 0.5])
-                with c_add:
-                    if st.form_submit_button("태그 추가", use_container_width=True):
-                        _add_tags_from_raw(new_tag_raw)
-                        st.session_state["clear_new_tag_input"] = True
-                        st.rerun()
-                with c_clear:
-                    if st.form_submit_button("태그 모두 지우기", use_container_width=True):
-                        st.session_state["draft_tags"] = []
-                        st.rerun()
-
-                # 작은 칩 렌더링(삭제 버튼은 아주 작게)
-                for t in st.session_state["draft_tags"]:
-                    chip_col, x_col = st.columns([0.8, 0.2])
-                    with chip_col:
-                        st.markdown(f'<span class="tag-chip">#{t}</span>', unsafe_allow_html=True)
-                    with x_col:
-                        # form 내부에서는 form_submit_button을 써야 함. key는 빼고, 라벨을 유니크하게!
-                        if st.form_submit_button(f"✕ #{t}", use_container_width=True):
-                            st.session_state["draft_tags"] = [x for x in st.session_state["draft_tags"] if x != t]
-                            st.rerun()
-
-            # 하단: 게시 버튼
-            submitted = st.form_submit_button("게시", use_container_width=True)
+                submitted = st.form_submit_button("게시", use_container_width=True)
             if submitted:
                 try:
                     post_id = create_post(author_id=CURRENT_USER, content=content)
+                    note_post_created(VIEWER, post_id)
 
                     # 선택적으로 태그 저장
                     tags = st.session_state.get("draft_tags", [])
@@ -464,10 +640,84 @@ if menu == "피드":
                     st.rerun()
                 except Exception as e:
                     st.error(f"오류: {e}")
+
+        # 오른쪽: 해시태그 (보조)
+        with right:
+            st.caption("해시태그 (선택) · 최대 5개")
+            # 위젯 생성 전에만 초기화 플래그 처리(예외 방지)
+            if st.session_state.get("clear_new_tag_input", False):
+                st.session_state["new_tag_input"] = ""
+                st.session_state["clear_new_tag_input"] = False
+
+            new_tag_raw = st.text_input(
+                "태그 입력 (쉼표 구분)",
+                placeholder="예) python, streamlit",
+                key="new_tag_input",
+            )
+
+            def _normalize_tag(raw: str) -> str:
+                s = (raw or "").strip()
+                if not s:
+                    return ""
+                if s.startswith("#"):
+                    s = s[1:]
+                s = s.lower()
+                s = re.sub(r"\s+", "-", s)
+                s = re.sub(r"[^0-9a-zA-Zㄱ-ㅎ가-힣_-]", "", s)
+                return s if 1 <= len(s) <= 30 else ""
+
+            def _add_tags_from_raw(raw: str):
+                if not raw:
+                    return
+                parts = [p.strip() for p in raw.split(",") if p.strip()]
+                for p in parts:
+                    t = _normalize_tag(p)
+                    if not t:
+                        continue
+                    if t in st.session_state["draft_tags"]:
+                        st.toast(f"이미 추가된 태그: #{t}")
+                        continue
+                    if len(st.session_state["draft_tags"]) >= 5:
+                        st.toast("태그는 최대 5개까지 가능해요.")
+                        break
+                    st.session_state["draft_tags"].append(t)
+
+            # 자동완성: 마지막으로 입력 중인 태그(쉼표 뒤)의 접두로 추천
+            from services.tag_index import suggest_tags  # 글쓰기 영역을 그릴 때만 필요
+            typing_tag = (new_tag_raw or "").split(",")[-1].strip()
+            suggestions = [
+                t for t in suggest_tags(typing_tag, k=5)
+                if t not in st.session_state["draft_tags"]
+            ] if typing_tag else []
+            for t in suggestions:
+                if st.button(f"＋ #{t}", key=f"tag-suggest-{t}", use_container_width=True):
+                    _add_tags_from_raw(t)
+                    st.session_state["clear_new_tag_input"] = True
+                    st.rerun()
+
+            c_add, c_clear = st.columns([0.5, 0.5])
+            with c_add:
+                if st.button("태그 추가", key="tag-add", use_container_width=True):
+                    _add_tags_from_raw(new_tag_raw)
+                    st.session_state["clear_new_tag_input"] = True
+                    st.rerun()
+            with c_clear:
+                if st.button("태그 모두 지우기", key="tag-clear", use_container_width=True):
+                    st.session_state["draft_tags"] = []
+                    st.rerun()
+
+            # 작은 칩 렌더링(삭제 버튼은 아주 작게)
+            for t in st.session_state["draft_tags"]:
+                chip_col, x_col = st.columns([0.8, 0.2])
+                with chip_col:
+                    st.markdown(f'<span class="tag-chip">#{t}</span>', unsafe_allow_html=True)
+                with x_col:
+                    if st.button("✕", key=f"tag-del-{t}", use_container_width=True):
+                        st.session_state["draft_tags"] = [x for x in st.session_state["draft_tags"] if x != t]
+                        st.rerun()
         # ---- Feed ---------------------------------------------------------------
         if menu == "피드":
             st.subheader("피드")
-            ALL_POSTS = _all_posts_map()
             # sidebar에서 scope를 못 가져오는 경우를 대비해 기본값 보장
             scope = st.session_state.get("scope", "전체")
             scope_key = "all" if scope == "전체" else "following"
@@ -490,267 +740,97 @@ if menu == "피드":
             else:
                 st.session_state.pop("focus_post_id", None)
 
-        for p in posts:
-            with st.container(border=True):
-                # 상단: 작성자/시간 + 프로필 보기
-                left, right = st.columns([0.70, 0.30])
-                with left:
-                    author_id = p["author_id"]
-                    author_disp = get_display_name(author_id) or author_id
-                    author_handle = get_username(author_id) or author_id
-                    _prof = get_profile(author_id) or {}
-                    _avatar = _prof.get("avatar_path") or ""
-
-                    header_cols = st.columns([0.12, 0.88])
-                    with header_cols[0]:
-                        if _avatar and os.path.exists(_avatar):
-                            st.image(_avatar, width=40)
-                    with header_cols[1]:
-                        st.caption(f"{p['created_at']}")
-                        if st.button(
-                            f"{author_disp} · @{author_handle}",
-                            key=f"open-prof-{p['post_id']}",
-                            use_container_width=False
-                        ):
-                            st.session_state["nav_to"] = "내 프로필"
-                            st.session_state["view_user_id"] = author_id
-                            st.rerun()
-
-
-                with right:
-                    if p["author_id"] != CURRENT_USER:
-                        if st.button("프로필 보기", key=f"viewprof-{p['post_id']}"):
-                            st.session_state["nav_to"] = "내 프로필"
-                            st.session_state["view_user_id"] = p["author_id"]
-                            st.rerun()
-
-                is_repost = bool(p["original_post_id"])
-                interactions_enabled = True
-                tags_to_show = []
-
-                # 본문/원본 표시 및 정책 처리
-                if is_repost:
-                    st.caption("🔁 리포스트")
-                    orig = ALL_POSTS.get(p["original_post_id"])
-                    if (orig is None) or (orig.get("is_deleted") == "1"):
-                        st.warning("삭제된 게시물")
-                        if orig is not None:
-                            st.caption(f"원본 메타: 작성자 {orig.get('author_id','?')} · {orig.get('created_at','?')}")
-                        else:
-                            st.caption("원본 메타: 알 수 없음")
-                        interactions_enabled = False
-                        tags_to_show = []
-                    else:
-                        st.caption(f"원본: {orig['author_id']} · {orig['created_at']}")
-                        orig_content = orig.get("content") or "_(본문 없음)_"
-                        if active_query:
-                            st.markdown(_highlight(orig_content, active_query), unsafe_allow_html=True)
-                        else:
-                            st.write(orig_content)
-                        tags_to_show = _post_hashtags(orig["post_id"])
-                else:
-                    content_to_show = p["content"] if p["content"] else "_(본문 없음)_"
-                    if active_query:
-                        st.markdown(_highlight(content_to_show, active_query), unsafe_allow_html=True)
-                    else:
-                        st.write(content_to_show)
-                    tags_to_show = _post_hashtags(p["post_id"])
-
-                # 해시태그 칩
-                if tags_to_show:
-                    tag_cols = st.columns(min(4, len(tags_to_show)))
-                    for i, t in enumerate(tags_to_show):
-                        with tag_cols[i % len(tag_cols)]:
-                            if st.button(f"#{t}", key=f"tag-{p['post_id']}-{t}"):
-                                st.session_state["filter_tag"] = t
-                                st.rerun()
-
-                # 하단 버튼: 좋아요 / 리포스트 / 댓글
-                cols = st.columns(3)
-                with cols[0]:
-                    liked_now = user_liked(p["post_id"], CURRENT_USER)
-                    like_label = f"{'❤️' if liked_now else '🤍'} 좋아요 ({count_likes(p['post_id'])})"
-                    if st.button(like_label, key=f"like-{p['post_id']}", disabled=not interactions_enabled):
-                        liked, _ = toggle_like(p["post_id"], CURRENT_USER)
-                        st.toast(("좋아요 해제", "좋아요 추가")[liked])
-                        st.rerun()
-
-                with cols[1]:
-                    if st.button("🔁 리포스트", key=f"rt-{p['post_id']}", disabled=not interactions_enabled):
-                        try:
-                            create_post(author_id=CURRENT_USER, content="", original_post_id=p["post_id"])
-                            st.success("리포스트 완료!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"오류: {e}")
+        if st.session_state.get("collapse_reposts"):
+            for p, users in collapse_reposts(posts):
+                _post_card(p["post_id"], active_query, tuple(users))
+        else:
+            for p in posts:
+                _post_card(p["post_id"], active_query)
+
+    with tab_activity:
+        st.subheader("최근 활동 로그")
+        st.caption("POST/REPOST/DELETE/RESTORE/REACTION/COMMENT/USER_FOLLOW 등 이벤트")
+        with st.form("activity-filter"):
+            f_types = st.multiselect("이벤트 종류", EVENT_TYPES)
+            fc = st.columns(2)
+            with fc[0]:
+                f_actor = st.text_input("수행자 user_id", placeholder="u_0001")
+            with fc[1]:
+                f_target = st.text_input("대상 id", placeholder="p_0012 / c_0003 / u_0002")
+            dc = st.columns(2)
+            with dc[0]:
+                f_since = st.date_input("시작일", value=None)
+            with dc[1]:
+                f_until = st.date_input("종료일", value=None)
+            if st.form_submit_button("조회"):
+                st.session_state["act_filters"] = {
+                    "event_types": f_types or None,
+                    "actor_id": f_actor.strip() or None,
+                    "target_id": f_target.strip() or None,
+                    "since": f_since.isoformat() if f_since else None,
+                    "until": (f_until + timedelta(days=1)).isoformat() if f_until else None,
+                }
+                st.session_state["act_cursors"] = []   # 필터가 바뀌면 첫 페이지부터
 
-                with cols[2]:
-                    if st.button("💬 댓글", key=f"cm-btn-{p['post_id']}", disabled=not interactions_enabled):
-                        k = f"open_comments_{p['post_id']}"
-                        st.session_state[k] = not st.session_state.get(k, False)
-                        st.rerun()
+        cursors = st.session_state.setdefault("act_cursors", [])
+        rows, next_cursor = query_events(
+            **st.session_state.get("act_filters", {}),
+            limit=ACTIVITY_PAGE_SIZE,
+            cursor=cursors[-1] if cursors else None,
+        )
+        if not rows:
+            st.info("조건에 맞는 로그가 없습니다.")
+        else:
+            st.dataframe(
+                [{c: r.get(c, "") for c in ACTIVITY_VIEW_COLUMNS} for r in rows],
+                use_container_width=True, hide_index=True,
+            )
+        nav = st.columns([1, 1, 3])
+        with nav[0]:
+            if st.button("⬅️ 이전", key="act-prev", disabled=not cursors):
+                cursors.pop()
+                st.rerun()
+        with nav[1]:
+            if st.button("다음 ➡️", key="act-next", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        with nav[2]:
+            st.caption(f"{len(cursors) + 1} 페이지 · 페이지당 {ACTIVITY_PAGE_SIZE}건")
+
+    with tab_stats:
+        st.subheader("📊 분석")
+        # 탭 본문은 매 rerun 마다 실행되므로, 켰을 때만 pandas/numpy 와 집계 모듈을 불러온다
+        if not st.toggle("집계 보기", key="show_stats"):
+            st.caption("켜면 활동 로그 컬럼 파일을 읽어 DAU·시간대별 이벤트·게시 빈도·반응 곡선을 집계합니다.")
+        else:
+            from services.analytics import (
+                daily_active_users, events_per_type_hour, posting_frequency,
+                engagement_curves, top_liked_posts
+            )
+            since = (datetime.now() - timedelta(days=30)).date().isoformat()
 
+            st.markdown("**일간 활성 사용자(DAU)** · 최근 30일")
+            dau = daily_active_users(since=since)
+            if dau.empty:
+                st.info("아직 집계할 활동이 없습니다.")
+            else:
+                st.line_chart(dau)
 
-                # 삭제/복구 UI (내 글만)
-                is_my_post = (p["author_id"] == CURRENT_USER)
-                if is_my_post:
-                    with st.expander("게시물 관리", expanded=False):
-                        c1, c2 = st.columns(2)
-                        with c1:
-                            if st.button("🗑️ 삭제", key=f"del-{p['post_id']}"):
-                                try:
-                                    soft_delete_post(p["post_id"], CURRENT_USER)
-                                    st.success("삭제 완료 (소프트 딜리트)")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"오류: {e}")
-                        with c2:
-                            if st.button("↩️ 복구(실험용)", key=f"restore-{p['post_id']}"):
-                                try:
-                                    restore_post(p["post_id"], CURRENT_USER)
-                                    st.success("복구 완료")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"오류: {e}")
-
-            # ----- 댓글 섹션 --------------------------------------------------
-            st.markdown("---")
-            cm_key = f"open_comments_{p['post_id']}"
-            is_open = st.session_state.get(cm_key, False)
-
-            # 상단 토글 버튼 (개수 표시)
-            topc1, topc2 = st.columns([0.8, 0.2])
-            with topc1:
-                if st.button(
-                    f"💬 댓글 {count_comments(p['post_id'])}개 {'닫기' if is_open else '열기'}",
-                    key=f"cm-toggle-{p['post_id']}",
-                    disabled=not interactions_enabled
-                ):
-                    st.session_state[cm_key] = not is_open
-                    st.rerun()
-            with topc2:
-                pass
-
-            if is_open:
-                comments = list_comments(p["post_id"])
-                roots = [c for c in comments if not c["parent_comment_id"]]
-                replies_by_parent = {}
-                for c in comments:
-                    pid = c["parent_comment_id"]
-                    if pid:
-                        replies_by_parent.setdefault(pid, []).append(c)
-
-                for c in roots:
-                    # 루트 댓글
-                    c_author = c["author_id"]
-                    c_disp = get_display_name(c_author) or c_author
-                    c_handle = get_username(c_author) or c_author
-                    c_prof = get_profile(c_author) or {}
-                    c_avatar = c_prof.get("avatar_path") or ""
-
-                    with st.container():
-                        c1, c2 = st.columns([0.10, 0.90])
-                        with c1:
-                            if c_avatar and os.path.exists(c_avatar):
-                                st.image(c_avatar, width=32)
-                        with c2:
-                            if st.button(
-                                f"{c_disp} · @{c_handle}",
-                                key=f"open-prof-c-{p['post_id']}-{c['comment_id']}",
-                                use_container_width=False
-                            ):
-                                st.session_state["nav_to"] = "내 프로필"
-                                st.session_state["view_user_id"] = c_author
-                                st.rerun()
-                            st.caption(c["created_at"])
-                            c_body = c["content"]
-                            if active_query:
-                                st.markdown(_highlight(c_body, active_query), unsafe_allow_html=True)
-                            else:
-                                st.write(c_body)
-
-                    # 대댓글 목록
-                    for rc in replies_by_parent.get(c["comment_id"], []):
-                        rc_author = rc["author_id"]
-                        rc_disp = get_display_name(rc_author) or rc_author
-                        rc_handle = get_username(rc_author) or rc_author
-                        rc_prof = get_profile(rc_author) or {}
-                        rc_avatar = rc_prof.get("avatar_path") or ""
-
-                        rc1, rc2 = st.columns([0.10, 0.90])
-                        with rc1:
-                            if rc_avatar and os.path.exists(rc_avatar):
-                                st.image(rc_avatar, width=28)
-                        with rc2:
-                            if st.button(
-                                f"{rc_disp} · @{rc_handle}",
-                                key=f"open-prof-r-{p['post_id']}-{rc['comment_id']}",
-                                use_container_width=False
-                            ):
-                                st.session_state["nav_to"] = "내 프로필"
-                                st.session_state["view_user_id"] = rc_author
-                                st.rerun()
-                            st.caption(rc["created_at"])
-                            rc_body = rc["content"]
-                            if active_query:
-                                st.markdown(_highlight(rc_body, active_query), unsafe_allow_html=True)
-                            else:
-                                st.write(rc_body)
-
-                # 대댓글 입력
-                    with st.expander("↳ 대댓글 달기", expanded=False):
-                        form_key = f"rform-{p['post_id']}-{c['comment_id']}"
-                        with st.form(form_key, clear_on_submit=True):
-                            col_in, col_btn = st.columns([0.80, 0.20])
-                            with col_in:
-                                sub = st.text_input(
-                                    label="대댓글 달기",
-                                    key=f"rinput-{p['post_id']}-{c['comment_id']}",
-                                    placeholder="대댓글을 입력하세요",
-                                    label_visibility="collapsed",
-                                )
-                            with col_btn:
-                                sbm = st.form_submit_button("등록", disabled=not interactions_enabled, use_container_width=True)
-                            if sbm:
-                                try:
-                                    create_comment(
-                                        post_id=p["post_id"],
-                                        author_id=CURRENT_USER,
-                                        content=sub,
-                                        parent_comment_id=c["comment_id"],
-                                    )
-                                    st.success("대댓글 작성 완료!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"오류: {e}")
-
-                # 루트 댓글 작성
-                with st.form(f"comment-{p['post_id']}", clear_on_submit=True):
-                    comment_text = st.text_input("댓글 달기", placeholder="댓글을 입력하세요")
-                    c_submit = st.form_submit_button("등록", disabled=not interactions_enabled)
-                    if c_submit:
-                        try:
-                            create_comment(post_id=p["post_id"], author_id=CURRENT_USER, content=comment_text)
-                            st.success("댓글 작성 완료!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"오류: {e}")
+                st.markdown("**시간대별 이벤트** · 최근 48시간")
+                hourly = events_per_type_hour(since=(datetime.now() - timedelta(days=2)).date().isoformat())
+                st.bar_chart(hourly.tail(48))
 
+                st.markdown("**사용자별 게시 빈도** · 최근 30일")
+                freq = posting_frequency(since=since).head(10)
+                freq["user_id"] = [get_display_name(u) or u for u in freq["user_id"]]
+                st.dataframe(freq, use_container_width=True, hide_index=True)
 
-                        with tab_activity:
-                            st.subheader("최근 활동 로그")
-                            st.caption("POST/REPOST/DELETE/RESTORE/REACTION/COMMENT/USER_FOLLOW 등 이벤트")
-                            rows = _activity_rows(limit=100)
-                            if not rows:
-                                st.info("로그가 아직 없습니다.")
-                            else:
-                                df = pd.DataFrame(rows)
-                                cols = ["created_at", "event_type", "actor_id", "target_type", "target_id", "metadata"]
-                                for c in cols:
-                                    if c not in df.columns:
-                                        df[c] = ""
-                                df = df[cols]
-                                st.dataframe(df, use_container_width=True, height=360)
+                st.markdown("**반응 곡선** · 좋아요 상위 게시물, 작성 후 72시간 누적")
+                top = top_liked_posts(5)
+                if top.empty:
+                    st.caption("좋아요가 달린 게시물이 없습니다.")
+                else:
+                    st.line_chart(engagement_curves(list(top.index.astype(str))))
 
 
 
@@ -780,20 +860,22 @@ if menu == "내 프로필":
                 st.rerun()
         with top_cols[1]:
             # 팔로우/언팔로우 토글
-            following_now = is_following(CURRENT_USER, target_user_id)
+            following_now = target_user_id in VIEWER.following
             fl_label = "언팔로우" if following_now else "팔로우"
             if st.button(fl_label, key=f"follow-on-prof-{target_user_id}"):
                 if following_now:
                     unfollow(CURRENT_USER, target_user_id)
+                    note_follow(VIEWER, target_user_id, False)
                     st.success("언팔로우 완료")
                 else:
                     follow(CURRENT_USER, target_user_id)
+                    note_follow(VIEWER, target_user_id, True)
                     st.success("팔로우 완료")
                 st.rerun()
 
         st.markdown("---")
         st.subheader("📜 게시글")
-        others_posts = [r for r in list_feed(limit=200) if r.get("author_id") == target_user_id]
+        others_posts = list_user_posts(target_user_id, limit=200)
         if not others_posts:
             st.info("게시글이 없습니다.")
         else:
@@ -826,19 +908,18 @@ if menu == "내 프로필":
 
     # ========== 프로필 탭 ==========
     with t_profile:
-        me = get_profile(CURRENT_USER) or {}
-        disp = me.get("display_name") or me.get("username") or CURRENT_USER
-        handle = get_username(CURRENT_USER)
+        me = VIEWER.profile
+        disp = VIEWER.display_name
+        handle = VIEWER.username
         st.subheader(f"{disp}")
         st.caption(f"@{handle} · 가입일: {me.get('created_at','N/A')}")
 
         # 팔로워/팔로잉 카운트 + 펼치기
-        from services.follows import get_following, follow_counts
-        fcnt, gcnt = follow_counts(CURRENT_USER)  # (followers, following)
+        followers = sorted(get_followers(CURRENT_USER))
+        fcnt, gcnt = len(followers), len(VIEWER.following)  # (followers, following)
         c1, c2 = st.columns(2)
         with c1:
             with st.expander(f"👥 팔로워 {fcnt}명"):
-                followers = list(get_followers(CURRENT_USER))
                 if followers:
                     for uid in followers:
                         st.write(f"- {uid}")
@@ -846,13 +927,37 @@ if menu == "내 프로필":
                     st.caption("아직 팔로워가 없습니다.")
         with c2:
             with st.expander(f"➡️ 팔로잉 {gcnt}명"):
-                following = list(get_following(CURRENT_USER))
+                following = sorted(VIEWER.following)
                 if following:
                     for uid in following:
                         st.write(f"- {uid}")
                 else:
                     st.caption("아직 팔로잉이 없습니다.")
 
+        # 팔로우 추천: 친구의 친구 · 나를 팔로우 · 같은 글 좋아요 (배치 계산 결과를 읽기만 한다)
+        from services.recommend import start_background_recommendations  # NumPy 는 이 화면에서만 필요
+        start_background_recommendations()
+        suggestions = suggested_follows(CURRENT_USER, 5)
+        if suggestions:
+            st.markdown("**👋 추천 팔로우**")
+            for sug in suggestions:
+                c_name, c_btn = st.columns([0.75, 0.25])
+                with c_name:
+                    reasons = []
+                    if sug["follows_you"]:
+                        reasons.append("나를 팔로우함")
+                    if sug["mutual"]:
+                        reasons.append(f"내가 팔로우하는 {sug['mutual']}명이 팔로우")
+                    if sug["co_likes"]:
+                        reasons.append(f"같은 글 {sug['co_likes']}개에 좋아요")
+                    st.write(f"@{get_username(sug['user_id']) or sug['user_id']}")
+                    st.caption(" · ".join(reasons) or "인기 계정")
+                with c_btn:
+                    if st.button("팔로우", key=f"suggest-follow-{sug['user_id']}"):
+                        follow(CURRENT_USER, sug["user_id"])
+                        note_follow(VIEWER, sug["user_id"], True)
+                        st.rerun()
+
         st.markdown("---")
 
         # 아바타 미리보기
@@ -880,6 +985,7 @@ if menu == "내 프로필":
                     with open(avatar_save, "wb") as f:
                         f.write(up.read())
                 try:
+                    from services.profile import update_profile
                     ok_saved = update_profile(
                         CURRENT_USER,
                         display_name=new_disp.strip(),
@@ -887,6 +993,12 @@ if menu == "내 프로필":
                         avatar_path=avatar_save
                     )
                     if ok_saved:
+                        note_profile_updated(
+                            VIEWER,
+                            display_name=new_disp.strip(),
+                            bio=new_bio.strip(),
+                            avatar_path=avatar_save
+                        )
                         st.success("프로필이 저장되었습니다.")
                         st.rerun()
                     else:
@@ -898,7 +1010,7 @@ if menu == "내 프로필":
     # ========== 내 글 탭 ==========
     with t_my_posts:
         st.subheader("📜 내가 쓴 글")
-        my_posts = [r for r in list_feed(limit=500) if r.get("author_id") == CURRENT_USER]
+        my_posts = list_user_posts(CURRENT_USER, limit=500)
         if not my_posts:
             st.info("아직 작성한 글이 없습니다.")
         else:
@@ -929,17 +1041,54 @@ if menu == "내 프로필":
     # ========== 내 활동 탭 ==========
     with t_my_activity:
         st.subheader("🗂️ 내 활동")
-        # 기존 activity_log에서 내 것만 필터
-        rows = _activity_rows(limit=300)
-        my_rows = [r for r in rows if r.get("actor_id") == CURRENT_USER]
+        # activity_log 에서 내 것만 최신순으로
+        my_rows, _ = query_events(actor_id=CURRENT_USER, limit=300)
         if not my_rows:
             st.info("아직 활동 내역이 없습니다.")
         else:
-            df = pd.DataFrame(my_rows)
-            cols = ["created_at", "event_type", "target_type", "target_id", "metadata"]
-            for c in cols:
-                if c not in df.columns:
-                    df[c] = ""
-            df = df[cols]
-            st.dataframe(df, use_container_width=True, height=360)
+            st.dataframe(
+                [{c: r.get(c, "") for c in ACTIVITY_VIEW_COLUMNS if c != "actor_id"} for r in my_rows],
+                use_container_width=True, height=360, hide_index=True,
+            )
+
+
+# ---- Notifications Page ------------------------------------------------------
+if menu == "알림":
+    st.header("🔔 알림")
+    top_l, top_r = st.columns([0.7, 0.3])
+    with top_l:
+        st.caption(f"안 읽은 알림 {_unread}개" if _unread else "새 알림이 없습니다.")
+    with top_r:
+        if st.button("모두 읽음", key="notif-read-all", disabled=not _unread):
+            mark_all_read(CURRENT_USER)
+            st.rerun()
+
+    # 페이지는 cursor 로 이어 읽고, "더 보기" 를 누를 때마다 한 페이지씩 늘린다
+    pages = st.session_state.get("notif_pages", 1)
+    items, cursor = [], None
+    for _ in range(pages):
+        page, cursor = list_notifications(CURRENT_USER, limit=20, cursor=cursor)
+        items += page
+        if cursor is None:
+            break
+
+    if not items:
+        st.info("아직 받은 알림이 없습니다.")
+    for i, it in enumerate(items):
+        with st.container(border=True):
+            mark = "🔵 " if it["unread"] else ""
+            st.markdown(f"{mark}{notification_text(it, get_username)}")
+            if it["count"] > 1:
+                st.caption(", ".join(f"@{get_username(a)}" for a in it["actors"][:5])
+                           + (f" 외 {it['count'] - 5}명" if it["count"] > 5 else ""))
+            if it["preview"]:
+                st.caption(f"“{it['preview']}”")
+            st.caption(it["created_at"][:16].replace("T", " "))
+            if it["target_id"] and st.button("👀 피드에서 보기", key=f"notif-goto-{i}-{it['target_id']}"):
+                st.session_state["nav_to"] = "피드"
+                st.session_state["focus_post_id"] = it["target_id"]
+                st.rerun()
 
+    if cursor is not None and st.button("더 보기", key="notif-more"):
+        st.session_state["notif_pages"] = pages + 1
+        st.rerun()
@@ -0,0 +1,607 @@
+# repo/binrow.py
+# 짧은 id 튜플 테이블(reactions, follows, post_hashtags)용 바이너리 행 포맷.
+# 파일 = MAGIC + 스키마 길이(u32) + 스키마(JSON) + 레코드들
+# - id  컬럼: 'u_0001' → u32 1 (접두어는 스키마에 한 번만 둔다, 빈 값은 0)
+# - ts  컬럼: ISO 시각 → i64 UTC 마이크로초 + i16 UTC 오프셋(분). 빈 값/오프셋 없음은 센티널
+# - str 컬럼: u16 길이 + UTF-8 바이트
+# str 컬럼이 없으면 고정 폭 레코드, 있으면 레코드마다 앞에 u16 길이가 붙는다.
+# 값은 인코딩 → 디코딩 결과가 원래 문자열과 같을 때만 id/ts 로 담고, 아니면 그 컬럼을 str 로
+# 넓혀 파일을 다시 쓰므로 CSV ↔ 바이너리 왕복은 항상 무손실이다.
+# 스캔(select/count)은 mmap 위에서 memoryview 로 정수만 비교하고, 일치한 행의 값만 문자열로 만든다.
+import csv
+import gc
+import io
+import json
+import mmap
+import os
+import re
+import struct
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"SMBROW01"
+_PRE = struct.Struct("<8sI")   # magic, 스키마 길이
+_LEN = struct.Struct("<H")     # 가변 레코드 길이 / str 길이
+
+_ID_MAX = 0xFFFFFFFF
+_TS_EMPTY = -(1 << 63)
+_TZ_NAIVE = -(1 << 15)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ID_RE = re.compile(r"([A-Za-z]+)_(\d+)")
+
+_FIXED_FMT = {"id": "I", "ts": "qh"}
+_NP_FMT = {"id": ("<u4",), "ts": ("<i8", "<i2")}
+# 고정 폭 레코드가 이만큼 이상이면 컬럼 단위(NumPy)로 한 번에 디코딩
+_BULK_MIN = 4096
+
+
+class Unfit(ValueError):
+    """값이 컬럼의 현재 형식(id/ts)으로 무손실 표현되지 않음 → 그 컬럼을 넓혀야 한다."""
+
+    def __init__(self, column: str, value: str):
+        super().__init__(f"{column}={value!r}")
+        self.column = column
+
+
+# ----------------------------
+# 값 인코딩
+# ----------------------------
+def _id_code(value: str, prefix: str) -> Optional[int]:
+    if value == "":
+        return 0
+    m = _ID_RE.fullmatch(value)
+    if m is None or m.group(1) != prefix:
+        return None
+    n = int(m.group(2))
+    if not 0 < n <= _ID_MAX or f"{prefix}_{n:04d}" != value:
+        return None
+    return n
+
+def _ts_code(value: str) -> Optional[Tuple[int, int]]:
+    if value == "":
+        return _TS_EMPTY, 0
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.isoformat() != value:
+        return None
+    off = dt.utcoffset()
+    if off is None:
+        tz = _TZ_NAIVE
+        dt = dt.replace(tzinfo=timezone.utc)
+    else:
+        if off % timedelta(minutes=1):
+            return None
+        tz = off // timedelta(minutes=1)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds, tz
+
+@lru_cache(maxsize=None)
+def _tz_suffix(tz: int) -> str:
+    if tz == _TZ_NAIVE:
+        return ""
+    return datetime(2000, 1, 1, tzinfo=timezone(timedelta(minutes=tz))).isoformat()[19:]
+
+def _ts_text(us: int, tz: int) -> str:
+    if us == _TS_EMPTY:
+        return ""
+    dt = _EPOCH + timedelta(microseconds=us)
+    if tz == _TZ_NAIVE:
+        return dt.replace(tzinfo=None).isoformat()
+    return dt.astimezone(timezone(timedelta(minutes=tz))).isoformat()
+
+
+def _guess_kind(column: str, values: List[str]) -> Tuple[str, str]:
+    """컬럼 값들을 모두 무손실로 담을 수 있는 가장 좁은 형식 (kind, 접두어)"""
+    sample = next((v for v in values if v), "")
+    m = _ID_RE.fullmatch(sample)
+    if m and all(_id_code(v, m.group(1)) is not None for v in values):
+        return "id", m.group(1)
+    if sample and all(_ts_code(v) is not None for v in values):
+        return "ts", ""
+    return "str", ""
+
+
+# ----------------------------
+# 레이아웃
+# ----------------------------
+class Layout:
+    """스키마(컬럼 이름/형식) 하나에 대한 레코드 인코더/디코더"""
+
+    def __init__(self, columns: List[Tuple[str, str, str]]):
+        self.columns = [tuple(c) for c in columns]          # (이름, kind, 접두어)
+        self.fieldnames = [c[0] for c in self.columns]
+        self.kinds = {c[0]: c[1] for c in self.columns}
+        fixed = [c for c in self.columns if c[1] != "str"]
+        self.strs = [c[0] for c in self.columns if c[1] == "str"]
+        self.fixed = struct.Struct("<" + "".join(_FIXED_FMT[c[1]] for c in fixed))
+        self.variable = bool(self.strs)
+        self.size = self.fixed.size      # 고정 폭 레코드 크기(가변이면 고정부 크기)
+        # 고정부 안에서 컬럼별 값 위치(튜플 인덱스)
+        self.slot: Dict[str, int] = {}
+        i = 0
+        for name, kind, _ in fixed:
+            self.slot[name] = i
+            i += 2 if kind == "ts" else 1
+        self.prefix = {c[0]: c[2] for c in fixed if c[1] == "id"}
+        schema = json.dumps({"columns": self.columns}, ensure_ascii=False).encode("utf-8")
+        self.header = _PRE.pack(MAGIC, len(schema)) + schema
+        self._ids: Dict[Tuple[str, int], str] = {}
+
+    @classmethod
+    def infer(cls, fieldnames: List[str], rows: List[Dict[str, Any]]) -> "Layout":
+        return cls([(f, *_guess_kind(f, [str(r.get(f, "") or "") for r in rows])) for f in fieldnames])
+
+    def widened(self, column: str) -> "Layout":
+        return Layout([(n, "str", "") if n == column else (n, k, p) for n, k, p in self.columns])
+
+    # ---- 인코딩 ----
+    def encode(self, row: Dict[str, Any]) -> bytes:
+        extra = set(row) - set(self.fieldnames)
+        if extra:  # csv.DictWriter 와 같은 규칙
+            raise ValueError(f"dict contains fields not in fieldnames: {', '.join(sorted(map(repr, extra)))}")
+        vals: List[int] = []
+        for name, kind, prefix in self.columns:
+            v = row.get(name, "")
+            v = "" if v is None else str(v)
+            if kind == "id":
+                n = _id_code(v, prefix)
+                if n is None:
+                    raise Unfit(name, v)
+                vals.append(n)
+            elif kind == "ts":
+                t = _ts_code(v)
+                if t is None:
+                    raise Unfit(name, v)
+                vals.extend(t)
+        body = self.fixed.pack(*vals)
+        if not self.variable:
+            return body
+        parts = [body]
+        for name in self.strs:
+            v = row.get(name, "")
+            b = ("" if v is None else str(v)).encode("utf-8")
+            if len(b) > 0xFFFF:
+                raise ValueError(f"{name}: value longer than 65535 bytes")
+            parts.append(_LEN.pack(len(b)))
+            parts.append(b)
+        rec = b"".join(parts)
+        return _LEN.pack(len(rec)) + rec
+
+    # ---- 디코딩 ----
+    def _id_text(self, name: str, n: int) -> str:
+        if n == 0:
+            return ""
+        key = (name, n)
+        s = self._ids.get(key)
+        if s is None:
+            s = self._ids[key] = f"{self.prefix[name]}_{n:04d}"
+        return s
+
+    def _row(self, fixed: tuple, strs: Dict[str, str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        for name, kind, _ in self.columns:
+            if kind == "id":
+                out[name] = self._id_text(name, fixed[self.slot[name]])
+            elif kind == "ts":
+                i = self.slot[name]
+                out[name] = _ts_text(fixed[i], fixed[i + 1])
+            else:
+                out[name] = strs[name]
+        return out
+
+    def value(self, fixed: tuple, name: str) -> str:
+        """고정부 튜플에서 한 컬럼(id/ts)만 문자열로"""
+        i = self.slot[name]
+        if self.kinds[name] == "id":
+            return self._id_text(name, fixed[i])
+        return _ts_text(fixed[i], fixed[i + 1])
+
+    def _strs_at(self, buf, pos: int) -> Dict[str, str]:
+        out = {}
+        for name in self.strs:
+            (n,) = _LEN.unpack_from(buf, pos)
+            out[name] = bytes(buf[pos + 2:pos + 2 + n]).decode("utf-8")
+            pos += 2 + n
+        return out
+
+    def records(self, buf, start: int, end: int) -> Iterator[Tuple[int, tuple]]:
+        """buf[start:end] 의 완성된 레코드마다 (레코드 시작 위치, 고정부 튜플)"""
+        if not self.variable:
+            count = (end - start) // self.size if self.size else 0
+            if count <= 0:
+                return
+            with memoryview(buf) as whole, whole[start:start + count * self.size] as view:
+                it = self.fixed.iter_unpack(view)
+                pos = start
+                for t in it:
+                    yield pos, t
+                    pos += self.size
+                del it  # mmap 을 닫을 수 있게 버퍼 참조를 먼저 놓는다
+            return
+        pos = start
+        while pos + 2 <= end:
+            (n,) = _LEN.unpack_from(buf, pos)
+            if pos + 2 + n > end:
+                return
+            yield pos, self.fixed.unpack_from(buf, pos + 2)
+            pos += 2 + n
+
+    def record_end(self, buf, pos: int) -> int:
+        if not self.variable:
+            return pos + self.size
+        return pos + 2 + _LEN.unpack_from(buf, pos)[0]
+
+    def decode(self, buf, start: int, end: int) -> Tuple[List[Dict[str, str]], int]:
+        """buf[start:end] 의 완성된 레코드를 행 dict 로. 반환: (행들, 소비한 바이트 수)"""
+        if not self.variable and self.size and (end - start) // self.size >= _BULK_MIN:
+            count = (end - start) // self.size
+            return self._decode_bulk(buf, start, count), count * self.size
+        rows = []
+        last = start
+        for pos, t in self.records(buf, start, end):
+            strs = self._strs_at(buf, pos + 2 + self.size) if self.variable else {}
+            rows.append(self._row(t, strs))
+            last = self.record_end(buf, pos)
+        return rows, last - start
+
+    def _decode_bulk(self, buf, start: int, count: int) -> List[Dict[str, str]]:
+        """
+        고정 폭 레코드 count 개를 컬럼 단위로 디코딩한다.
+        파이썬에서 시각 문자열을 한 행씩 만드는 비용이 커서 NumPy 의 datetime_as_string 으로 한 번에 만든다.
+        """
+        import numpy as np  # 큰 구간을 디코딩할 때만 필요하므로 지역 import
+
+        fields = [(f"f{i}", fmt) for i, fmt in enumerate(
+            f for _, kind, _ in self.columns if kind != "str" for f in _NP_FMT[kind])]
+        arr = np.frombuffer(buf, dtype=np.dtype(fields), count=count, offset=start)
+        cols = []
+        for name, kind, _ in self.columns:
+            i = self.slot[name]
+            if kind == "id":
+                uniq, inv = np.unique(arr[f"f{i}"], return_inverse=True)
+                texts = np.array([self._id_text(name, int(n)) for n in uniq.tolist()], dtype=object)
+                cols.append(texts[inv].tolist())
+            else:
+                cols.append(_ts_texts(np, arr[f"f{i}"].astype(np.int64), arr[f"f{i + 1}"].astype(np.int64)))
+        names = self.fieldnames
+        # 작은 dict 를 한꺼번에 만드는 동안 순환 GC 가 반복해서 돌지 않게 잠시 끈다
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [dict(zip(names, vals)) for vals in zip(*cols)]
+        finally:
+            if enabled:
+                gc.enable()
+
+
+def _ts_texts(np, us, tz) -> List[str]:
+    """_ts_text 의 배열 버전 (결과는 한 값씩 만든 것과 같다)"""
+    empty = us == _TS_EMPTY
+    naive = tz == _TZ_NAIVE
+    local = np.where(empty, 0, us + np.where(naive, 0, tz * 60_000_000))
+    text = np.datetime_as_string(local.astype("datetime64[us]"), unit="us")
+    whole = (local % 1_000_000 == 0) & ~empty
+    if whole.any():  # isoformat 은 마이크로초가 0 이면 소수부를 생략한다
+        text[whole] = np.char.rstrip(np.char.rstrip(text[whole], "0"), ".")
+    out = text.tolist()
+    uniq, inv = np.unique(tz, return_inverse=True)
+    if len(uniq) == 1:
+        suffix = _tz_suffix(int(uniq[0]))
+        out = [t + suffix for t in out] if suffix else out
+    else:
+        suffixes = np.array([_tz_suffix(int(v)) for v in uniq.tolist()], dtype=object)[inv].tolist()
+        out = [t + s for t, s in zip(out, suffixes)]
+    for i in np.flatnonzero(empty).tolist():
+        out[i] = ""
+    return out
+
+
+@lru_cache(maxsize=64)
+def _layout_from_schema(schema: bytes) -> Layout:
+    return Layout(json.loads(schema.decode("utf-8"))["columns"])
+
+def is_binary(head: bytes) -> bool:
+    return head[:len(MAGIC)] == MAGIC
+
+def read_header(buf) -> Tuple[Optional[Layout], int]:
+    """파일 앞부분 → (레이아웃, 레코드 시작 위치). 헤더가 덜 쓰였거나 없으면 (None, 0)"""
+    if len(buf) < _PRE.size:
+        return None, 0
+    magic, n = _PRE.unpack_from(buf, 0)
+    if magic != MAGIC or len(buf) < _PRE.size + n:
+        return None, 0
+    return _layout_from_schema(bytes(buf[_PRE.size:_PRE.size + n])), _PRE.size + n
+
+
+def decode_all(data: bytes) -> Tuple[List[str], List[Dict[str, str]]]:
+    layout, start = read_header(data)
+    if layout is None:
+        return [], []
+    rows, _ = layout.decode(data, start, len(data))
+    return list(layout.fieldnames), rows
+
+
+def encode_all(fieldnames: List[str], rows: List[Dict[str, Any]],
+               layout: Optional[Layout] = None) -> Tuple[Layout, bytes]:
+    """
+    rows 를 통째로 인코딩. layout 이 없으면 값으로부터 추정하고,
+    맞지 않는 값이 나오면 그 컬럼을 str 로 넓혀 다시 시도한다.
+    """
+    layout = layout or Layout.infer(fieldnames, rows)
+    while True:
+        try:
+            return layout, layout.header + b"".join(layout.encode(r) for r in rows)
+        except Unfit as e:
+            layout = layout.widened(e.column)
+
+
+# ----------------------------
+# mmap 스캔
+# ----------------------------
+def _mapped(f, size: int):
+    return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+
+def scan(f, size: int, where: Dict[str, str], column: Optional[str]) -> Tuple[int, List[str]]:
+    """
+    열린 바이너리 테이블 파일의 앞 size 바이트에서 where(컬럼=값 모두 일치) 행을 찾는다.
+    반환: (일치 행 수, column 값 목록 — column 이 None 이면 빈 목록)
+    id 컬럼 조건은 정수 비교로, 고정 폭 테이블이면 4바이트 패턴 검색(mmap.find)으로 후보만 본다.
+    """
+    mm = _mapped(f, size)
+    try:
+        layout, start = read_header(mm)
+        if layout is None:
+            return 0, []
+        if column and column not in layout.kinds:
+            raise KeyError(column)
+        if any(name not in layout.kinds for name in where):
+            return 0, []  # CSV 와 같이: 없는 컬럼 조건은 어떤 행과도 맞지 않는다
+        # 조건 값을 레코드 형식으로. 표현할 수 없는 값이면 일치하는 행이 없다
+        int_conds: List[Tuple[int, int]] = []
+        str_conds: List[Tuple[str, bytes]] = []
+        for name, value in where.items():
+            kind = layout.kinds[name]
+            if kind == "id":
+                n = _id_code(value, layout.prefix[name])
+                if n is None:
+                    return 0, []
+                int_conds.append((layout.slot[name], n))
+            elif kind == "ts":
+                t = _ts_code(value)
+                if t is None:
+                    return 0, []
+                int_conds += [(layout.slot[name], t[0]), (layout.slot[name] + 1, t[1])]
+            else:
+                str_conds.append((name, value.encode("utf-8")))
+
+        def _match(t: tuple) -> bool:
+            return all(t[i] == v for i, v in int_conds)
+
+        hits: Iterable[Tuple[int, tuple]]
+        if not layout.variable and int_conds and where and layout.kinds[next(iter(where))] == "id":
+            hits = _find_fixed(mm, layout, start, size, next(iter(where)), int_conds[0][1])
+        else:
+            hits = layout.records(mm, start, size)
+
+        count = 0
+        out: List[str] = []
+        for pos, t in hits:
+            if not _match(t):
+                continue
+            if str_conds or (column and layout.kinds[column] == "str"):
+                strs = _str_views(mm, layout, pos)
+                if any(strs[n] != b for n, b in str_conds):
+                    continue
+            else:
+                strs = {}
+            count += 1
+            if column:
+                if layout.kinds[column] == "str":
+                    out.append(strs[column].decode("utf-8"))
+                else:
+                    out.append(layout.value(t, column))
+        return count, out
+    finally:
+        if isinstance(mm, mmap.mmap):
+            mm.close()
+
+def _str_views(mm, layout: Layout, pos: int) -> Dict[str, bytes]:
+    out = {}
+    p = pos + 2 + layout.size
+    for name in layout.strs:
+        (n,) = _LEN.unpack_from(mm, p)
+        out[name] = mm[p + 2:p + 2 + n]
+        p += 2 + n
+    return out
+
+def _find_fixed(mm, layout: Layout, start: int, end: int, column: str, n: int) -> Iterator[Tuple[int, tuple]]:
+    """고정 폭 레코드에서 id 컬럼 == n 후보: 4바이트 패턴을 찾고 레코드 경계에 맞는 것만"""
+    needle = struct.pack("<I", n)
+    off = struct.calcsize("<" + "".join(_FIXED_FMT[k] for name, k, _ in layout.columns[:layout.fieldnames.index(column)]))
+    rec = layout.size
+    end = start + (end - start) // rec * rec
+    pos = mm.find(needle, start + off, end)
+    while pos >= 0:
+        rel = (pos - start - off) % rec
+        if rel == 0:
+            rs = pos - off
+            yield rs, layout.fixed.unpack_from(mm, rs)
+            pos = mm.find(needle, pos + rec, end)
+        else:
+            pos = mm.find(needle, pos + 1, end)
+
+
+def iter_rows(f, size: int, chunk: int = 1 << 20) -> Iterator[Dict[str, str]]:
+    """열린 바이너리 테이블의 앞 size 바이트를 조각씩 디코딩하며 한 행씩"""
+    mm = _mapped(f, size)
+    try:
+        layout, pos = read_header(mm)
+        if layout is None:
+            return
+        while pos < size:
+            rows, used = layout.decode(mm, pos, min(size, pos + chunk))
+            if used == 0:
+                # 조각 경계에 걸친 긴 가변 레코드
+                rows, used = layout.decode(mm, pos, size)
+                if used == 0:
+                    return
+            yield from rows
+            pos += used
+    finally:
+        if isinstance(mm, mmap.mmap):
+            mm.close()
+
+
+def id_columns(f, size: int, columns: List[str]):
+    """
+    열린 바이너리 테이블에서 id 컬럼들의 숫자 부분(u32)만 NumPy int64 배열로.
+    행 dict 도 문자열도 만들지 않는다. 요청한 컬럼 중 id 형식이 아닌(넓혀진/없는) 것이 있으면 None.
+    """
+    import numpy as np  # 그래프 계산 같은 배열 소비자만 쓰므로 지역 import
+
+    mm = _mapped(f, size)
+    try:
+        layout, start = read_header(mm)
+        if layout is None or any(layout.kinds.get(c) != "id" for c in columns):
+            return None
+        if not layout.variable:
+            count = (size - start) // layout.size if layout.size else 0
+            fields = [(f"f{i}", fmt) for i, fmt in enumerate(
+                f for _, kind, _ in layout.columns if kind != "str" for f in _NP_FMT[kind])]
+            arr = np.frombuffer(mm, dtype=np.dtype(fields), count=count, offset=start)
+            out = {c: arr[f"f{layout.slot[c]}"].astype(np.int64) for c in columns}  # 복사본
+            del arr  # mmap 을 닫을 수 있게 버퍼 참조를 먼저 놓는다
+            return out
+        slots = [layout.slot[c] for c in columns]
+        vals: List[List[int]] = [[] for _ in columns]
+        for _, t in layout.records(mm, start, size):
+            for v, i in zip(vals, slots):
+                v.append(t[i])
+        return {c: np.array(v, dtype=np.int64) for c, v in zip(columns, vals)}
+    finally:
+        if isinstance(mm, mmap.mmap):
+            mm.close()
+
+
+# ----------------------------
+# CSV ↔ 바이너리 (디버깅/전환용)
+# ----------------------------
+def _csv_rows(path: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        return list(reader.fieldnames or []), rows
+
+def _csv_text(fieldnames: List[str], rows: List[Dict[str, str]]) -> str:
+    buf = io.StringIO(newline="")
+    w = csv.DictWriter(buf, fieldnames=fieldnames)
+    w.writeheader()
+    w.writerows(rows)
+    return buf.getvalue()
+
+
+def import_csv(path: str) -> Tuple[int, int, int]:
+    """
+    path(.csv) 를 같은 이름의 .bin 으로 옮긴다. 원본 CSV 는 <path>.bak 으로 남긴다.
+    되읽은 행이 원본과 하나라도 다르면 아무것도 바꾸지 않고 ValueError.
+    반환: (행 수, CSV 크기, 바이너리 크기)
+    """
+    # 순환 import 회피용 지역 import
+    from repo.csv_repo import table_lock, bump_version, storage_path, binary_path
+
+    dst = binary_path(path)
+    with table_lock(path, exclusive=True) as lf:
+        if storage_path(path) == dst and os.path.exists(dst):
+            raise ValueError(f"{path}: already stored as {dst}")
+        fieldnames, rows = _csv_rows(path)
+        layout, data = encode_all(fieldnames, rows)
+        if decode_all(data) != (fieldnames, rows):
+            raise ValueError(f"{path}: binary round-trip mismatch")
+        tmp = dst + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dst)
+        size = os.path.getsize(path)
+        os.replace(path, path + ".bak")
+        bump_version(lf, rewrite=True)
+    return len(rows), size, len(data)
+
+
+def export_csv(path: str, out=None, restore: bool = False) -> int:
+    """
+    .bin 테이블을 CSV 로 내보낸다(out 파일 객체, 기본 stdout).
+    restore=True 이면 path 자리에 CSV 를 다시 쓰고 .bin 을 지워 CSV 저장으로 되돌린다.
+    반환: 행 수
+    """
+    import sys
+    # 순환 import 회피용 지역 import
+    from repo.csv_repo import table_lock, bump_version, binary_path
+
+    src = binary_path(path)
+    with table_lock(path, exclusive=restore) as lf:
+        with open(src, "rb") as f:
+            fieldnames, rows = decode_all(f.read())
+        text = _csv_text(fieldnames, rows)
+        if restore:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            os.remove(src)
+            bump_version(lf, rewrite=True)
+    if not restore:
+        (out or sys.stdout).write(text)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    ap = argparse.ArgumentParser(description="CSV ↔ 바이너리 행 포맷 변환/비교")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="CSV → .bin (원본은 .bak)")
+    p.add_argument("tables", nargs="+")
+    p = sub.add_parser("export", help=".bin → CSV")
+    p.add_argument("table")
+    p.add_argument("-o", "--output", help="출력 파일(기본 stdout)")
+    p.add_argument("--restore", action="store_true", help="CSV 저장으로 되돌리기(.bin 삭제)")
+    p = sub.add_parser("bench", help="같은 테이블의 CSV 파싱 / 바이너리 스캔 시간 비교")
+    p.add_argument("csv")
+    p.add_argument("column")
+    p.add_argument("value")
+    args = ap.parse_args()
+
+    if args.command == "import":
+        for t in args.tables:
+            n, before, after = import_csv(t)
+            print(f"{t}: {n} rows, {before} → {after} bytes ({after / max(before, 1):.0%})")
+    elif args.command == "export":
+        if args.output and not args.restore:
+            with open(args.output, "w", encoding="utf-8", newline="") as out:
+                n = export_csv(args.table, out)
+        else:
+            n = export_csv(args.table, restore=args.restore)
+        print(f"{n} rows", file=sys.stderr)
+    else:
+        fieldnames, rows = _csv_rows(args.csv)
+        _, data = encode_all(fieldnames, rows)
+        tmp = args.csv + ".bench.bin"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            t0 = time.perf_counter()
+            with open(args.csv, "r", encoding="utf-8", newline="") as f:
+                a = sum(1 for r in csv.DictReader(f) if r[args.column] == args.value)
+            t1 = time.perf_counter()
+            with open(tmp, "rb") as f:
+                b, _ = scan(f, len(data), {args.column: args.value}, None)
+            t2 = time.perf_counter()
+        finally:
+            os.remove(tmp)
+        print(f"rows={len(rows)} matches={a}/{b} csv={(t1 - t0) * 1000:.1f}ms "
+              f"bin={(t2 - t1) * 1000:.1f}ms size {os.path.getsize(args.csv)} → {len(data)} bytes")
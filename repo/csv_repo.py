@@ -1,45 +1,694 @@
-import csv, os, json, tempfile
-from typing import Iterable, Dict, Any, List
+import csv, io, os, json, tempfile, threading, time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, Dict, Any, List, Callable, Optional, Tuple
+
+try:  # POSIX 전용. 윈도우 등에서는 잠금 없이 동작(단일 프로세스 가정)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from repo import binrow
 
 DATA_DIR = "data"
 COUNTERS = os.path.join(DATA_DIR, "counters.json")
 
-def _atomic_write(path: str, rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> None:
+# 테이블별 저장 형식: 여기 있는 테이블(확장자 뺀 파일명)은 repo/binrow 의 바이너리 행 포맷으로
+# <이름>.bin 에 저장한다. 예) SM_BINARY_TABLES=reactions,follows,post_hashtags
+# 호출 측은 계속 논리 경로(<이름>.csv)를 쓰고, 잠금 사이드카/세대 번호도 논리 경로 기준이다.
+# .bin 이 아직 없고 CSV 가 있으면 CSV 를 그대로 쓴다(전환: python -m repo.binrow import <csv>).
+BINARY_TABLES = {t.strip() for t in os.environ.get("SM_BINARY_TABLES", "").split(",") if t.strip()}
+
+# update_csv 가 버전 충돌 시 재시도하는 최대 횟수
+MAX_RETRIES = 8
+
+
+# 복제(repo/replication.py): data/_changes/ 가 있으면 이 폴더는 primary 라서 모든 쓰기를
+# 변경 스트림에 순서대로 남기고, data/_replica.json 이 있으면 읽기 전용 복제본이라 쓰기를 거부한다.
+CHANGES_DIR = os.path.join(DATA_DIR, "_changes")
+REPLICA_STATE = os.path.join(DATA_DIR, "_replica.json")
+
+
+class ConflictError(RuntimeError):
+    """낙관적 동시성 검사 실패: 읽은 뒤 다른 작성자가 테이블을 바꿨다."""
+
+
+class ReadOnlyError(RuntimeError):
+    """읽기 전용 복제본에 쓰기를 시도함 (쓰기는 primary 노드에서)"""
+
+
+def is_replica() -> bool:
+    return os.path.exists(REPLICA_STATE)
+
+def check_writable(path: str) -> None:
+    if os.path.exists(REPLICA_STATE):
+        raise ReadOnlyError(f"{path}: read-only replica")
+
+def journal_change(path: str, op: str, version: Optional[int], rows: Optional[List[Dict[str, Any]]] = None) -> None:
+    """쓰기 잠금 안에서 호출: primary 면 변경 스트림에 한 건 남긴다(테이블별 순서 = 세대 순서)"""
+    if os.path.isdir(CHANGES_DIR):
+        from repo import replication  # 순환 import 회피용 지역 import
+        replication.record(path, op, version, rows)
+
+def journal_file(path: str) -> None:
+    """csv_repo 밖에서 통째로 바꿔 쓴(rename) 파일을 변경 스트림에 남긴다. 예) 로그 보관 구간, manifest"""
+    journal_change(path, "file", None)
+
+
+# 월별 파티션(repo/partitions.py): data/<이름>/manifest.json 이 있으면 그 테이블은 작성 월별 파일로
+# 나뉘어 있으므로, 논리 경로(data/<이름>.csv)로 들어온 읽기/쓰기를 파티션 모듈로 넘긴다.
+def partition_module(path: str):
+    """파티션된 논리 테이블이면 repo.partitions 모듈, 아니면 None"""
+    if not os.path.exists(os.path.join(os.path.splitext(path)[0], "manifest.json")):
+        return None
+    from repo import partitions  # 순환 import 회피용 지역 import
+    return partitions
+
+
+# ----------------------------
+# 테이블별 잠금 + 세대(버전) 번호
+# ----------------------------
+# 각 테이블 옆에 "<table>.lock" 사이드카 파일을 두고 fcntl.flock 으로
+# 읽기(공유)/쓰기(배타) 잠금을 건다. 사이드카 내용은 "<세대> <재작성 횟수>" 이며
+# 세대는 모든 쓰기마다, 재작성 횟수는 파일 전체를 바꿔 쓸 때만 1씩 증가한다.
+# 파티션/복제/로그 보관처럼 csv_repo 밖에서 파일을 직접 다루는 모듈도 같은 규약을 쓰도록
+# table_lock / read_stamp / bump_version 은 공개한다.
+
+def _lock_path(path: str) -> str:
+    return path + ".lock"
+
+@contextmanager
+def table_lock(path: str, exclusive: bool):
+    """path 테이블의 잠금 사이드카를 공유/배타로 잡고 그 파일 객체를 넘긴다"""
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(_lock_path(path), "a+", encoding="utf-8") as lf:
+        if fcntl is not None:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield lf
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+def read_stamp(lf) -> Tuple[int, int]:
+    """잡고 있는 잠금 파일에서 (세대, 재작성 횟수)"""
+    lf.seek(0)
+    parts = lf.read().split()
+    nums = [int(p) if p.isdigit() else 0 for p in parts[:2]]
+    return (nums + [0, 0])[0], (nums + [0, 0])[1]
+
+def _read_version(lf) -> int:
+    return read_stamp(lf)[0]
+
+def bump_version(lf, rewrite: bool = False) -> int:
+    """배타 잠금 안에서 호출: 세대(재작성이면 재작성 횟수도)를 올리고 새 세대 번호를 돌려준다"""
+    v, e = read_stamp(lf)
+    v, e = v + 1, e + (1 if rewrite else 0)
+    lf.seek(0)
+    lf.truncate()
+    lf.write(f"{v} {e}")
+    lf.flush()
+    return v
+
+def binary_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".bin"
+
+def storage_path(path: str) -> str:
+    """논리 경로 → 실제로 읽고 쓰는 파일(CSV 또는 .bin)"""
+    if os.path.splitext(os.path.basename(path))[0] in BINARY_TABLES:
+        b = binary_path(path)
+        if os.path.exists(b) or not os.path.exists(path):
+            return b
+    return path
+
+def table_exists(path: str) -> bool:
+    return os.path.exists(storage_path(path)) or partition_module(path) is not None
+
+def table_version(path: str) -> int:
+    """테이블의 현재 세대 번호 (한 번도 쓰인 적 없으면 0)"""
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.version(path)
+    if not os.path.exists(_lock_path(path)):
+        return 0
+    with table_lock(path, exclusive=False) as lf:
+        return _read_version(lf)
+
+def adopt_own_writes(versions: Dict[str, int], path: str, writes: int = 1) -> bool:
+    """
+    파생 상태(versions[path] 시점에 읽은 것)에 방금 내 쓰기 writes 번을 직접 반영한 뒤 호출.
+    그 사이 다른 작성자가 없었으면(세대가 정확히 writes 만큼 증가) versions 를 갱신하고 True.
+    아니면 그대로 두어 다음 검증 때 다시 읽게 한다.
+    """
+    v = table_version(path)
+    if path in versions and versions[path] + writes == v:
+        versions[path] = v
+        return True
+    return False
+
+
+def write_tmp(path: str, rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> str:
+    """path 와 같은 폴더의 임시 파일에 path 의 저장 형식으로 행을 써 두고 그 경로를 돌려준다(rename 은 호출 측)"""
     os.makedirs(os.path.dirname(path), exist_ok=True)
     fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), text=True)
     os.close(fd)
+    if path != storage_path(path):
+        # 바이너리는 컬럼 형식을 값으로 정하므로 행을 모은 뒤 한 번에 인코딩
+        _, data = binrow.encode_all(fieldnames, list(rows))
+        with open(tmp, "wb") as f:
+            f.write(data)
+        return tmp
     with open(tmp, "w", encoding="utf-8", newline="") as f:
         w = csv.DictWriter(f, fieldnames=fieldnames)
         w.writeheader()
         for r in rows:
             w.writerow(r)
-    os.replace(tmp, path)
+    return tmp
+
+def _atomic_write(path: str, rows: Iterable[Dict[str, Any]], fieldnames: List[str],
+                  expected_version: Optional[int] = None) -> int:
+    """
+    임시 파일에 먼저 쓰고(잠금 밖), 배타 잠금은 버전 확인 + rename 동안만 잡는다.
+    expected_version 이 주어졌는데 그 사이 테이블이 바뀌었으면 ConflictError.
+    반환: 새 세대 번호
+    """
+    check_writable(path)
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.replace_all(path, rows, fieldnames, expected_version)
+    target = storage_path(path)
+    tmp = write_tmp(path, rows, fieldnames)
+    try:
+        with table_lock(path, exclusive=True) as lf:
+            if expected_version is not None and _read_version(lf) != expected_version:
+                raise ConflictError(f"{path} changed concurrently")
+            if storage_path(path) != target:  # 그 사이 저장 형식이 바뀜(import/export)
+                raise ConflictError(f"{path} changed storage format")
+            os.replace(tmp, target)
+            version = bump_version(lf, rewrite=True)
+            journal_change(path, "replace", version)
+            return version
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _snapshot(path: str) -> Tuple[bytes, int]:
+    """
+    공유 잠금은 파일을 열고 크기/버전을 확인하는 동안만 잡는다.
+    이후 읽기는 잠금 밖에서 그 시점의 크기까지만 진행하므로,
+    rename 된 새 파일이나 뒤에 붙는 append 와 섞이지 않는다.
+    """
+    with table_lock(path, exclusive=False) as lf:
+        f = open(storage_path(path), "rb")
+        size = os.fstat(f.fileno()).st_size
+        version = _read_version(lf)
+    with f:
+        return f.read(size), version
+
+def parse_csv_bytes(data: bytes) -> List[Dict[str, str]]:
+    """헤더부터 담긴 파일 내용(CSV 또는 바이너리 행 포맷) → 행 목록"""
+    if binrow.is_binary(data):
+        return binrow.decode_all(data)[1]
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"), newline="")))
 
 def read_csv(path: str) -> List[Dict[str, str]]:
-    if not os.path.exists(path):
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.read_all(path)[0]
+    if not table_exists(path):
         return []
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        return list(csv.DictReader(f))
+    data, _ = _snapshot(path)
+    return parse_csv_bytes(data)
+
+def read_csv_versioned(path: str) -> Tuple[List[Dict[str, str]], int]:
+    """read_csv + 읽은 시점의 세대 번호 (write_csv(expected_version=...) 용)"""
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.read_all(path)
+    if not table_exists(path):
+        return [], table_version(path)
+    data, version = _snapshot(path)
+    return parse_csv_bytes(data), version
 
-def write_csv(path: str, rows: List[Dict[str, Any]]) -> None:
+def write_csv(path: str, rows: List[Dict[str, Any]], expected_version: Optional[int] = None) -> int:
     fieldnames = list(rows[0].keys()) if rows else []
-    _atomic_write(path, rows, fieldnames)
+    return _atomic_write(path, rows, fieldnames, expected_version)
 
-def append_csv(path: str, row: Dict[str, Any]) -> None:
-    rows = read_csv(path)
-    fieldnames = list(rows[0].keys()) if rows else list(row.keys())
-    rows.append(row)
-    _atomic_write(path, rows, fieldnames)
+def write_csv_stream(path: str, rows: Iterable[Dict[str, Any]], fieldnames: List[str],
+                     expected_version: Optional[int] = None) -> int:
+    """행을 메모리에 모으지 않고 그대로 흘려 써서 원자적으로 교체 (대량 재작성용)"""
+    return _atomic_write(path, rows, fieldnames, expected_version)
 
-def next_id(kind: str) -> str:
+def iter_csv(path: str) -> Iterator[Dict[str, str]]:
+    """
+    read_csv 의 스트리밍 버전: 한 행씩 돌려주므로 메모리는 행 하나 크기.
+    시작 시점의 파일 크기까지만 읽어서 도중에 붙는 append 와 섞이지 않는다.
+    """
+    parts = partition_module(path)
+    if parts is not None:
+        yield from parts.iter_rows(path)
+        return
+    if not table_exists(path):
+        return
+    with table_lock(path, exclusive=False):
+        f = open(storage_path(path), "rb")
+        size = os.fstat(f.fileno()).st_size
+
+    if binrow.is_binary(f.read(len(binrow.MAGIC))):
+        with f:
+            yield from binrow.iter_rows(f, size)
+        return
+    f.seek(0)
+
+    def _lines():
+        remaining = size
+        for line in f:
+            if remaining <= 0:
+                break
+            line = line[:remaining]
+            remaining -= len(line)
+            yield line.decode("utf-8")
+
+    with f:
+        yield from csv.DictReader(_lines())
+
+def _read_header(f) -> List[str]:
+    f.seek(0)
+    first = f.readline().decode("utf-8").strip("\r\n")
+    return next(csv.reader([first]), []) if first else []
+
+def append_csv(path: str, row: Dict[str, Any]) -> int:
+    """
+    파일 끝에 한 줄만 덧붙인다(전체 재작성 없음). 배타 잠금은 이 한 줄 동안만.
+    헤더가 없는(빈) 파일이면 row 의 키로 헤더를 새로 쓴다.
+    반환: 새 세대 번호
+    """
+    return append_csv_rows(path, [row])
+
+def append_csv_rows(path: str, rows: List[Dict[str, Any]]) -> int:
+    """append_csv 의 여러 줄 버전: 한 번의 잠금/쓰기로 덧붙인다"""
+    if not rows:
+        return table_version(path)
+    check_writable(path)
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.append_rows(path, rows)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with table_lock(path, exclusive=True) as lf:
+        version = bump_version(lf, rewrite=append_locked(path, rows))
+        journal_change(path, "append", version, rows)
+        return version
+
+def append_csv_absent(path: str, rows: List[Dict[str, Any]], key: List[str]) -> List[Dict[str, Any]]:
+    """
+    rows 중 key 컬럼 값 조합이 테이블에 아직 없는 행만 덧붙인다(배치 안의 중복도 하나만).
+    있는지 확인하는 것과 덧붙이는 것을 한 번의 배타 잠금 안에서 하므로
+    여러 프로세스가 같은 행을 동시에 넣어도 한 줄만 남는다. 반환: 실제로 덧붙인 행들
+    """
+    if not rows:
+        return []
+    check_writable(path)
+    if partition_module(path) is not None:
+        added: List[Dict[str, Any]] = []
+
+        def _mutate(old: List[Dict[str, str]]):
+            added[:] = _absent(old, rows, key)
+            return old + added if added else None
+
+        update_csv(path, _mutate)
+        return added
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _tail_lock(path), table_lock(path, exclusive=True) as lf:
+        new = _absent(_refresh_tail_held(path, lf).rows, rows, key)
+        if new:
+            version = bump_version(lf, rewrite=append_locked(path, new))
+            journal_change(path, "append", version, new)
+    return new
+
+def _absent(existing: List[Dict[str, Any]], rows: List[Dict[str, Any]], key: List[str]) -> List[Dict[str, Any]]:
+    seen = {tuple(str(r.get(k, "")) for k in key) for r in existing}
+    out = []
+    for r in rows:
+        k = tuple(str(r.get(c, "")) for c in key)
+        if k not in seen:
+            seen.add(k)
+            out.append(r)
+    return out
+
+def append_locked(path: str, rows: List[Dict[str, Any]]) -> bool:
+    """배타 잠금 안에서 호출. 반환: 파일을 새로 썼으면(헤더 생성, 바이너리 형식 확장) True"""
+    target = storage_path(path)
+    if target != path:
+        return _append_binary(target, rows)
+    with open(path, "a+b") as f:
+        fieldnames = _read_header(f)
+        buf = io.StringIO(newline="")
+        w = csv.DictWriter(buf, fieldnames=fieldnames or list(rows[0].keys()))
+        rewrote = not fieldnames
+        if rewrote:
+            f.truncate(0)
+            w.writeheader()
+        else:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    buf.write("\r\n")
+        w.writerows(rows)
+        f.seek(0, os.SEEK_END)
+        f.write(buf.getvalue().encode("utf-8"))
+    return rewrote
+
+def _append_binary(target: str, rows: List[Dict[str, Any]]) -> bool:
+    """
+    바이너리 테이블 끝에 레코드를 덧붙인다(배타 잠금 안에서 호출).
+    헤더가 없거나 기존 컬럼 형식에 맞지 않는 값이 오면 넓힌 형식으로 파일을 새로 써서 교체한다.
+    반환: 파일을 재작성했으면 True
+    """
+    with open(target, "a+b") as f:
+        f.seek(0)
+        head = f.read(1 << 16)
+        layout, _ = binrow.read_header(head)
+        if layout is not None and layout.fieldnames:
+            try:
+                data = b"".join(layout.encode(r) for r in rows)
+            except binrow.Unfit:
+                pass
+            else:
+                f.seek(0, os.SEEK_END)
+                f.write(data)
+                return False
+        f.seek(0)
+        fieldnames, old = binrow.decode_all(f.read())
+    _, data = binrow.encode_all(fieldnames or list(rows[0].keys()), old + list(rows))
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, target)
+    return True
+
+def update_csv(path: str, mutate: Callable[[List[Dict[str, str]]], Optional[List[Dict[str, Any]]]],
+               retries: int = MAX_RETRIES) -> Optional[List[Dict[str, Any]]]:
+    """
+    읽기-수정-쓰기를 낙관적 동시성으로 수행한다.
+    - mutate(rows) 가 새 rows 를 돌려주면 저장, None 이면 변경 없음
+    - 저장 직전 버전이 바뀌었으면(다른 프로세스가 씀) 다시 읽어서 mutate 재실행
+    mutate 는 재시도될 수 있으므로 부수효과(로그 기록 등)를 넣지 말 것.
+    반환: 저장된 rows (변경 없으면 None)
+    """
+    check_writable(path)
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.update(path, mutate)
+    for attempt in range(retries):
+        rows, version = read_csv_versioned(path)
+        fieldnames = list(rows[0].keys()) if rows else []
+        new_rows = mutate(rows)
+        if new_rows is None:
+            return None
+        if new_rows:
+            fieldnames = list(new_rows[0].keys())
+        try:
+            _atomic_write(path, new_rows, fieldnames, expected_version=version)
+            return new_rows
+        except ConflictError:
+            time.sleep(0.005 * (attempt + 1))
+    raise ConflictError(f"{path}: too many concurrent writers")
+
+# ----------------------------
+# 증분(tail) 읽기: 뒤에 붙은 바이트만 파싱
+# ----------------------------
+# 테이블별로 (inode, 재작성 횟수, 헤더, 파싱한 바이트 오프셋, 행들)을 기억해 두고
+# 다음 읽기에서는 오프셋 이후에 append 된 부분만 파싱한다.
+# 파일이 줄었거나, inode/재작성 횟수/헤더가 바뀌었으면 전체를 다시 읽는다.
+# 반환되는 행 dict 는 캐시와 공유되므로 읽기 전용으로만 쓸 것(수정이 필요하면 read_csv).
+
+class _TailState:
+    __slots__ = ("ino", "epoch", "header", "fieldnames", "offset", "rows", "generation")
+
+    def __init__(self):
+        self.ino = None
+        self.epoch = -1
+        self.header = b""
+        self.fieldnames: List[str] = []
+        self.offset = 0
+        self.rows: List[Dict[str, str]] = []
+        self.generation = 0
+
+_tail_states: Dict[str, _TailState] = {}
+_tail_seeds: Dict[str, Tuple[dict, Callable[[], Tuple[List[str], List[Dict[str, str]]]]]] = {}
+_tail_locks: Dict[str, threading.Lock] = {}
+_tail_guard = threading.Lock()
+_generations = iter(range(1, 1 << 62))
+
+def next_generation() -> int:
+    """캐시 내용이 통째로 바뀔 때마다 새로 받는 번호(프로세스 안에서 유일)"""
+    return next(_generations)
+
+def _tail_lock(path: str) -> threading.Lock:
+    with _tail_guard:
+        return _tail_locks.setdefault(path, threading.Lock())
+
+def _full_load(st: _TailState, data: bytes, ino, epoch: int) -> None:
+    st.ino, st.epoch = ino, epoch
+    st.generation = next_generation()
+    if binrow.is_binary(data):
+        layout, start = binrow.read_header(data)
+        st.header = data[:start]
+        st.fieldnames = list(layout.fieldnames) if layout else []
+        st.rows, used = layout.decode(data, start, len(data)) if layout else ([], 0)
+        st.offset = start + used
+        return
+    nl = data.find(b"\n")
+    st.header = data[:nl + 1] if nl >= 0 else data
+    text = data.decode("utf-8")
+    reader = csv.DictReader(io.StringIO(text, newline=""))
+    st.rows = list(reader)
+    st.fieldnames = list(reader.fieldnames or [])
+    st.offset = len(data)
+
+def refresh_tail(path: str) -> _TailState:
+    """path 의 꼬리 캐시를 파일과 맞춘 뒤 돌려준다(rows/generation 은 읽기 전용)"""
+    with _tail_lock(path):
+        return _refresh_tail_held(path)
+
+def _refresh_tail_held(path: str, lf=None) -> _TailState:
+    """
+    _tail_lock(path) 안에서 호출. lf 는 호출 측이 이미 잡고 있는 테이블 잠금 파일
+    (없으면 여기서 공유 잠금을 잠깐 잡는다). 잠금 순서는 항상 _tail_lock → 테이블 잠금.
+    """
+    st = _tail_states.get(path)
+    if st is None:
+        st = _tail_states[path] = _TailState()
+        seed = _tail_seeds.pop(path, None)
+        if seed is not None:
+            _apply_seed(st, *seed)
+    if not table_exists(path):
+        if st.ino is not None or st.rows:
+            _full_load(st, b"", None, -1)
+        return st
+    with (nullcontext(lf) if lf is not None else table_lock(path, exclusive=False)) as held:
+        f = open(storage_path(path), "rb")
+        stat = os.fstat(f.fileno())
+        epoch = read_stamp(held)[1]
+    with f:
+        size = stat.st_size
+        rewritten = (
+            st.ino != (stat.st_dev, stat.st_ino)
+            or st.epoch != epoch
+            or size < st.offset
+            or not st.header
+        )
+        if not rewritten and size == st.offset:
+            return st
+        if not rewritten and f.read(len(st.header)) != st.header:
+            rewritten = True
+        if rewritten:
+            f.seek(0)
+            _full_load(st, f.read(size), (stat.st_dev, stat.st_ino), epoch)
+            return st
+        f.seek(st.offset)
+        chunk = f.read(size - st.offset)
+        if binrow.is_binary(st.header):
+            layout, _ = binrow.read_header(st.header)
+            rows, used = layout.decode(chunk, 0, len(chunk))
+            st.rows.extend(rows)
+            st.offset += used
+            return st
+        # 잠금 없이 쓰는 환경(윈도우)을 대비해 완성된 줄까지만 소비
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return st
+        text = chunk[:end].decode("utf-8")
+        st.rows.extend(csv.DictReader(io.StringIO(text, newline=""), fieldnames=st.fieldnames))
+        st.offset += end
+        return st
+
+def _apply_seed(st: _TailState, meta: dict, load: Callable[[], Tuple[List[str], List[Dict[str, str]]]]) -> None:
+    try:
+        fieldnames, rows = load()
+    except Exception:  # 깨진 스냅샷이면 평소처럼 처음부터 읽는다
+        return
+    st.fieldnames, st.rows = list(fieldnames), rows
+    st.header, st.offset = meta["header"], meta["offset"]
+    st.ino, st.epoch = (meta["dev"], meta["ino"]), meta["epoch"]
+    st.generation = next_generation()
+
+
+def seed_tail_cache(path: str, meta: dict, load: Callable[[], Tuple[List[str], List[Dict[str, str]]]]) -> bool:
+    """
+    스냅샷에서 꺼낸 캐시 상태를 등록한다(실제 역직렬화 load() 는 그 테이블을 처음 읽을 때).
+    meta: dev/ino/epoch/offset/header — 이후 refresh_tail 이 평소처럼 검증하고
+    offset 뒤에 붙은 행만 이어서 읽는다. 이미 캐시가 있으면 등록하지 않는다.
+    """
+    with _tail_lock(path):
+        if path in _tail_states:
+            return False
+        _tail_seeds[path] = (meta, load)
+        return True
+
+
+def export_tail_caches() -> List[Tuple[str, dict, List[str], List[Dict[str, str]]]]:
+    """스냅샷용: 로드된 캐시마다 (경로, meta, fieldnames, rows). rows 는 그 시점 목록의 복사본"""
+    out = []
+    with _tail_guard:
+        paths = list(_tail_states)
+    for path in paths:
+        with _tail_lock(path):
+            st = _tail_states[path]
+            if st.ino is None or not st.header:
+                continue
+            meta = {"dev": st.ino[0], "ino": st.ino[1], "epoch": st.epoch,
+                    "offset": st.offset, "header": st.header}
+            out.append((path, meta, list(st.fieldnames), list(st.rows)))
+    return out
+
+
+def cursor_at(path: str, count: int, dev: int, ino: int, epoch: int) -> Optional[Tuple[int, int]]:
+    """
+    다른 프로세스(스냅샷)가 "count 행까지 읽었다"고 기록한 위치를 이 프로세스의 read_csv_since cursor 로.
+    그 뒤 파일이 재작성됐으면 None.
+    """
+    st = refresh_tail(path)
+    if st.ino == (dev, ino) and st.epoch == epoch and count <= len(st.rows):
+        return st.generation, count
+    return None
+
+
+def _scan(path: str, where: Dict[str, str], column: Optional[str]) -> Tuple[int, List[str]]:
+    if storage_path(path) == path:
+        rows = [r for r in read_csv_cached(path) if all(r.get(k) == v for k, v in where.items())]
+        return len(rows), [r[column] for r in rows] if column else []
+    with table_lock(path, exclusive=False):
+        target = storage_path(path)
+        if not os.path.exists(target):
+            return 0, []
+        f = open(target, "rb")
+        size = os.fstat(f.fileno()).st_size
+    with f:
+        if not binrow.is_binary(f.read(len(binrow.MAGIC))):
+            return 0, []
+        return binrow.scan(f, size, where, column)
+
+def select_where(path: str, column: str, where: Dict[str, str]) -> List[str]:
+    """
+    where 의 컬럼=값을 모두 만족하는 행들의 column 값.
+    바이너리 테이블은 행 dict 를 만들지 않고 mmap 위에서 정수 비교로 찾는다(CSV 는 증분 캐시에서).
+    """
+    return _scan(path, where, column)[1]
+
+def count_where(path: str, where: Dict[str, str]) -> int:
+    """where 의 컬럼=값을 모두 만족하는 행 수 (select_where 와 같은 경로)"""
+    return _scan(path, where, None)[0]
+
+def read_id_columns(path: str, columns: List[str]) -> Dict[str, Any]:
+    """
+    id 컬럼들('u_0012' 꼴)의 숫자 부분을 NumPy int64 배열로 (숫자가 없으면 0, 행 순서 유지).
+    바이너리 테이블은 레코드에서 바로 꺼내고, CSV(또는 넓혀진 컬럼)는 증분 캐시 행에서 변환한다.
+    """
+    import numpy as np  # 배열이 필요한 호출 측(추천 그래프 등)만 부르므로 지역 import
+    from utils.ids import id_num
+
+    if storage_path(path) != path:
+        with table_lock(path, exclusive=False):
+            target = storage_path(path)
+            f = open(target, "rb") if os.path.exists(target) else None
+            size = os.fstat(f.fileno()).st_size if f else 0
+        if f is not None:
+            with f:
+                if binrow.is_binary(f.read(len(binrow.MAGIC))):
+                    cols = binrow.id_columns(f, size, columns)
+                    if cols is not None:
+                        return cols
+    rows = read_csv_cached(path)
+    return {c: np.fromiter((id_num(r.get(c, "")) for r in rows), dtype=np.int64, count=len(rows))
+            for c in columns}
+
+def read_csv_cached(path: str) -> List[Dict[str, str]]:
+    """read_csv 와 같은 결과를 증분 캐시로 돌려준다 (행 dict 는 읽기 전용)"""
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.cached_rows(path)
+    st = refresh_tail(path)
+    return list(st.rows)
+
+def read_csv_since(path: str, cursor: Optional[Tuple[int, int]] = None
+                   ) -> Tuple[List[Dict[str, str]], Tuple[int, int], bool]:
+    """
+    cursor 이후에 추가된 행만 돌려준다. cursor 는 (세대, 읽은 행 수).
+    반환: (새 행들, 다음 cursor, reset)
+    - reset=True 이면 파일이 재작성된 것이므로 새 행들 = 전체 행, 파생 상태를 새로 만들 것
+    """
+    parts = partition_module(path)
+    if parts is not None:
+        return parts.rows_since(path, cursor)
+    st = refresh_tail(path)
+    rows = st.rows
+    if cursor is None or cursor[0] != st.generation or cursor[1] > len(rows):
+        return list(rows), (st.generation, len(rows)), True
+    return rows[cursor[1]:], (st.generation, len(rows)), False
+
+# next_id 종류 → id 접두어 ("p_0012")
+ID_PREFIX = {"user": "u", "post": "p", "repost": "r", "comment": "c", "log": "l"}
+
+def _update_counters(change: Callable[[Dict[str, int]], bool]) -> Dict[str, int]:
+    """counters.json 을 배타 잠금 안에서 읽고 change(data) 가 True 면 원자적으로 교체. 반환: 최종 내용"""
+    check_writable(COUNTERS)
     os.makedirs(DATA_DIR, exist_ok=True)
-    data = {}
-    if os.path.exists(COUNTERS):
-        with open(COUNTERS, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    n = int(data.get(kind, 0)) + 1
-    data[kind] = n
-    with open(COUNTERS, "w", encoding="utf-8") as f:
-        json.dump(data, f)
-    prefix = {"user": "u", "post": "p", "repost": "r", "comment": "c", "log": "l"}.get(kind, "x")
-    return f"{prefix}_{n:04d}"
+    with table_lock(COUNTERS, exclusive=True) as lf:
+        data = {}
+        if os.path.exists(COUNTERS):
+            with open(COUNTERS, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        if change(data):
+            fd, tmp = tempfile.mkstemp(dir=DATA_DIR, text=True)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, COUNTERS)
+            bump_version(lf)
+            journal_file(COUNTERS)
+    return data
+
+def next_id(kind: str) -> str:
+    def _inc(data: Dict[str, int]) -> bool:
+        data[kind] = int(data.get(kind, 0)) + 1
+        return True
+
+    n = _update_counters(_inc)[kind]
+    return f"{ID_PREFIX.get(kind, 'x')}_{n:04d}"
+
+def raise_counters(floors: Dict[str, int]) -> Dict[str, int]:
+    """각 종류의 카운터를 floors 값 이상으로 올린다(이미 크면 그대로). 반환: 올린 {종류: 새 값}"""
+    raised: Dict[str, int] = {}
+
+    def _raise(data: Dict[str, int]) -> bool:
+        raised.clear()
+        for kind, floor in floors.items():
+            if int(data.get(kind, 0)) < floor:
+                data[kind] = raised[kind] = floor
+        return bool(raised)
+
+    _update_counters(_raise)
+    return raised
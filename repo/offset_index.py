@@ -0,0 +1,225 @@
+# repo/offset_index.py
+# 테이블별 기본키(첫 번째 컬럼) → 바이트 오프셋 인덱스.
+# "<table>.idx" 에 (id 숫자, 행 시작 오프셋) 16바이트 레코드를 id 순으로 저장하고,
+# 점 조회는 인덱스를 이진 탐색한 뒤 테이블을 mmap 해서 그 한 줄만 디코딩한다.
+# - 테이블이 재작성되면(inode/재작성 횟수 변경, 크기 감소) 전체 재생성
+# - 뒤에 append 만 됐으면 늘어난 부분만 훑어서 인덱스에 추가
+import csv
+import io
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from repo.csv_repo import table_lock, read_stamp, partition_module
+from utils.ids import id_num
+
+_MAGIC = b"SMIDX001"
+_HDR = struct.Struct("<8sQQQQQQ")   # magic, dev, ino, epoch, indexed_size, count, data_start
+_REC = struct.Struct("<QQ")         # id 숫자, 오프셋
+
+
+def _idx_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _scan(mm, start: int, end: int) -> List[Tuple[int, int]]:
+    """start~end 구간의 CSV 레코드 시작 위치와 첫 컬럼 id 숫자 (따옴표 안 줄바꿈 고려)"""
+    out = []
+    pos = start
+    while pos < end:
+        rec_start = pos
+        quotes = 0
+        while True:
+            nl = mm.find(b"\n", pos, end)
+            stop = end if nl < 0 else nl + 1
+            quotes += mm[pos:stop].count(b'"')
+            pos = stop
+            if quotes % 2 == 0 or nl < 0:
+                break
+        if pos - rec_start <= 2 and not mm[rec_start:pos].strip():
+            continue  # 빈 줄
+        comma = mm.find(b",", rec_start, pos)
+        first = mm[rec_start:comma if comma >= 0 else pos].strip().strip(b'"')
+        out.append((id_num(first.decode("utf-8")), rec_start))
+    return out
+
+
+def _read_header_line(mm) -> Tuple[List[str], int]:
+    nl = mm.find(b"\n")
+    end = len(mm) if nl < 0 else nl + 1
+    line = mm[:end].decode("utf-8").strip("\r\n")
+    return (next(csv.reader([line]), []) if line else []), end
+
+
+def _write_index(path: str, meta: Tuple[int, int, int, int, int], recs: List[Tuple[int, int]]) -> None:
+    recs.sort(key=lambda r: r[0])  # 안정 정렬: 같은 id 면 나중에 붙은 행이 뒤
+    tmp = _idx_path(path) + ".tmp"
+    with open(tmp, "wb") as f:
+        dev, ino, epoch, size, data_start = meta
+        f.write(_HDR.pack(_MAGIC, dev, ino, epoch, size, len(recs), data_start))
+        f.write(b"".join(_REC.pack(k, o) for k, o in recs))
+    os.replace(tmp, _idx_path(path))
+
+
+def _read_index_header(path: str) -> Optional[tuple]:
+    try:
+        with open(_idx_path(path), "rb") as f:
+            raw = f.read(_HDR.size)
+    except FileNotFoundError:
+        return None
+    if len(raw) < _HDR.size:
+        return None
+    hdr = _HDR.unpack(raw)
+    return hdr if hdr[0] == _MAGIC else None
+
+
+def _load_records(path: str, count: int) -> List[Tuple[int, int]]:
+    with open(_idx_path(path), "rb") as f:
+        f.seek(_HDR.size)
+        data = f.read(count * _REC.size)
+    return list(_REC.iter_unpack(data))
+
+
+def _append_in_place(path: str, hdr: tuple, new_recs: List[Tuple[int, int]], size: int) -> bool:
+    """
+    새 id 들이 기존 마지막 id 이상이고 정렬돼 있으면(보통의 append) 레코드만 덧붙이고
+    헤더를 마지막에 갱신한다. 헤더보다 레코드를 먼저 쓰므로 동시 읽기는 옛 count 까지만 본다.
+    """
+    keys = [k for k, _ in new_recs]
+    if keys != sorted(keys):
+        return False
+    count = hdr[5]
+    with open(_idx_path(path), "r+b") as f:
+        if count and keys:
+            f.seek(_HDR.size + (count - 1) * _REC.size)
+            last_key, _ = _REC.unpack(f.read(_REC.size))
+            if keys[0] < last_key:
+                return False
+        f.seek(_HDR.size + count * _REC.size)
+        f.write(b"".join(_REC.pack(k, o) for k, o in new_recs))
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(_HDR.pack(_MAGIC, hdr[1], hdr[2], hdr[3], size, count + len(new_recs), hdr[6]))
+    return True
+
+
+def _ensure_index(path: str, tmm, stat, epoch: int) -> Optional[tuple]:
+    """인덱스가 테이블 현재 상태를 덮도록 재생성/확장. 반환: 인덱스 헤더"""
+    hdr = _read_index_header(path)
+    size = stat.st_size
+    if hdr and (hdr[1], hdr[2], hdr[3]) == (stat.st_dev, stat.st_ino, epoch) and hdr[4] == size:
+        return hdr
+    with table_lock(_idx_path(path), exclusive=True):
+        hdr = _read_index_header(path)  # 다른 프로세스가 먼저 갱신했을 수 있음
+        same_file = hdr and (hdr[1], hdr[2], hdr[3]) == (stat.st_dev, stat.st_ino, epoch) and hdr[4] <= size
+        if same_file and hdr[4] == size:
+            return hdr
+        if same_file:
+            new_recs = _scan(tmm, hdr[4], size)
+            if _append_in_place(path, hdr, new_recs, size):
+                return _read_index_header(path)
+            recs = _load_records(path, hdr[5]) + new_recs
+            data_start = hdr[6]
+        else:
+            _, data_start = _read_header_line(tmm)
+            recs = _scan(tmm, data_start, size)
+        _write_index(path, (stat.st_dev, stat.st_ino, epoch, size, data_start), recs)
+    return _read_index_header(path)
+
+
+def _find_offset(imm, count: int, key: int) -> Optional[int]:
+    """mmap 한 인덱스에서 key 의 마지막 레코드 오프셋을 이진 탐색"""
+    lo, hi = 0, count
+    while lo < hi:  # bisect_right
+        mid = (lo + hi) // 2
+        k, _ = _REC.unpack_from(imm, _HDR.size + mid * _REC.size)
+        if k <= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == 0:
+        return None
+    k, off = _REC.unpack_from(imm, _HDR.size + (lo - 1) * _REC.size)
+    return off if k == key else None
+
+
+def _decode_at(tmm, offset: int, end: int) -> List[str]:
+    pos = offset
+    quotes = 0
+    while True:
+        nl = tmm.find(b"\n", pos, end)
+        stop = end if nl < 0 else nl + 1
+        quotes += tmm[pos:stop].count(b'"')
+        pos = stop
+        if quotes % 2 == 0 or nl < 0:
+            break
+    text = tmm[offset:pos].decode("utf-8")
+    return next(csv.reader(io.StringIO(text, newline="")), [])
+
+
+def lookup_row(path: str, entity_id: str) -> Optional[Dict[str, str]]:
+    """
+    첫 번째 컬럼이 entity_id 인 행 하나를 돌려준다(없으면 None).
+    테이블 전체를 파싱하지 않고 인덱스 + mmap 으로 해당 줄만 읽는다.
+    """
+    if not entity_id:
+        return None
+    return lookup_rows(path, [entity_id]).get(entity_id)
+
+
+def lookup_rows(path: str, entity_ids: Iterable[str], _retry: bool = True) -> Dict[str, Dict[str, str]]:
+    """
+    여러 id 를 한 번에 조회: 테이블/인덱스를 한 번만 열고 mmap 해서 id 마다 한 줄씩 디코딩.
+    반환: 찾은 id → 행 (없는 id 는 빠진다)
+    """
+    wanted = [i for i in dict.fromkeys(entity_ids) if i]
+    parts = partition_module(path) if wanted else None
+    if parts is not None:
+        return parts.lookup_rows(path, wanted)  # 월별 id 범위로 파티션을 고른 뒤 그 파티션 인덱스에서
+    if not wanted or not os.path.exists(path):
+        return {}
+    with table_lock(path, exclusive=False) as lf:
+        f = open(path, "rb")
+        stat = os.fstat(f.fileno())
+        epoch = read_stamp(lf)[1]
+    found: Dict[str, Dict[str, str]] = {}
+    stale = False
+    with f:
+        if stat.st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as tmm:
+            size = stat.st_size
+            hdr = _ensure_index(path, tmm, stat, epoch)
+            fieldnames, _ = _read_header_line(tmm)
+            if hdr is None or hdr[5] == 0 or not fieldnames:
+                return {}
+            with open(_idx_path(path), "rb") as xf, \
+                    mmap.mmap(xf.fileno(), 0, access=mmap.ACCESS_READ) as imm:
+                # 그 사이 다른 프로세스가 인덱스를 다시 썼어도 파일 범위 밖은 읽지 않는다
+                count = min(hdr[5], (len(imm) - _HDR.size) // _REC.size)
+                for entity_id in wanted:
+                    offset = _find_offset(imm, count, id_num(entity_id))
+                    if offset is None:
+                        continue
+                    values = _decode_at(tmm, offset, size)
+                    row = dict(zip(fieldnames, values + [""] * (len(fieldnames) - len(values))))
+                    row_id = row.get(fieldnames[0], "")
+                    if row_id == entity_id:
+                        found[entity_id] = row
+                    elif id_num(row_id) != id_num(entity_id):
+                        stale = True
+                    # 번호는 같고 접두어/자릿수만 다름('zz_0001' 로 'p_0001' 자리를 찾음): 인덱스는 맞고 그런 id 가 없을 뿐
+    if stale and _retry:
+        # csv_repo 를 거치지 않고 파일이 바뀐 경우: 인덱스를 버리고 한 번만 다시 만든다
+        drop_index(path)
+        return lookup_rows(path, wanted, _retry=False)
+    return found
+
+
+def drop_index(path: str) -> None:
+    try:
+        os.remove(_idx_path(path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,409 @@
+# repo/partitions.py
+# 작성 시각(created_at) 월별 파티션: 게시물/댓글처럼 계속 쌓이기만 하는 테이블을
+# data/<이름>/YYYY-MM.csv 로 나누고 data/<이름>/manifest.json 에 월별 요약을 둔다.
+#   manifest = {"version": 세대, "fieldnames": [...],
+#               "partitions": {"2025-08": {"rows", "min_id", "max_id", "min_at", "max_at"}}}
+# - 호출 측은 계속 논리 경로(data/posts.csv)를 쓰고, csv_repo / offset_index 가 manifest 를 보면 여기로 넘긴다
+# - 파티션 파일 하나하나는 평범한 csv_repo 테이블(잠금 사이드카, 증분 캐시, 오프셋 인덱스, 변경 스트림)이다
+# - 쓰기는 논리 경로의 잠금(data/posts.csv.lock)을 배타로 잡고 파티션 → manifest 순으로 바꾼다.
+#   논리 테이블의 세대 번호는 manifest 의 version (manifest 가 변경 스트림으로 복제되므로 복제본도 같은 값)
+# - 최근 글만 필요한 읽기(피드, 기간 필터, 프로필)는 recent_chunks 로 최근 월부터 훑다가 멈추고,
+#   id 조회는 월별 id 범위(min_id~max_id)로 해당 파티션만 찾는다
+# 전환: python -m repo.partitions split            # posts, comments 를 월별로 나눔
+#       python -m repo.partitions status
+#       python -m repo.partitions merge posts      # 되돌리기(복제를 쓰지 않는 단독 노드에서만)
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from repo import binrow
+from repo.csv_repo import (
+    DATA_DIR, CHANGES_DIR, ConflictError, table_lock, read_stamp, refresh_tail, next_generation, write_tmp,
+    parse_csv_bytes, storage_path, check_writable, is_replica, journal_file,
+    read_csv, read_csv_cached, iter_csv, append_csv_rows, write_csv_stream,
+)
+from utils.ids import id_num
+
+# 월별로 나눌 수 있는 테이블(확장자 뺀 파일명). 첫 컬럼이 id, created_at 이 작성 시각이어야 한다
+TABLES = ("posts", "comments")
+TIME_COLUMN = "created_at"
+MANIFEST = "manifest.json"
+# 작성 시각을 읽을 수 없는 행이 모이는 파티션(가장 오래된 월로 취급)
+UNDATED = "0000-00"
+
+
+def partition_dir(path: str) -> str:
+    return os.path.splitext(path)[0]
+
+def manifest_path(path: str) -> str:
+    return os.path.join(partition_dir(path), MANIFEST)
+
+def part_path(path: str, month: str) -> str:
+    return os.path.join(partition_dir(path), f"{month}.csv")
+
+def month_of(row: Dict[str, Any]) -> str:
+    """created_at('2025-08-13T10:11:24+09:00') → '2025-08' (KST 기준 문자열 그대로)"""
+    s = str(row.get(TIME_COLUMN) or "")
+    if len(s) >= 7 and s[4] == "-" and s[:4].isdigit() and s[5:7].isdigit():
+        return s[:7]
+    return UNDATED
+
+
+# ----------------------------
+# manifest
+# ----------------------------
+# 읽을 때마다 JSON 을 파싱하지 않도록 (inode, mtime, 크기) 가 같으면 파싱해 둔 dict 를 재사용한다.
+# manifest 는 항상 새 파일로 rename 되므로 바뀌면 inode 가 달라진다. 반환 dict 는 읽기 전용.
+_manifests: Dict[str, Tuple[tuple, dict]] = {}
+
+def load_manifest(path: str) -> Optional[dict]:
+    """논리 경로의 manifest (파티션되지 않은 테이블이면 None)"""
+    mp = manifest_path(path)
+    try:
+        st = os.stat(mp)
+    except FileNotFoundError:
+        return None
+    key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+    hit = _manifests.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    with open(mp, "r", encoding="utf-8") as f:
+        m = json.load(f)
+    _manifests[path] = (key, m)
+    return m
+
+def _editable(path: str) -> dict:
+    """쓰기 잠금 안에서 고칠 manifest 사본"""
+    m = load_manifest(path)
+    if m is None:
+        raise RuntimeError(f"{path} is not partitioned")
+    return {**m, "fieldnames": list(m.get("fieldnames") or []),
+            "partitions": {k: dict(v) for k, v in m["partitions"].items()}}
+
+def _write_manifest(path: str, m: dict) -> None:
+    target = manifest_path(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), text=True)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(m, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, target)
+    journal_file(target)
+
+def version(path: str) -> int:
+    m = load_manifest(path)
+    return int(m["version"]) if m else 0
+
+def months(path: str) -> List[str]:
+    """manifest 에 있는 월(오래된 순)"""
+    m = load_manifest(path)
+    return sorted(m["partitions"]) if m else []
+
+def _stats(rows: List[Dict[str, Any]], id_column: str) -> Dict[str, Any]:
+    if not rows:
+        return {"rows": 0}
+    ids = [id_num(str(r.get(id_column) or "")) for r in rows]
+    ats = [str(r.get(TIME_COLUMN) or "") for r in rows]
+    return {"rows": len(rows), "min_id": min(ids), "max_id": max(ids), "min_at": min(ats), "max_at": max(ats)}
+
+def _merge_stats(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    if not old or not old.get("rows"):
+        return new
+    return {"rows": old["rows"] + new["rows"],
+            "min_id": min(old["min_id"], new["min_id"]), "max_id": max(old["max_id"], new["max_id"]),
+            "min_at": min(old["min_at"], new["min_at"]), "max_at": max(old["max_at"], new["max_at"])}
+
+def _group(rows) -> Dict[str, List[Dict[str, Any]]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault(month_of(r), []).append(r)
+    return groups
+
+
+# ----------------------------
+# 읽기 (csv_repo 의 같은 이름 함수가 파티션된 테이블이면 여기로 넘긴다)
+# ----------------------------
+def read_all(path: str) -> Tuple[List[Dict[str, str]], int]:
+    """전체 행(오래된 월부터) + 그 시점의 세대. 논리 잠금을 공유로 잡아 쓰기 도중 상태를 보지 않는다"""
+    with table_lock(path, exclusive=False):
+        m = load_manifest(path)
+        rows: List[Dict[str, str]] = []
+        for month in sorted(m["partitions"]):
+            rows.extend(read_csv(part_path(path, month)))
+        return rows, int(m["version"])
+
+def iter_rows(path: str) -> Iterator[Dict[str, str]]:
+    """시작 시점 manifest 의 파티션들을 오래된 월부터 한 행씩"""
+    for month in months(path):
+        yield from iter_csv(part_path(path, month))
+
+def files(path: str) -> List[str]:
+    """테이블을 이루는 실제 CSV 파일들(파티션되지 않았으면 그 파일 하나). pandas 등으로 직접 읽을 때"""
+    if load_manifest(path) is None:
+        return [path] if os.path.exists(path) else []
+    return [p for p in (part_path(path, m) for m in months(path)) if os.path.exists(p)]
+
+def recent_chunks(path: str, since: Optional[str] = None) -> Iterator[List[Dict[str, str]]]:
+    """
+    최근 월부터 파티션 하나씩의 행 목록(증분 캐시, 읽기 전용). since(ISO 시각)보다 전에 끝난 월에서 멈춘다.
+    호출 측은 필요한 만큼 채웠으면 그만 받으면 된다(더 오래된 파티션은 읽지 않음).
+    파티션되지 않은 테이블이면 전체를 한 덩어리로.
+    """
+    m = load_manifest(path)
+    if m is None:
+        yield read_csv_cached(path)
+        return
+    parts = m["partitions"]
+    for month in sorted(parts, reverse=True):
+        s = parts[month]
+        if not s.get("rows"):
+            continue
+        if since and s["max_at"] < since:
+            break  # 월 순서 = 작성 시각 순서라 이보다 오래된 월도 모두 since 이전
+        yield read_csv_cached(part_path(path, month))
+
+def lookup_rows(path: str, entity_ids: List[str]) -> Dict[str, Dict[str, str]]:
+    """
+    id → 파티션: 월별 id 범위에 드는 파티션만 오프셋 인덱스로 조회(최근 월부터).
+    id 는 작성 순서로 늘어나므로 보통 파티션 하나만 연다.
+    """
+    from repo.offset_index import lookup_rows as lookup_part  # 순환 import 회피용 지역 import
+    m = load_manifest(path)
+    remaining = {i: id_num(i) for i in entity_ids}
+    found: Dict[str, Dict[str, str]] = {}
+    for month in sorted(m["partitions"], reverse=True):
+        s = m["partitions"][month]
+        if not s.get("rows"):
+            continue
+        hit = [i for i, n in remaining.items() if s["min_id"] <= n <= s["max_id"]]
+        if not hit:
+            continue
+        rows = lookup_part(part_path(path, month), hit)
+        found.update(rows)
+        for i in rows:
+            remaining.pop(i, None)
+        if not remaining:
+            break
+    return found
+
+
+# ----------------------------
+# 증분 캐시 (read_csv_cached / read_csv_since)
+# ----------------------------
+# 파티션별 증분 캐시(csv_repo 의 tail 상태)를 월 순서로 이어 붙인 목록을 manifest 세대별로 기억한다.
+# 앞쪽 파티션은 그대로이고 마지막 파티션(또는 새 월)에 행이 붙기만 했으면 목록 끝에 이어 붙이고
+# 세대(generation)를 유지하므로 read_csv_since 의 cursor 도 평면 테이블과 똑같이 이어진다.
+
+class _Combined:
+    __slots__ = ("version", "parts", "rows", "generation")
+
+    def __init__(self):
+        self.version = -1
+        self.parts: List[Tuple[str, int, int]] = []   # (월, 파티션 캐시 세대, 행 수)
+        self.rows: List[Dict[str, str]] = []
+        self.generation = 0
+
+_combined: Dict[str, _Combined] = {}
+_combined_guard = threading.Lock()
+
+def _appended(old: List[Tuple[str, int, int]], new: List[Tuple[str, int, int]]) -> bool:
+    if not old:
+        return True
+    if len(new) < len(old):
+        return False
+    if (old[-1][:2] != new[len(old) - 1][:2] or old[-1][2] > new[len(old) - 1][2]):
+        return False
+    return old[:-1] == new[:len(old) - 1]
+
+def _refresh(path: str) -> _Combined:
+    m = load_manifest(path)
+    st = _combined.get(path)
+    if st is not None and st.version == m["version"]:
+        return st
+    with _combined_guard:
+        st = _combined.setdefault(path, _Combined())
+        if st.version == m["version"]:
+            return st
+        tails = [refresh_tail(part_path(path, month)) for month in sorted(m["partitions"])]
+        parts = [(month, t.generation, len(t.rows)) for month, t in zip(sorted(m["partitions"]), tails)]
+        if st.generation and _appended(st.parts, parts):
+            start = max(len(st.parts) - 1, 0)
+            for i in range(start, len(parts)):
+                done = st.parts[i][2] if i < len(st.parts) else 0
+                st.rows.extend(tails[i].rows[done:parts[i][2]])
+        else:
+            st.rows = [r for t, p in zip(tails, parts) for r in t.rows[:p[2]]]
+            st.generation = next_generation()
+        st.parts, st.version = parts, m["version"]
+        return st
+
+def cached_rows(path: str) -> List[Dict[str, str]]:
+    return list(_refresh(path).rows)
+
+def rows_since(path: str, cursor: Optional[Tuple[int, int]]
+               ) -> Tuple[List[Dict[str, str]], Tuple[int, int], bool]:
+    st = _refresh(path)
+    rows = st.rows
+    if cursor is None or cursor[0] != st.generation or cursor[1] > len(rows):
+        return list(rows), (st.generation, len(rows)), True
+    return rows[cursor[1]:], (st.generation, len(rows)), False
+
+
+# ----------------------------
+# 쓰기 (논리 잠금 안에서 파티션 → manifest)
+# ----------------------------
+def append_rows(path: str, rows: List[Dict[str, Any]]) -> int:
+    """행을 작성 월 파티션 끝에 덧붙인다. 반환: 새 세대"""
+    check_writable(path)
+    with table_lock(path, exclusive=True):
+        m = _editable(path)
+        if not m["fieldnames"]:
+            m["fieldnames"] = list(rows[0].keys())
+        id_column = m["fieldnames"][0]
+        for month, group in sorted(_group(rows).items()):
+            append_csv_rows(part_path(path, month), group)
+            m["partitions"][month] = _merge_stats(m["partitions"].get(month), _stats(group, id_column))
+        m["version"] += 1
+        _write_manifest(path, m)
+        return m["version"]
+
+def _rewrite(path: str, m: dict, groups: Dict[str, List[Dict[str, Any]]], fieldnames: List[str],
+             before: Dict[str, List[Dict[str, Any]]]) -> int:
+    """내용이 달라진 월만 다시 쓰고 manifest 를 갱신(논리 배타 잠금 안에서). 반환: 새 세대"""
+    id_column = fieldnames[0] if fieldnames else ""
+    for month in sorted(set(m["partitions"]) | set(groups)):
+        rows = groups.get(month, [])
+        if month in before and before[month] == rows:
+            continue
+        write_csv_stream(part_path(path, month), rows, fieldnames)
+        m["partitions"][month] = _stats(rows, id_column)
+    m["fieldnames"] = fieldnames
+    m["version"] += 1
+    _write_manifest(path, m)
+    return m["version"]
+
+def replace_all(path: str, rows, fieldnames: List[str], expected_version: Optional[int] = None) -> int:
+    """테이블 전체를 rows 로 교체(write_csv / write_csv_stream). 바뀐 월만 실제로 다시 쓴다"""
+    check_writable(path)
+    groups = _group(rows)
+    with table_lock(path, exclusive=True):
+        m = _editable(path)
+        if expected_version is not None and m["version"] != expected_version:
+            raise ConflictError(f"{path} changed concurrently")
+        before = {month: read_csv(part_path(path, month)) for month in m["partitions"]}
+        return _rewrite(path, m, groups, list(fieldnames), before)
+
+def update(path: str, mutate: Callable[[List[Dict[str, str]]], Optional[List[Dict[str, Any]]]]
+           ) -> Optional[List[Dict[str, Any]]]:
+    """
+    update_csv 의 파티션 버전. 논리 테이블 잠금을 잡은 채 읽기-수정-쓰기를 하므로 충돌 재시도가 없고,
+    mutate 가 돌려준 행을 다시 월별로 나눠 달라진 파티션만 다시 쓴다.
+    """
+    check_writable(path)
+    with table_lock(path, exclusive=True):
+        m = _editable(path)
+        current = {month: read_csv(part_path(path, month)) for month in sorted(m["partitions"])}
+        # mutate 가 행 dict 를 제자리에서 고칠 수 있으므로 비교용 사본을 따로 둔다
+        before = {month: [dict(r) for r in rows] for month, rows in current.items()}
+        rows = [r for month in sorted(current) for r in current[month]]
+        new_rows = mutate(rows)
+        if new_rows is None:
+            return None
+        fieldnames = list(new_rows[0].keys()) if new_rows else m["fieldnames"]
+        _rewrite(path, m, _group(new_rows), fieldnames, before)
+        return new_rows
+
+
+# ----------------------------
+# 전환
+# ----------------------------
+def _header_of(data: bytes) -> List[str]:
+    if binrow.is_binary(data):
+        return list(binrow.decode_all(data)[0])
+    first = data.split(b"\n", 1)[0].decode("utf-8").strip("\r\n")
+    return next(csv.reader(io.StringIO(first)), []) if first else []
+
+def split(path: str) -> Dict[str, Any]:
+    """
+    평면 테이블(data/posts.csv)을 월별 파티션으로 나누고 원본 파일을 지운다.
+    파티션과 manifest 는 변경 스트림에 남으므로 복제본도 따라 전환된다(복제본의 옛 평면 파일은 더 이상 읽지 않음).
+    반환: status(path)
+    """
+    check_writable(path)
+    with table_lock(path, exclusive=True) as lf:
+        if load_manifest(path) is not None:
+            return status(path)
+        src = storage_path(path)
+        data = b""
+        if os.path.exists(src):
+            with open(src, "rb") as f:
+                data = f.read()
+        rows = parse_csv_bytes(data) if data else []
+        fieldnames = list(rows[0].keys()) if rows else _header_of(data)
+        id_column = fieldnames[0] if fieldnames else ""
+        m = {"version": read_stamp(lf)[0] + 1, "fieldnames": fieldnames, "partitions": {}}
+        os.makedirs(partition_dir(path), exist_ok=True)
+        for month, group in sorted(_group(rows).items()):
+            write_csv_stream(part_path(path, month), group, fieldnames)
+            m["partitions"][month] = _stats(group, id_column)
+        _write_manifest(path, m)
+        for stale in (src, path + ".idx"):
+            if os.path.exists(stale):
+                os.remove(stale)
+    return status(path)
+
+def merge(path: str) -> int:
+    """
+    파티션을 다시 평면 테이블 하나로 합친다(되돌리기). 파일 삭제는 변경 스트림에 남지 않으므로
+    복제 primary/복제본이 아닌 단독 노드에서만 허용한다. 반환: 합친 행 수
+    """
+    if is_replica() or os.path.isdir(CHANGES_DIR):
+        raise RuntimeError("merge only on a standalone node (replicas would keep reading the partitions)")
+    with table_lock(path, exclusive=True) as lf:
+        m = load_manifest(path)
+        if m is None:
+            return 0
+        rows = [r for month in sorted(m["partitions"]) for r in read_csv(part_path(path, month))]
+        fieldnames = list(rows[0].keys()) if rows else list(m.get("fieldnames") or [])
+        tmp = write_tmp(path, rows, fieldnames)
+        os.replace(tmp, storage_path(path))
+        # 세대는 manifest 보다 크게, 재작성 횟수도 올려서 기존 캐시가 모두 다시 읽게 한다
+        epoch = read_stamp(lf)[1]
+        lf.seek(0)
+        lf.truncate()
+        lf.write(f"{int(m['version']) + 1} {epoch + 1}")
+        lf.flush()
+        shutil.rmtree(partition_dir(path))
+        _manifests.pop(path, None)
+    return len(rows)
+
+def status(path: str) -> Dict[str, Any]:
+    m = load_manifest(path)
+    if m is None:
+        return {"table": path, "partitioned": False}
+    parts = m["partitions"]
+    return {"table": path, "partitioned": True, "version": m["version"],
+            "rows": sum(s.get("rows", 0) for s in parts.values()),
+            "partitions": {month: parts[month] for month in sorted(parts)}}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="게시물/댓글 테이블 월별 파티션 전환")
+    ap.add_argument("action", choices=["split", "merge", "status"])
+    ap.add_argument("tables", nargs="*", default=list(TABLES), help=f"테이블 이름 (기본: {' '.join(TABLES)})")
+    args = ap.parse_args()
+    for name in args.tables:
+        if name not in TABLES:
+            ap.error(f"{name}: only {', '.join(TABLES)} can be partitioned")
+        table = os.path.join(DATA_DIR, f"{name}.csv")
+        if args.action == "split":
+            print(json.dumps(split(table), ensure_ascii=False, indent=2))
+        elif args.action == "merge":
+            print(f"{table}: merged {merge(table)} rows")
+        else:
+            print(json.dumps(status(table), ensure_ascii=False, indent=2))
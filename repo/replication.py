@@ -0,0 +1,531 @@
+# repo/replication.py
+# 로그 전달(log-shipping) 방식 복제: primary 의 data/ 를 읽기 전용 복제본 data/ 로 따라가게 한다.
+#   primary  : python -m repo.replication enable                  # data/_changes/ 생성 → 이후 쓰기가 기록됨
+#   복제본    : python -m repo.replication clone /mnt/primary/data  # 최초 1회 전체 복사 + 시작 지점 기록
+#             python -m repo.replication follow                   # (또는 앱의 start_background_replication)
+#   어디서나  : python -m repo.replication status
+# - csv_repo 의 모든 쓰기(append / 재작성 / next_id)는 배타 잠금 안에서 번호(seq)를 받아
+#   data/_changes/<첫 seq>.jsonl 세그먼트에 한 줄씩 남는다. append 는 행 자체, 재작성은 그 순간의
+#   파일(작으면 본문에 base64, 크면 blobs/ 에 하드링크 + 크기)을 가리킨다.
+# - 복제본은 공유 폴더의 세그먼트를 tail 해서 자기 data/ 에 그대로 적용한다. 테이블마다 적용한
+#   primary 세대 번호를 잠금 사이드카 세 번째 칸에 남겨, 같은 변경을 두 번 적용하지 않는다
+#   (최초 복사 도중 들어온 변경을 다시 읽어도 안전).
+# - 복제본은 data/_replica.json 이 있는 동안 csv_repo 쓰기를 ReadOnlyError 로 거부한다.
+# - 지연(seq 차이, 초)은 복제본의 _replica.json 과 primary 의 _changes/replicas/<이름>.json 에 남고,
+#   모든 복제본이 지나간 세그먼트만 지운다.
+import base64
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # POSIX 전용 (csv_repo 와 같은 가정)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from repo import binrow
+from repo.csv_repo import (
+    DATA_DIR, CHANGES_DIR, REPLICA_STATE, COUNTERS,
+    table_lock, read_stamp, bump_version, append_locked, parse_csv_bytes, storage_path, binary_path,
+)
+
+# _changes/stream.lock 에 "<마지막 seq> <현재 세그먼트 첫 seq, 다 찼으면 0>" (각 20자리)
+BLOBS = os.path.join(CHANGES_DIR, "blobs")
+ACKS = os.path.join(CHANGES_DIR, "replicas")
+
+SEGMENT_BYTES = 64 << 20      # 세그먼트가 이 크기를 넘으면 다음 쓰기부터 새 세그먼트
+INLINE_BYTES = 64 << 10       # 이보다 작은 파일은 세그먼트 줄에 본문을 그대로 싣는다
+ACK_STALE_SEC = 7 * 24 * 3600  # 이 기간 소식이 없는 복제본은 세그먼트 보존 기준에서 뺀다
+BATCH = 2000                  # 복제본이 한 번에 적용하는 최대 변경 수
+
+_DATA_PREFIX = os.path.normpath(DATA_DIR) + os.sep
+_log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# primary: 변경 기록
+# ----------------------------
+def _write_stamp(lf, a: int, b: int, c: Optional[int] = None) -> None:
+    lf.seek(0)
+    lf.truncate()
+    lf.write(f"{a} {b}" if c is None else f"{a} {b} {c}")
+    lf.flush()
+
+
+@contextmanager
+def _head_locked(changes_dir: str, exclusive: bool):
+    """
+    스트림 머리("stream.lock")를 잠그고 fd 를 준다. csv_repo 사이드카(a+ 모드라 덮어쓰려면 truncate 필요)와 달리
+    고정 폭 내용을 pwrite 로 덮어써서 쓰기마다 드는 비용을 줄인다.
+    """
+    fd = os.open(os.path.join(changes_dir, "stream.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield fd
+    finally:
+        os.close(fd)  # 잠금도 함께 풀린다
+
+
+def _read_head(fd) -> Tuple[int, int]:
+    parts = os.pread(fd, 64, 0).split()
+    nums = [int(p) if p.isdigit() else 0 for p in parts[:2]]
+    return (nums + [0, 0])[0], (nums + [0, 0])[1]
+
+
+def _segment_path(first: int, changes_dir: str = CHANGES_DIR) -> str:
+    return os.path.join(changes_dir, f"{first:012d}.jsonl")
+
+
+def _capture(src: str, seq: int, entry: Dict[str, Any]) -> None:
+    """src 의 현재 내용을 변경에 싣는다: 작으면 본문, 크면 하드링크(이후 rename 으로 바뀌어도 이 inode 는 그대로)"""
+    size = os.path.getsize(src)
+    entry["size"] = size
+    if size < INLINE_BYTES:
+        with open(src, "rb") as f:
+            entry["data"] = base64.b64encode(f.read(size)).decode("ascii")
+        return
+    os.makedirs(BLOBS, exist_ok=True)
+    blob = f"{seq:012d}{os.path.splitext(src)[1]}"
+    try:
+        os.link(src, os.path.join(BLOBS, blob))
+    except OSError:  # 하드링크를 못 쓰는 파일시스템
+        shutil.copyfile(src, os.path.join(BLOBS, blob))
+    entry["blob"] = blob
+
+
+def record(path: str, op: str, version: Optional[int], rows: Optional[List[Dict[str, Any]]] = None) -> Optional[int]:
+    """
+    csv_repo 가 쓰기 잠금 안에서 호출. op: append(행) / replace(테이블 재작성) / file(테이블 아닌 파일 교체)
+    반환: 받은 seq (data/ 밖의 경로면 기록하지 않고 None)
+    """
+    norm = os.path.normpath(path)
+    if not norm.startswith(_DATA_PREFIX):
+        return None
+    entry: Dict[str, Any] = {"op": op, "path": norm[len(_DATA_PREFIX):].replace(os.sep, "/"), "v": version, "ts": round(time.time(), 3)}
+    if rows is not None:
+        entry["rows"] = rows
+    with _head_locked(CHANGES_DIR, exclusive=True) as fd:
+        seq, seg = _read_head(fd)
+        seq += 1
+        if op != "append":
+            _capture(storage_path(path) if op == "replace" else path, seq, entry)
+        if not seg:  # 처음이거나 직전 세그먼트가 다 참 → 이 seq 부터 새 세그먼트
+            seg = seq
+            _prune(keep_from=seg)
+        line = json.dumps({"seq": seq, **entry}, ensure_ascii=False, separators=(",", ":"), default=str)
+        with open(_segment_path(seg), "ab") as f:
+            f.write(line.encode("utf-8") + b"\n")
+            full = f.tell() >= SEGMENT_BYTES
+        os.pwrite(fd, f"{seq:020d} {0 if full else seg:020d}".encode("ascii"), 0)
+    return seq
+
+
+def enable() -> int:
+    """이 data/ 를 primary 로: 변경 스트림 폴더를 만든다. 반환: 현재 마지막 seq"""
+    os.makedirs(ACKS, exist_ok=True)
+    return head_seq()
+
+
+def head_seq(changes_dir: str = CHANGES_DIR) -> int:
+    """스트림의 마지막 seq"""
+    if not os.path.exists(os.path.join(changes_dir, "stream.lock")):
+        return 0
+    with _head_locked(changes_dir, exclusive=False) as fd:
+        return _read_head(fd)[0]
+
+
+def _segments(changes_dir: str) -> List[int]:
+    try:
+        names = os.listdir(changes_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(int(n[:-6]) for n in names if n.endswith(".jsonl") and n[:-6].isdigit())
+
+
+def _acks(changes_dir: str = CHANGES_DIR) -> Dict[str, dict]:
+    out = {}
+    d = os.path.join(changes_dir, "replicas")
+    for n in (os.listdir(d) if os.path.isdir(d) else []):
+        if n.endswith(".json"):
+            try:
+                with open(os.path.join(d, n), "r", encoding="utf-8") as f:
+                    out[n[:-5]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+    return out
+
+
+def _prune(keep_from: int) -> int:
+    """
+    모든 (최근에 소식이 있는) 복제본이 적용을 끝낸 세그먼트와 blob 을 지운다.
+    keep_from 이후 세그먼트는 항상 남긴다. 반환: 지운 세그먼트 수
+    """
+    now = time.time()
+    acked = [a.get("seq", 0) for a in _acks().values() if now - a.get("updated", 0) < ACK_STALE_SEC]
+    floor = min(acked + [keep_from - 1])
+    segs = _segments(CHANGES_DIR)
+    removed = 0
+    for first, nxt in zip(segs, segs[1:]):
+        if nxt - 1 > floor or first >= keep_from:
+            break
+        os.remove(_segment_path(first))
+        removed += 1
+    if removed and os.path.isdir(BLOBS):
+        cut = segs[removed]
+        for n in os.listdir(BLOBS):
+            stem = os.path.splitext(n)[0]
+            if stem.isdigit() and int(stem) < cut:
+                os.remove(os.path.join(BLOBS, n))
+    return removed
+
+
+# ----------------------------
+# 복제본: 설치 / 적용
+# ----------------------------
+def _source_version(lf) -> int:
+    """복제본 사이드카의 세 번째 칸: 이 테이블에 마지막으로 적용한 primary 세대"""
+    lf.seek(0)
+    parts = lf.read().split()
+    return int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+
+
+def _install_table(path: str, data: bytes) -> None:
+    """
+    배타 잠금 안에서 테이블 내용을 data 로 교체. primary 와 저장 형식(CSV/.bin)이 다르면
+    (SM_BINARY_TABLES 설정 차이) 행으로 풀어 이쪽 형식으로 다시 쓴다.
+    """
+    target = storage_path(path)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if binrow.is_binary(data) == (target != path):
+                f.write(data)
+            elif binrow.is_binary(data):
+                fieldnames, rows = binrow.decode_all(data)
+                f.write(_csv_bytes(fieldnames, rows))
+            else:
+                rows = parse_csv_bytes(data)
+                _, encoded = binrow.encode_all(list(rows[0].keys()) if rows else _csv_header(data), rows)
+                f.write(encoded)
+        os.replace(tmp, target)
+        stale = path if target != path else binary_path(path)
+        if os.path.exists(stale) and stale != target:
+            os.remove(stale)  # 형식이 바뀐 경우 옛 파일이 storage_path 선택을 흐리지 않게
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _csv_header(data: bytes) -> List[str]:
+    first = data.split(b"\n", 1)[0].decode("utf-8").strip("\r")
+    return next(csv.reader([first]), []) if first else []
+
+
+def _csv_bytes(fieldnames: List[str], rows: List[Dict[str, str]]) -> bytes:
+    buf = io.StringIO(newline="")
+    w = csv.DictWriter(buf, fieldnames=fieldnames)
+    w.writeheader()
+    w.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def _install_file(path: str, data: bytes) -> None:
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _payload(entry: dict, changes_dir: str) -> bytes:
+    if "data" in entry:
+        return base64.b64decode(entry["data"])
+    with open(os.path.join(changes_dir, "blobs", entry["blob"]), "rb") as f:
+        return f.read(entry["size"])  # 이후 같은 inode 끝에 붙은 append 는 뒤 변경들이 싣고 온다
+
+
+def apply_change(entry: dict, changes_dir: str) -> bool:
+    """변경 한 건을 이 data/ 에 적용. 이미 반영된 세대면 건너뛰고 False"""
+    path = os.path.join(DATA_DIR, *entry["path"].split("/"))
+    op = entry["op"]
+    if op == "file":
+        _install_file(path, _payload(entry, changes_dir))
+        return True
+    data = _payload(entry, changes_dir) if op == "replace" else None
+    with table_lock(path, exclusive=True) as lf:
+        if _source_version(lf) >= entry["v"]:
+            return False
+        if op == "append":
+            rewrote = append_locked(path, entry["rows"])
+        else:
+            _install_table(path, data)
+            rewrote = True
+        bump_version(lf, rewrite=rewrote)
+        v, e = read_stamp(lf)
+        _write_stamp(lf, v, e, entry["v"])
+    return True
+
+
+def read_changes(changes_dir: str, after: int, limit: int = BATCH,
+                 pos: Optional[Tuple[int, int]] = None) -> Tuple[List[dict], Optional[Tuple[int, int]]]:
+    """
+    seq > after 인 변경을 순서대로 최대 limit 건 + 다음에 이어 읽을 위치(세그먼트 첫 seq, 바이트 오프셋).
+    pos 가 없거나 그 세그먼트가 지워졌으면 after 가 든 세그먼트 처음부터 훑는다.
+    쓰는 중인 마지막 줄(줄바꿈 전)은 다음 번으로 미룬다.
+    """
+    segs = _segments(changes_dir)
+    if not segs:
+        return [], pos
+    if pos is not None and pos[0] in segs:
+        first, offset = pos
+    else:
+        start = [s for s in segs if s <= after + 1]
+        if not start:
+            raise RuntimeError(f"changes after seq {after} were pruned on the primary; re-clone this replica")
+        first, offset = start[-1], 0
+    out: List[dict] = []
+    for i in range(segs.index(first), len(segs)):
+        if segs[i] != first:
+            first, offset = segs[i], 0  # 목록에 다음 세그먼트가 있었으니 앞 세그먼트는 이미 닫혀 있었다
+        with open(_segment_path(first, changes_dir), "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return out, (first, offset)
+                offset += len(line)
+                if int(line[7:line.index(b",")]) <= after:  # {"seq":N,... — 적용한 줄은 파싱하지 않음
+                    continue
+                out.append(json.loads(line))
+                if len(out) >= limit:
+                    return out, (first, offset)
+    return out, (first, offset)
+
+
+# ----------------------------
+# 복제본 상태
+# ----------------------------
+def load_state() -> Optional[dict]:
+    try:
+        with open(REPLICA_STATE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_state(state: dict) -> None:
+    _install_file(REPLICA_STATE, json.dumps(state, ensure_ascii=False, indent=1).encode("utf-8"))
+    # primary 쪽에도 진행 상황을 남긴다(지연 확인 + 세그먼트 보존 기준)
+    ack = {k: state.get(k) for k in ("seq", "head", "lag_seq", "lag_sec", "updated")}
+    try:
+        _install_file(os.path.join(state["source"], "_changes", "replicas", state["name"] + ".json"),
+                      json.dumps(ack).encode("utf-8"))
+    except OSError:
+        pass  # 공유 폴더가 잠시 안 보여도 적용은 계속
+
+
+class Follower:
+    """공유 폴더의 primary 변경 스트림을 따라 이 data/ 에 적용"""
+
+    def __init__(self):
+        state = load_state()
+        if state is None:
+            raise RuntimeError(f"{REPLICA_STATE} not found; run `python -m repo.replication clone <primary data dir>` first")
+        self.state = state
+        self.changes_dir = os.path.join(state["source"], "_changes")
+        self.pos: Optional[Tuple[int, int]] = None
+
+    def poll(self) -> int:
+        """밀린 변경을 한 묶음 적용. 반환: 적용(또는 이미 반영돼 건너뛴) 변경 수"""
+        st = self.state
+        head = head_seq(self.changes_dir)
+        changes, self.pos = read_changes(self.changes_dir, st["seq"], pos=self.pos)
+        for entry in changes:
+            apply_change(entry, self.changes_dir)
+            st["seq"], st["applied_ts"] = entry["seq"], entry["ts"]
+        n = len(changes)
+        now = time.time()
+        st["head"] = max(head, st["seq"])
+        st["lag_seq"] = st["head"] - st["seq"]
+        # 밀려 있으면 마지막으로 적용한 변경이 primary 에서 일어난 뒤 흐른 시간, 따라잡았으면 0
+        st["lag_sec"] = round(now - st.get("applied_ts", now), 3) if st["lag_seq"] else 0.0
+        st["updated"] = round(now, 3)
+        _save_state(st)
+        return n
+
+    def catch_up(self) -> int:
+        total = 0
+        while True:
+            n = self.poll()
+            total += n
+            if not n or not self.state["lag_seq"]:
+                return total
+
+
+def _replica_name() -> str:
+    where = hashlib.sha1(os.path.abspath(DATA_DIR).encode("utf-8")).hexdigest()[:8]
+    return f"{socket.gethostname()}-{where}"
+
+
+_CLONE_SKIP_DIRS = {"_changes", "columnar"}   # 스트림 자체, 복제본이 직접 만드는 파생 데이터
+
+
+def _clone_skip(name: str) -> bool:
+    return (name.endswith((".lock", ".idx", ".tmp")) or name.startswith("tmp")
+            or name in ("_replica.json", "snapshot.bin"))
+
+
+def clone(source: str, name: Optional[str] = None) -> dict:
+    """
+    source(primary 의 data/ 경로)를 이 data/ 로 최초 복사하고 복제본으로 표시한다.
+    복사 전에 스트림 위치를 기억해 두고 거기부터 따라가므로, 복사 중 쓰기가 계속돼도 된다
+    (복사본에 이미 들어간 변경은 테이블별 세대 비교로 건너뜀).
+    """
+    source = os.path.abspath(source)
+    changes_dir = os.path.join(source, "_changes")
+    if not os.path.isdir(changes_dir):
+        raise RuntimeError(f"{source} is not a replication primary; run `python -m repo.replication enable` there")
+    if os.path.isdir(DATA_DIR) and any(n not in ("avatars",) for n in os.listdir(DATA_DIR)):
+        raise RuntimeError(f"{DATA_DIR}/ is not empty; clone into a fresh directory")
+    state = {"source": source, "name": name or _replica_name(), "seq": head_seq(changes_dir)}
+    state["head"], state["lag_seq"], state["lag_sec"] = state["seq"], 0, 0.0
+    state["cloned_at"] = state["updated"] = round(time.time(), 3)
+    # 복사하는 동안 primary 가 시작 지점 세그먼트를 지우지 않도록 진행 상황부터 알린다
+    _install_file(os.path.join(changes_dir, "replicas", state["name"] + ".json"),
+                  json.dumps({"seq": state["seq"], "updated": state["updated"]}).encode("utf-8"))
+    copied = 0
+    for root, dirs, files in os.walk(source):
+        dirs[:] = [d for d in dirs if not (root == source and d in _CLONE_SKIP_DIRS)]
+        rel_root = os.path.relpath(root, source)
+        for n in files:
+            if _clone_skip(n):
+                continue
+            src = os.path.join(root, n)
+            # 잠금 사이드카가 있으면 csv_repo 테이블(.bin 은 논리 경로 <이름>.csv 의 사이드카)
+            logical = n if n.endswith(".csv") or n == os.path.basename(COUNTERS) else os.path.splitext(n)[0] + ".csv"
+            if not os.path.exists(os.path.join(root, logical + ".lock")):
+                with open(src, "rb") as f:
+                    _install_file(os.path.normpath(os.path.join(DATA_DIR, rel_root, n)), f.read())
+            else:
+                # primary 공유 잠금 안에서 내용과 세대를 함께 읽는다
+                with table_lock(os.path.join(root, logical), exclusive=False) as slf:
+                    with open(src, "rb") as f:
+                        data = f.read()
+                    version = read_stamp(slf)[0]
+                path = os.path.normpath(os.path.join(DATA_DIR, rel_root, logical))
+                with table_lock(path, exclusive=True) as lf:
+                    _install_table(path, data)
+                    bump_version(lf, rewrite=True)
+                    v, e = read_stamp(lf)
+                    _write_stamp(lf, v, e, version)
+            copied += 1
+    state["copied_files"] = copied
+    _save_state(state)
+    return state
+
+
+def promote() -> Optional[dict]:
+    """복제본 표시를 지워 쓰기 가능한 독립 노드로 만든다(primary 장애 시). 반환: 마지막 상태"""
+    state = load_state()
+    if state is not None:
+        os.remove(REPLICA_STATE)
+    return state
+
+
+def replication_status() -> dict:
+    """이 노드의 역할과 지연. primary 면 복제본별 진행 상황, 복제본이면 자기 상태"""
+    state = load_state()
+    if state is not None:
+        return {"role": "replica", **state}
+    if not os.path.isdir(CHANGES_DIR):
+        return {"role": "standalone"}
+    head = head_seq()
+    segs = _segments(CHANGES_DIR)
+    now = time.time()
+    replicas = {name: {**a, "lag_seq": head - a.get("seq", 0), "last_seen_sec": round(now - a.get("updated", 0), 1)}
+                for name, a in _acks().items()}
+    return {"role": "primary", "head": head, "segments": len(segs),
+            "first_seq": segs[0] if segs else head + 1, "replicas": replicas}
+
+
+# ----------------------------
+# 백그라운드 작업
+# ----------------------------
+_job_started = False
+_job_guard = threading.Lock()
+
+
+def start_background_replication(interval_sec: float = 1.0) -> bool:
+    """복제본이면(data/_replica.json) 프로세스당 한 번 데몬 스레드로 primary 를 따라간다. 새로 띄웠으면 True"""
+    global _job_started
+    if load_state() is None:
+        return False
+    with _job_guard:
+        if _job_started:
+            return False
+        _job_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        follower = None
+        while not stop.wait(interval_sec):
+            try:
+                follower = follower or Follower()
+                follower.catch_up()
+            except Exception:  # 다음 주기에 다시 시도
+                follower = None
+                _log.exception("replication catch-up failed")
+
+    threading.Thread(target=_loop, name="replication", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="data/ 로그 전달 복제")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("enable", help="이 data/ 를 primary 로(이후 쓰기를 변경 스트림에 기록)")
+    p = sub.add_parser("clone", help="primary data/ 를 이 data/ 로 최초 복사하고 복제본으로 표시")
+    p.add_argument("source", help="primary 의 data/ 경로(공유 폴더)")
+    p.add_argument("--name", default=None, help="복제본 이름(기본: 호스트명-경로 해시)")
+    p = sub.add_parser("follow", help="primary 를 계속 따라감(Ctrl+C 로 종료)")
+    p.add_argument("--interval", type=float, default=1.0)
+    sub.add_parser("status", help="역할과 복제 지연")
+    sub.add_parser("promote", help="복제본 표시를 지우고 쓰기 가능 노드로")
+    args = ap.parse_args()
+
+    if args.cmd == "enable":
+        print(f"replication enabled at seq {enable()} ({CHANGES_DIR})")
+    elif args.cmd == "clone":
+        st = clone(args.source, args.name)
+        print(f"cloned {st['copied_files']} files from {st['source']} at seq {st['seq']} as '{st['name']}'")
+    elif args.cmd == "follow":
+        f = Follower()
+        try:
+            while True:
+                n = f.catch_up()
+                if n:
+                    print(f"applied {n} changes, seq {f.state['seq']} (lag {f.state['lag_seq']})", flush=True)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    elif args.cmd == "status":
+        print(json.dumps(replication_status(), ensure_ascii=False, indent=1))
+    elif args.cmd == "promote":
+        st = promote()
+        print("not a replica" if st is None else f"promoted at seq {st['seq']} (was following {st['source']})")
@@ -0,0 +1,130 @@
+# scripts/bench_api.py
+# api_server.py 의 피드 읽기 / 좋아요 토글 처리량을 로컬에서 잰다.
+#   python scripts/bench_api.py                      # 동시 접속 32, 각 10초
+#   python scripts/bench_api.py -c 64 -d 20 --workers 16
+# data/ 를 임시 폴더로 복사한 뒤 그 안에서 서버를 띄우므로 실제 데이터는 건드리지 않는다.
+# 클라이언트도 asyncio keep-alive 연결이며, 구간별 지속 req/s 와 지연 p50/p99 를 출력한다.
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def call(reader, writer, method: str, path: str, body: Optional[Dict] = None,
+               token: str = "") -> Tuple[int, object]:
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write((head + "\r\n").encode("latin-1") + data)
+    await writer.drain()
+    status_line, _, rest = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").partition("\r\n")
+    length = 0
+    for line in rest.split("\r\n"):
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    payload = await reader.readexactly(length)
+    return int(status_line.split(" ")[1]), json.loads(payload or b"null")
+
+
+async def wait_ready(host: str, port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return await asyncio.open_connection(host, port)
+        except OSError:
+            if time.time() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run_phase(host: str, port: int, name: str, method: str, paths: List[str],
+                    token: str, conns: int, duration: float) -> None:
+    latencies: List[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker(i: int):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        n = i
+        try:
+            while time.perf_counter() < stop_at:
+                t0 = time.perf_counter()
+                status, _ = await call(reader, writer, method, paths[n % len(paths)], token=token)
+                latencies.append(time.perf_counter() - t0)
+                if status >= 400:
+                    errors += 1
+                n += conns
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(conns)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    n = len(latencies)
+    if not n:
+        print(f"{name:<12} no requests completed")
+        return
+    print(f"{name:<12} {n:>7} req  {n / elapsed:>8.1f} req/s  "
+          f"p50 {latencies[n // 2] * 1000:6.1f} ms  p99 {latencies[min(n - 1, n * 99 // 100)] * 1000:6.1f} ms  "
+          f"errors {errors}")
+
+
+async def bench(args) -> None:
+    reader, writer = await wait_ready(args.host, args.port)
+    user = {"username": f"bench_{int(time.time())}", "password": "bench"}
+    await call(reader, writer, "POST", "/auth/signup", user)
+    _, login = await call(reader, writer, "POST", "/auth/login", user)
+    token = login["token"]
+    _, feed = await call(reader, writer, "GET", "/feed?limit=50", token=token)
+    post_ids = [p["post_id"] for p in feed] if isinstance(feed, list) else []
+    if not post_ids:
+        _, post = await call(reader, writer, "POST", "/posts", {"content": "bench #bench"}, token)
+        post_ids = [post["post_id"]]
+    writer.close()
+
+    print(f"conns={args.conns} duration={args.duration}s posts={len(post_ids)}")
+    await run_phase(args.host, args.port, "GET /feed", "GET", [f"/feed?limit={args.limit}"],
+                    token, args.conns, args.duration)
+    await run_phase(args.host, args.port, "POST like", "POST", [f"/posts/{p}/like" for p in post_ids[:args.posts]],
+                    token, args.conns, args.duration)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="JSON API 서버 처리량 측정")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("-c", "--conns", type=int, default=32, help="동시 keep-alive 연결 수")
+    ap.add_argument("-d", "--duration", type=float, default=10.0, help="구간별 측정 시간(초)")
+    ap.add_argument("--limit", type=int, default=50, help="피드 한 번에 가져올 글 수")
+    ap.add_argument("--posts", type=int, default=20, help="좋아요를 번갈아 누를 글 수")
+    ap.add_argument("--workers", type=int, default=None, help="서버 스레드 수(기본: 서버 기본값)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_api_")
+    if os.path.isdir(os.path.join(ROOT, "data")):
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(tmp, "data"))
+    else:
+        os.makedirs(os.path.join(tmp, "data"))
+    cmd = [sys.executable, os.path.join(ROOT, "api_server.py"), "--no-background",
+           "--host", args.host, "--port", str(args.port)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    server = subprocess.Popen(cmd, cwd=tmp, env=env)
+    try:
+        asyncio.run(bench(args))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
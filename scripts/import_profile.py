@@ -0,0 +1,87 @@
+# scripts/import_profile.py
+# app.py 의 최상위 import 비용을 `python -X importtime` 으로 측정한다.
+#   python scripts/import_profile.py                 # app.py 기준, 상위 15개 모듈
+#   python scripts/import_profile.py --max-ms 250    # 합계가 넘으면 종료 코드 1
+#   python scripts/import_profile.py -m services.analytics
+# streamlit 은 앱을 띄우는 데 어차피 필요하므로 기본으로 측정에서 뺀다(--with-streamlit).
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def top_level_imports(path: str, skip: Tuple[str, ...]) -> List[str]:
+    """모듈 최상위(함수/분기 밖)의 import 문이 가져오는 모듈 이름"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names: List[str] = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.append(node.module)
+    return [n for n in dict.fromkeys(names) if n.split(".")[0] not in skip]
+
+
+def measure(modules: List[str]) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """
+    새 인터프리터에서 modules 를 import 하며 -X importtime 출력을 파싱한다.
+    반환: (모듈 → (self µs, cumulative µs), 최상위로 import 된 모듈 순서)
+    """
+    code = "\n".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+    costs: Dict[str, Tuple[int, int]] = {}
+    roots: List[str] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        costs[name] = (int(self_us), int(cum_us))
+        if depth == 0:
+            roots.append(name)
+    return costs, roots
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="import 비용 측정 (python -X importtime)")
+    ap.add_argument("--target", default=os.path.join(ROOT, "app.py"), help="최상위 import 를 측정할 파일")
+    ap.add_argument("-m", "--module", action="append", help="파일 대신 이 모듈들을 측정(여러 번 지정 가능)")
+    ap.add_argument("--with-streamlit", action="store_true", help="streamlit 도 포함")
+    ap.add_argument("--top", type=int, default=15, help="누적 비용 상위 몇 개를 보일지")
+    ap.add_argument("--max-ms", type=float, default=None, help="합계(ms)가 이 값을 넘으면 실패")
+    args = ap.parse_args(argv)
+
+    skip = () if args.with_streamlit else ("streamlit",)
+    modules = args.module or top_level_imports(args.target, skip)
+    costs, roots = measure(modules)
+
+    total_us = sum(costs[r][1] for r in roots)
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for name, (self_us, cum_us) in sorted(costs.items(), key=lambda kv: -kv[1][1])[:args.top]:
+        print(f"{cum_us / 1000:13.1f} {self_us / 1000:8.1f}  {name}")
+    print(f"\ntotal {total_us / 1000:.1f} ms for {len(modules)} top-level imports "
+          f"({', '.join(modules)})")
+
+    heavy = [m for m in ("pandas", "numpy", "pyarrow") if m in costs]
+    if heavy:
+        print(f"note: heavy dependencies imported eagerly: {', '.join(heavy)}")
+    if args.max_ms is not None and total_us / 1000 > args.max_ms:
+        print(f"FAIL: {total_us / 1000:.1f} ms > {args.max_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,25 @@
     # services/activity.py
 import os
+import csv
 import json
-from typing import Optional, Dict, Any
-from utils.time import now_kst_iso
-from repo.csv_repo import append_csv, next_id
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from utils.time import now_kst_iso, KST
+from utils.ids import id_num
+from repo.csv_repo import append_csv, next_id, table_lock
 
 LOG_PATH = os.path.join("data", "activity_log.csv")
 
+# 활동 로그 뷰어의 필터 선택지
+EVENT_TYPES = (
+    "POST_CREATED", "REPOST_CREATED", "POST_DELETED", "POST_RESTORED",
+    "REACTION_ADDED", "REACTION_REMOVED", "COMMENT_CREATED", "COMMENT_DELETED",
+    "USER_FOLLOWED", "USER_UNFOLLOWED",
+)
+# 뒤에서부터 읽을 때의 블록 크기
+_BLOCK = 64 * 1024
+
 def log_event(
     event_type: str,
     actor_id: str,
@@ -35,4 +48,165 @@ def log_event(
     }
     # activity_log.csv는 초기 헤더가 이미 만들어져 있다고 가정
     append_csv(LOG_PATH, row)
+    from services.notifications import fan_out  # 순환 import 회피용 지역 import
+    fan_out(row)  # 좋아요/댓글/리포스트/팔로우면 받는 사람 알림함에
     return log_id
+
+
+# ----------------------------
+# 조회 (최신순, 키셋 페이지네이션)
+# ----------------------------
+def _iter_lines_reverse(f, end: int, stop: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    [stop, end) 구간의 줄을 끝에서부터 (줄 바이트, 시작 오프셋) 으로. 블록 단위로만 읽는다.
+    metadata 는 json.dumps 로 저장돼 한 레코드가 항상 한 줄이다.
+    """
+    pos = end
+    rest = b""
+    while pos > stop:
+        size = min(_BLOCK, pos - stop)
+        pos -= size
+        f.seek(pos)
+        buf = f.read(size) + rest
+        lines = buf.split(b"\n")
+        rest = lines[0]          # 블록 경계에 걸친 줄은 다음 블록과 합친다
+        offset = pos + len(buf)
+        for line in reversed(lines[1:]):
+            offset -= len(line) + 1
+            if line.strip():
+                yield line, offset + 1
+    if rest.strip():
+        yield rest, stop
+
+
+def _parse_time(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=KST)
+
+
+def query_events(
+    event_types: Optional[Iterable[str]] = None,
+    actor_id: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    activity_log 를 최신순으로 필터링해 한 페이지씩 돌려준다.
+    - event_types / actor_id / target_type / target_id: 일치 필터 (None 이면 전체)
+    - since / until: created_at 범위(ISO, since 이상 until 미만)
+    - cursor: 이전 페이지가 돌려준 값. 그 행보다 오래된 행부터 이어서 읽는다
+    파일을 끝에서부터 블록 단위로 읽으며 limit 개를 채우면 멈춘다(전체를 올리지 않음).
+    활성 로그만으로 모자라면 services.log_archive 의 압축 구간을 최신 구간부터 이어서 푼다.
+    반환: (행 목록, 다음 페이지 cursor — 더 없으면 None)
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    if not os.path.exists(LOG_PATH):
+        return [], None
+    types = set(event_types) if event_types else None
+    t_since, t_until = _parse_time(since), _parse_time(until)
+
+    # cursor = "<log 번호>:<그 행의 바이트 오프셋>". 오프셋은 힌트일 뿐, 번호로 다시 확인한다
+    before_num, hint = None, None
+    if cursor:
+        num, _, off = cursor.partition(":")
+        before_num = int(num) if num.isdigit() else None
+        hint = int(off) if off.isdigit() else None
+
+    with table_lock(LOG_PATH, exclusive=False):
+        f = open(LOG_PATH, "rb")
+        size = os.fstat(f.fileno()).st_size
+    rows: List[Dict[str, str]] = []
+    offsets: List[Optional[int]] = []
+    # csv 파싱 전에 바이트 수준으로 먼저 거른다(일치 필터 값은 따옴표 없이 저장되는 id/상수)
+    must = [v.encode("utf-8") for v in (actor_id, target_id) if v]
+    any_type = [t.encode("utf-8") for t in types] if types else None
+
+    def _accept(line: bytes, header: List[str]) -> Tuple[Optional[Dict[str, str]], bool]:
+        """(조건에 맞는 행 또는 None, 여기서 멈출지)"""
+        if t_since or t_until:
+            # created_at 은 마지막 컬럼: 필터보다 먼저 봐야 범위를 벗어날 때 바로 멈춘다
+            created = _parse_time(line.rstrip(b"\r\n").rsplit(b",", 1)[-1].decode("utf-8"))
+            if t_until and created and created >= t_until:
+                return None, False
+            if t_since and created and created < t_since:
+                return None, True  # 로그는 시간순으로 쌓이므로 더 볼 필요 없음
+        if any(m not in line for m in must) or (any_type and not any(t in line for t in any_type)):
+            return None, False
+        if before_num is not None and id_num(line.split(b",", 1)[0].decode("utf-8", "replace")) >= before_num:
+            return None, False
+        values = next(csv.reader([line.decode("utf-8").rstrip("\r\n")]), [])
+        r = dict(zip(header, values))
+        if types and r.get("event_type") not in types:
+            return None, False
+        if actor_id and r.get("actor_id") != actor_id:
+            return None, False
+        if target_type and r.get("target_type") != target_type:
+            return None, False
+        if target_id and r.get("target_id") != target_id:
+            return None, False
+        return r, False
+
+    stopped = False
+    with f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode("utf-8").strip("\r\n")]), [])
+        data_start = len(header_line)
+        first = f.readline()
+        head = first.split(b",", 1)[0].decode("utf-8", "replace")
+        upper = id_num(head) if head.startswith("l_") else None
+        end = size
+        if before_num is not None and upper is not None and before_num <= upper:
+            end = data_start  # cursor 가 이미 보관 구간을 가리킴: 활성 로그는 볼 필요 없음
+        elif hint is not None and data_start <= hint <= size:
+            f.seek(hint)
+            line = f.readline()
+            if line.startswith(b"l_") and id_num(line.split(b",", 1)[0].decode("utf-8")) == before_num:
+                end = hint  # 힌트가 맞으면 그 위치부터 바로 뒤로 읽는다
+
+        for line, offset in _iter_lines_reverse(f, end, data_start):
+            r, stopped = _accept(line, header)
+            if stopped:
+                break
+            if r is not None:
+                rows.append(r)
+                offsets.append(offset)
+                if len(rows) > limit:
+                    break
+
+    if len(rows) <= limit and not stopped:
+        # 활성 로그를 다 봤으면 압축 보관된 오래된 구간으로 이어 간다(겹치는 구간 파일만 연다)
+        from services import log_archive  # 순환 import 회피용 지역 import
+        a_header = log_archive.load_manifest().get("header") or header
+        for seg in reversed(log_archive.segments_between(since, until)):
+            if before_num is not None and seg["first_num"] >= before_num:
+                continue
+            # 구간 안은 앞에서부터 풀리므로 맞는 행 중 마지막 몇 개만 남긴다
+            need = limit + 1 - len(rows)
+            tail: deque = deque(maxlen=need)
+            for line in log_archive.iter_segment_lines(seg):
+                if upper is not None and id_num(line.split(b",", 1)[0].decode("utf-8", "replace")) >= upper:
+                    break  # 아직 활성 로그에 남아 있는 행(자르기 전에 멈춘 보관)
+                r, stop = _accept(line, a_header)
+                if r is not None:
+                    tail.append(r)
+            rows.extend(reversed(tail))
+            offsets.extend([None] * len(tail))
+            if len(rows) > limit or (t_since and seg["first_ts"] and _parse_time(seg["first_ts"]) < t_since):
+                break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows, last = rows[:limit], rows[limit - 1]
+        off = offsets[limit - 1]
+        next_cursor = f"{id_num(last['log_id'])}:{'' if off is None else off}"
+    return rows, next_cursor
@@ -0,0 +1,249 @@
+# services/analytics.py
+# 활동 로그/반응 테이블 집계 (DAU, 시간대별 이벤트, 사용자별 게시 빈도, 게시물 반응 곡선).
+# - 로그는 services.log_export 의 컬럼 파일(사전 코드 + datetime64)에서 필요한 컬럼만 읽는다
+# - 집계는 NumPy/pandas 벡터 연산으로만 한다(행 단위 파이썬 루프 없음)
+# - 닫힌 날짜(내보낸 세그먼트)의 부분 집계는 한 번 계산해 캐시, 오늘 구간만 매번 계산
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from repo.csv_repo import read_csv, storage_path, table_exists, table_version
+from repo.partitions import files as table_files
+from services.log_export import closed_days, load_columns, load_manifest, load_open_columns
+from utils.time import KST
+
+POSTS = os.path.join("data", "posts.csv")
+REACTIONS = os.path.join("data", "reactions.csv")
+
+_US_PER_HOUR = 3_600_000_000
+_US_PER_DAY = 24 * _US_PER_HOUR
+_KST_US = 9 * _US_PER_HOUR
+
+# 게시물 반응으로 보는 이벤트
+ENGAGEMENT_EVENTS = ("REACTION_ADDED", "COMMENT_CREATED", "REPOST_CREATED")
+
+_cache: Dict[Tuple, object] = {}
+_cache_source: Optional[tuple] = None
+_guard = threading.RLock()
+
+
+# ----------------------------
+# 공통: 날짜(버킷)별 부분 집계
+# ----------------------------
+def _kst_day_index(ts_us: np.ndarray) -> np.ndarray:
+    """UTC 마이크로초 → KST 날짜 번호(1970-01-01 = 0)"""
+    return (ts_us + _KST_US) // _US_PER_DAY
+
+
+def _day_str(day_index: int) -> str:
+    return (datetime(1970, 1, 1) + timedelta(days=int(day_index))).date().isoformat()
+
+
+def _ts_int(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    return np.asarray(cols["ts"]).astype("datetime64[us]").astype(np.int64)
+
+
+def _per_bucket(metric: str, columns: List[str],
+                compute: Callable[[Dict[str, np.ndarray], Dict[str, List[str]]], object]) -> List[Tuple[str, object]]:
+    """
+    내보낸 날짜마다 compute(컬럼, 사전) 결과를 캐시해 두고, 아직 내보내지 않은 구간은 매번 계산한다.
+    로그가 재작성돼 내보내기가 처음부터 다시 만들어지면 캐시도 버린다.
+    반환: [(날짜 또는 'open', 결과)]
+    """
+    global _cache_source
+    m = load_manifest()
+    src = m["source"]
+    source = (src["dev"], src["ino"], src["epoch"])
+    out = []
+    with _guard:
+        if _cache_source != source:
+            _cache.clear()
+            _cache_source = source
+        for day in closed_days():
+            key = (metric, day)
+            if key not in _cache:
+                _cache[key] = compute(load_columns(columns, since=day, until=day), m["dicts"])
+            out.append((day, _cache[key]))
+    cols, dicts = load_open_columns(columns)
+    if len(cols[columns[0]]):
+        out.append(("open", compute(cols, dicts)))
+    return out
+
+
+def _codes_of(dicts: Dict[str, List[str]], column: str, values: Iterable[str]) -> np.ndarray:
+    index = {v: i for i, v in enumerate(dicts[column])}
+    return np.array([index[v] for v in values if v in index], dtype=np.int64)
+
+
+# ----------------------------
+# DAU
+# ----------------------------
+def _dau_part(cols, dicts) -> pd.Series:
+    day = _kst_day_index(_ts_int(cols))
+    actor = np.asarray(cols["actor_id"], dtype=np.int64)
+    pairs = np.unique(day * (1 << 32) + actor)
+    days, counts = np.unique(pairs >> 32, return_counts=True)
+    return pd.Series(counts, index=[_day_str(d) for d in days])
+
+
+def daily_active_users(since: Optional[str] = None) -> pd.Series:
+    """날짜(KST) → 그날 이벤트를 하나 이상 남긴 사용자 수"""
+    parts = [p for _, p in _per_bucket("dau", ["ts", "actor_id"], _dau_part)]
+    if not parts:
+        return pd.Series(dtype=np.int64)
+    s = pd.concat(parts).groupby(level=0).sum().sort_index()
+    return s[s.index >= since] if since else s
+
+
+# ----------------------------
+# 시간대별 이벤트 수
+# ----------------------------
+def _type_hour_part(cols, dicts) -> pd.DataFrame:
+    hour = (_ts_int(cols) + _KST_US) // _US_PER_HOUR
+    code = np.asarray(cols["event_type"], dtype=np.int64)
+    n_types = len(dicts["event_type"])
+    keys, counts = np.unique(hour * n_types + code, return_counts=True)
+    return pd.DataFrame({
+        "hour": keys // n_types,
+        "event_type": np.asarray(dicts["event_type"], dtype=object)[keys % n_types],
+        "count": counts,
+    })
+
+
+def events_per_type_hour(since: Optional[str] = None) -> pd.DataFrame:
+    """행: 시각(KST, 정시), 열: event_type, 값: 이벤트 수"""
+    parts = [p for d, p in _per_bucket("type_hour", ["ts", "event_type"], _type_hour_part)
+             if since is None or d == "open" or d >= since]
+    if not parts:
+        return pd.DataFrame()
+    df = pd.concat(parts, ignore_index=True)
+    table = df.pivot_table(index="hour", columns="event_type", values="count", aggfunc="sum", fill_value=0)
+    hours = table.index.to_numpy(dtype=np.int64) * _US_PER_HOUR - _KST_US
+    table.index = pd.to_datetime(hours, unit="us", utc=True).tz_convert(KST)
+    table.columns.name = None
+    return table.sort_index()
+
+
+# ----------------------------
+# 사용자별 게시 빈도
+# ----------------------------
+def _posting_part(cols, dicts) -> pd.DataFrame:
+    posted = _codes_of(dicts, "event_type", ["POST_CREATED", "REPOST_CREATED"])
+    mask = np.isin(np.asarray(cols["event_type"]), posted)
+    actor = np.asarray(cols["actor_id"], dtype=np.int64)[mask]
+    day = _kst_day_index(_ts_int(cols)[mask])
+    pairs, counts = np.unique(actor * (1 << 32) + day, return_counts=True)
+    return pd.DataFrame({
+        "user_id": np.asarray(dicts["actor_id"], dtype=object)[pairs >> 32],
+        "day": pairs & 0xFFFFFFFF,
+        "posts": counts,
+    })
+
+
+def posting_frequency(since: Optional[str] = None) -> pd.DataFrame:
+    """사용자별 게시 수, 게시한 날 수, 첫 게시 이후 하루 평균 게시 수"""
+    parts = [p for d, p in _per_bucket("posting", ["ts", "event_type", "actor_id"], _posting_part)
+             if since is None or d == "open" or d >= since]
+    if not parts:
+        return pd.DataFrame(columns=["user_id", "posts", "active_days", "posts_per_day"])
+    df = pd.concat(parts, ignore_index=True)
+    df = df.groupby(["user_id", "day"], as_index=False)["posts"].sum()
+    g = df.groupby("user_id")
+    out = g.agg(posts=("posts", "sum"), active_days=("day", "size"), first=("day", "min"))
+    today = int(_kst_day_index(np.int64(datetime.now(tz=KST).timestamp() * 1_000_000)))
+    out["posts_per_day"] = out["posts"] / (today - out["first"] + 1).clip(lower=1)
+    return out.drop(columns="first").sort_values("posts", ascending=False).reset_index()
+
+
+# ----------------------------
+# 게시물 반응 곡선
+# ----------------------------
+def _post_created_us() -> pd.Series:
+    """post_id → 작성 시각(UTC 마이크로초). posts.csv 가 바뀔 때만 다시 읽는다"""
+    key = ("post_created", table_version(POSTS))
+    with _guard:
+        s = _cache.get(key)
+    if s is None:
+        paths = table_files(POSTS)  # 월별 파티션이면 파티션 파일들
+        if paths:
+            df = pd.concat([pd.read_csv(p, usecols=["post_id", "created_at"], dtype=str, keep_default_na=False)
+                            for p in paths], ignore_index=True)
+            ts = pd.to_datetime(df["created_at"], format="ISO8601", utc=True, errors="coerce")
+            ok = ts.notna().to_numpy()
+            us = ts[ok].dt.as_unit("us").astype("int64").to_numpy()
+            s = pd.Series(us, index=df["post_id"].to_numpy()[ok])
+            s = s[~s.index.duplicated(keep="last")]
+        else:
+            s = pd.Series(dtype=np.int64)
+        with _guard:
+            for k in [k for k in _cache if k[0] == "post_created"]:
+                del _cache[k]
+            _cache[key] = s
+    return s
+
+
+def _engagement_part(bucket_hours: int):
+    def compute(cols, dicts) -> pd.DataFrame:
+        wanted = _codes_of(dicts, "event_type", ENGAGEMENT_EVENTS)
+        codes = np.asarray(cols["event_type"])
+        mask = np.isin(codes, wanted)
+        # 대상 게시물: 좋아요는 target_id, 댓글은 meta_post_id, 리포스트는 meta_original_post_id
+        names = np.asarray(dicts["event_type"], dtype=object)[codes[mask].astype(np.int64)]
+        post = np.where(names == "COMMENT_CREATED", np.asarray(cols["meta_post_id"])[mask],
+                        np.where(names == "REPOST_CREATED", np.asarray(cols["meta_original_post_id"])[mask],
+                                 np.asarray(cols["target_id"])[mask]))
+        created = _post_created_us().reindex(post).to_numpy()
+        ok = ~np.isnan(created)
+        offset = (_ts_int(cols)[mask][ok] - created[ok].astype(np.int64)) // (bucket_hours * _US_PER_HOUR)
+        df = pd.DataFrame({"post_id": post[ok], "bucket": np.maximum(offset, 0)})
+        return df.groupby(["post_id", "bucket"], as_index=False).size()
+    return compute
+
+
+def engagement_curves(post_ids: Iterable[str], bucket_hours: int = 1, horizon_hours: int = 72) -> pd.DataFrame:
+    """
+    게시물별 누적 반응 수(좋아요 + 댓글 + 리포스트) 곡선.
+    행: 작성 후 경과 시간(시간), 열: post_id
+    """
+    post_ids = list(post_ids)
+    columns = ["ts", "event_type", "target_id", "meta_post_id", "meta_original_post_id"]
+    parts = [p for _, p in _per_bucket(("engagement", bucket_hours), columns, _engagement_part(bucket_hours))]
+    n_buckets = max(1, horizon_hours // bucket_hours)
+    index = pd.Index(np.arange(n_buckets) * bucket_hours, name="hours")
+    if not parts or not post_ids:
+        return pd.DataFrame(index=index, columns=post_ids, dtype=np.int64).fillna(0)
+    df = pd.concat(parts, ignore_index=True)
+    df = df[df["post_id"].isin(post_ids) & (df["bucket"] < n_buckets)]
+    table = df.pivot_table(index="bucket", columns="post_id", values="size", aggfunc="sum", fill_value=0)
+    table = table.reindex(index=range(n_buckets), columns=post_ids, fill_value=0).cumsum()
+    table.index = index
+    table.columns.name = None
+    return table
+
+
+# ----------------------------
+# 반응 테이블
+# ----------------------------
+def load_reactions() -> pd.DataFrame:
+    """reactions.csv → post_id/user_id 는 category, created_at 은 datetime64(KST)"""
+    if not table_exists(REACTIONS):
+        return pd.DataFrame(columns=["post_id", "user_id", "created_at"])
+    if storage_path(REACTIONS) != REACTIONS:  # 바이너리 저장이면 csv_repo 로 디코딩
+        df = pd.DataFrame(read_csv(REACTIONS), columns=["post_id", "user_id", "created_at"])
+        df = df.astype({"post_id": "category", "user_id": "category"})
+    else:
+        df = pd.read_csv(REACTIONS, dtype={"post_id": "category", "user_id": "category"}, keep_default_na=False)
+    df["created_at"] = pd.to_datetime(df["created_at"], format="ISO8601", utc=True, errors="coerce").dt.tz_convert(KST)
+    return df
+
+
+def top_liked_posts(n: int = 5) -> pd.Series:
+    """현재 좋아요 수 상위 게시물 (post_id → 좋아요 수)"""
+    df = load_reactions()
+    if df.empty:
+        return pd.Series(dtype=np.int64)
+    return df["post_id"].value_counts().head(n)
@@ -3,7 +3,8 @@ import os
 import hashlib
 from typing import Optional, Dict
 from utils.time import now_kst_iso
-from repo.csv_repo import read_csv, write_csv, append_csv, next_id
+from repo.csv_repo import read_csv, append_csv, next_id
+from repo.offset_index import lookup_row
 
 USERS = os.path.join("data", "users.csv")
 
@@ -71,25 +72,23 @@ def get_display_name(user_id: str) -> str:
     """
     user_id → display_name 조회 (없으면 user_id)
     """
-    for r in _load_users():
-        if r.get("user_id") == user_id:
-            return r.get("display_name") or r.get("username") or user_id
+    r = get_user_by_id(user_id)
+    if r:
+        return r.get("display_name") or r.get("username") or user_id
     return user_id
 
 def get_username(user_id: str) -> str:
     """
     user_id → username 조회 (없으면 user_id 반환)
     """
-    for r in _load_users():
-        if r.get("user_id") == user_id:
-            return r.get("username") or user_id
+    r = get_user_by_id(user_id)
+    if r:
+        return r.get("username") or user_id
     return user_id
 
 def get_user_by_id(user_id: str):
     """
     users.csv 에서 user_id로 한 명 조회 (없으면 None)
+    - user_id → 바이트 오프셋 인덱스로 해당 줄만 읽는다
     """
-    for r in _load_users():
-        if r.get("user_id") == user_id:
-            return r
-    return None
\ No newline at end of file
+    return lookup_row(USERS, user_id)
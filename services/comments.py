@@ -1,7 +1,8 @@
 # services/comments.py
 import os
 from typing import List, Dict, Optional
-from repo.csv_repo import read_csv, write_csv, append_csv, next_id
+from repo.csv_repo import read_csv_cached, append_csv, update_csv, next_id
+from repo.offset_index import lookup_row
 from utils.time import now_kst_iso
 from services.activity import log_event  # ★ 활동 로그
 
@@ -12,8 +13,7 @@ def create_comment(post_id: str, author_id: str, content: str, parent_comment_id
         raise ValueError("comment content is required")
     # 1단계 대댓글만 허용
     if parent_comment_id:
-        rows = read_csv(COMMENTS)
-        parent = next((r for r in rows if r["comment_id"] == parent_comment_id), None)
+        parent = lookup_row(COMMENTS, parent_comment_id)
         if not parent:
             raise ValueError("parent comment not found")
         if parent.get("parent_comment_id"):
@@ -41,20 +41,25 @@ def create_comment(post_id: str, author_id: str, content: str, parent_comment_id
     return cid
 
 def list_comments(post_id: str) -> List[Dict[str, str]]:
-    rows = [r for r in read_csv(COMMENTS) if r["post_id"] == post_id and r.get("is_deleted") != "1"]
+    rows = [r for r in read_csv_cached(COMMENTS) if r["post_id"] == post_id and r.get("is_deleted") != "1"]
     rows.sort(key=lambda r: r["created_at"])
     return rows
 
 def delete_comment(comment_id: str, actor_id: str) -> None:
-    rows = read_csv(COMMENTS)
     changed = False
-    for r in rows:
-        if r["comment_id"] == comment_id:
-            r["is_deleted"] = "1"
-            changed = True
-            break
+
+    def _mark(rows: List[Dict[str, str]]):
+        nonlocal changed
+        for r in rows:
+            if r["comment_id"] == comment_id:
+                r["is_deleted"] = "1"
+                changed = True
+                return rows
+        changed = False
+        return None
+
+    update_csv(COMMENTS, _mark)
     if changed:
-        write_csv(COMMENTS, rows)
         log_event(
             event_type="COMMENT_DELETED",
             actor_id=actor_id,
@@ -64,4 +69,4 @@ def delete_comment(comment_id: str, actor_id: str) -> None:
         )
 
 def count_comments(post_id: str) -> int:
-    return sum(1 for r in read_csv(COMMENTS) if r["post_id"] == post_id and r.get("is_deleted") != "1")
+    return sum(1 for r in read_csv_cached(COMMENTS) if r["post_id"] == post_id and r.get("is_deleted") != "1")
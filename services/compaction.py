@@ -0,0 +1,273 @@
+# services/compaction.py
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from repo.csv_repo import read_csv, read_csv_cached, update_csv, append_csv, table_exists, is_replica
+from utils.ids import id_num
+from utils.time import KST, now_kst_iso
+
+_log = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+POSTS = os.path.join(DATA_DIR, "posts.csv")
+COMMENTS = os.path.join(DATA_DIR, "comments.csv")
+POST_TAGS = os.path.join(DATA_DIR, "post_hashtags.csv")
+LOG_PATH = os.path.join(DATA_DIR, "activity_log.csv")
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+POSTS_ARCHIVE = os.path.join(ARCHIVE_DIR, "posts.csv")
+COMMENTS_ARCHIVE = os.path.join(ARCHIVE_DIR, "comments.csv")
+
+# 삭제된 지 이 기간이 지난 행만 콜드 아카이브로 옮긴다
+RETENTION_DAYS = 30
+
+# 행을 옮겨서 어차피 다시 쓰는 핫 테이블은 그 김에 주 접근 키 순으로 정렬해 둔다.
+# 바뀐 것이 없는 테이블은 다시 쓰지 않는다(재작성은 증분 캐시/오프셋 인덱스/파생 상태를 모두 처음부터 읽게 함)
+SORT_KEYS = {
+    POSTS: lambda r: id_num(r.get("post_id", "")),
+    COMMENTS: lambda r: (id_num(r.get("post_id", "")), r.get("created_at", "")),
+    POST_TAGS: lambda r: (r.get("hashtag", ""), id_num(r.get("post_id", ""))),
+}
+
+
+def _parse_iso(s: str) -> Optional[datetime]:
+    try:
+        dt = datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=KST)
+
+
+def _deleted_at(deleted_event: str, restored_event: Optional[str]) -> Dict[str, str]:
+    """activity_log 에서 대상별 마지막 삭제 시각 (이후 복구됐으면 제외)"""
+    out: Dict[str, str] = {}
+    for r in read_csv_cached(LOG_PATH):
+        et = r.get("event_type")
+        if et == deleted_event:
+            out[r["target_id"]] = r["created_at"]
+        elif restored_event and et == restored_event:
+            out.pop(r["target_id"], None)
+    return out
+
+
+def _expired(row: dict, deleted: Dict[str, str], key: str, cutoff: datetime) -> bool:
+    """
+    삭제 후 cutoff 이전인지. 로그가 생기기 전에 삭제된 행은 삭제 시각을 알 수 없으므로
+    작성 시각으로 대신 판단한다(삭제 시각은 항상 작성 시각 이후).
+    """
+    if row.get("is_deleted") != "1":
+        return False
+    when = _parse_iso(deleted.get(row[key]) or row.get("created_at", ""))
+    return when is not None and when < cutoff
+
+
+def _add_to_archive(path: str, rows: List[dict], key: str) -> None:
+    """아카이브에 행 추가(같은 id가 이미 있으면 교체). 핫 테이블에서 지우기 전에 호출"""
+    if not rows:
+        return
+    by_id = {r[key]: r for r in rows}
+
+    def _merge(archived: List[dict]):
+        kept = [r for r in archived if r.get(key) not in by_id]
+        return kept + list(by_id.values())
+
+    update_csv(path, _merge)
+
+
+def _drop_from_archive(path: str, key: str, ids: Set[str]) -> List[dict]:
+    """아카이브에서 ids 행을 꺼내 돌려준다"""
+    taken: List[dict] = []
+
+    def _take(archived: List[dict]):
+        taken.clear()
+        kept = []
+        for r in archived:
+            (taken if r.get(key) in ids else kept).append(r)
+        return kept if taken else None
+
+    if ids and os.path.exists(path):
+        update_csv(path, _take)
+    return taken
+
+
+def compact(retention_days: int = RETENTION_DAYS) -> Dict[str, int]:
+    """
+    소프트 삭제 후 retention_days 가 지난 게시물/댓글을 data/archive/ 로 옮기고,
+    옮긴 게시물의 post_hashtags 매핑을 지운다. 행이 빠진 테이블만 주 접근 키 순으로 다시 쓴다.
+    - 옮긴 게시물의 댓글도 함께 아카이브(복구 시 같이 돌아옴)
+    - 살아 있는 답글이 달린 삭제 댓글, 남아 있는 리포스트의 원본 글은 고아가 되지 않도록 남긴다
+    - 게시물 아카이브 행에는 archived_at, archived_hashtags(공백 구분)를 덧붙인다
+    반환: 처리 건수 요약
+    """
+    cutoff = datetime.now(tz=KST) - timedelta(days=retention_days)
+    now = now_kst_iso()
+    stats = {"posts": 0, "comments": 0, "post_hashtags": 0}
+
+    # 1) 게시물: 아카이브에 먼저 쓰고 → 핫 테이블에서 제거 (중간에 죽어도 유실 없음)
+    post_deleted = _deleted_at("POST_DELETED", "POST_RESTORED")
+    posts = read_csv(POSTS)
+    cand_ids = {r["post_id"] for r in posts if _expired(r, post_deleted, "post_id", cutoff)}
+    cand_ids -= _originals_of_live(posts, cand_ids)
+    candidates = [r for r in posts if r["post_id"] in cand_ids]
+    tags_by_post: Dict[str, List[str]] = {}
+    for r in read_csv(POST_TAGS):
+        if r.get("post_id") in cand_ids:
+            tags_by_post.setdefault(r["post_id"], []).append(r["hashtag"])
+    _add_to_archive(POSTS_ARCHIVE, [
+        dict(r, archived_at=now, archived_hashtags=" ".join(tags_by_post.get(r["post_id"], [])))
+        for r in candidates
+    ], "post_id")
+
+    purged: Set[str] = set()
+
+    def _purge_posts(rows: List[dict]):
+        # 그 사이 리포스트된 원본도 남긴다
+        ids = cand_ids - _originals_of_live(rows, cand_ids)
+        purged.clear()
+        kept = []
+        for r in rows:
+            # 그 사이 복구된 글은 남긴다
+            if r["post_id"] in ids and r.get("is_deleted") == "1":
+                purged.add(r["post_id"])
+            else:
+                kept.append(r)
+        return sorted(kept, key=SORT_KEYS[POSTS]) if purged else None
+
+    if cand_ids:
+        update_csv(POSTS, _purge_posts)
+        # 복구되어 남은 글은 아카이브에서 되돌림
+        _drop_from_archive(POSTS_ARCHIVE, "post_id", cand_ids - purged)
+    stats["posts"] = len(purged)
+
+    # 2) 댓글: 오래전에 삭제된 댓글 + 아카이브된 게시물에 달린 댓글
+    cm_deleted = _deleted_at("COMMENT_DELETED", None)
+    comments = read_csv(COMMENTS)
+    cm_ids = {
+        r["comment_id"] for r in comments
+        if r.get("post_id") in purged or _expired(r, cm_deleted, "comment_id", cutoff)
+    }
+    cm_ids -= _parents_of_live(comments, cm_ids)
+    _add_to_archive(COMMENTS_ARCHIVE, [dict(r, archived_at=now) for r in comments if r["comment_id"] in cm_ids],
+                    "comment_id")
+
+    cm_purged: Set[str] = set()
+
+    def _purge_comments(rows: List[dict]):
+        # 그 사이 달린 답글이 있는 부모는 남긴다
+        ids = cm_ids - _parents_of_live(rows, cm_ids)
+        kept = [r for r in rows if r["comment_id"] not in ids]
+        cm_purged.clear()
+        cm_purged.update(r["comment_id"] for r in rows if r["comment_id"] in ids)
+        return sorted(kept, key=SORT_KEYS[COMMENTS]) if cm_purged else None
+
+    if cm_ids:
+        update_csv(COMMENTS, _purge_comments)
+        _drop_from_archive(COMMENTS_ARCHIVE, "comment_id", cm_ids - cm_purged)
+    stats["comments"] = len(cm_purged)
+
+    # 3) 아카이브된 게시물의 해시태그 매핑 제거
+    def _purge_tags(rows: List[dict]):
+        kept = [r for r in rows if r.get("post_id") not in purged]
+        stats["post_hashtags"] = len(rows) - len(kept)
+        return sorted(kept, key=SORT_KEYS[POST_TAGS]) if stats["post_hashtags"] else None
+
+    if purged and table_exists(POST_TAGS):
+        update_csv(POST_TAGS, _purge_tags)
+    return stats
+
+
+def _originals_of_live(rows: List[dict], leaving: Set[str]) -> Set[str]:
+    """핫 테이블에 남는 리포스트(leaving 에 없는 것)의 원본 글 id. resolve_originals 는 핫 테이블만 본다"""
+    return {r["original_post_id"] for r in rows
+            if r.get("original_post_id") and r["post_id"] not in leaving}
+
+
+def _parents_of_live(rows: List[dict], leaving: Set[str]) -> Set[str]:
+    """핫 테이블에 남는 댓글(leaving 에 없는 것)이 답글로 달린 부모 댓글 id"""
+    return {r["parent_comment_id"] for r in rows
+            if r.get("parent_comment_id") and r["comment_id"] not in leaving}
+
+
+def unarchive_post(post_id: str, actor_id: str) -> bool:
+    """
+    아카이브된 게시물을 핫 테이블로 되돌린다(is_deleted=0).
+    함께 아카이브됐던 (삭제되지 않은) 댓글과 해시태그 매핑도 복원한다.
+    반환: 아카이브에 있어서 복원했으면 True
+    """
+    if not os.path.exists(POSTS_ARCHIVE):
+        return False
+    row = next((r for r in read_csv(POSTS_ARCHIVE) if r.get("post_id") == post_id), None)
+    if row is None:
+        return False
+    if row.get("author_id") != actor_id:
+        raise PermissionError("you can restore only your own posts")
+
+    taken = _drop_from_archive(POSTS_ARCHIVE, "post_id", {post_id})
+    if not taken:
+        return False  # 다른 프로세스가 먼저 복원함
+    row = taken[0]
+    tags = (row.pop("archived_hashtags", "") or "").split()
+    row.pop("archived_at", None)
+    row["is_deleted"] = "0"
+    append_csv(POSTS, row)
+
+    if os.path.exists(COMMENTS_ARCHIVE):
+        cm_ids = {
+            r["comment_id"] for r in read_csv(COMMENTS_ARCHIVE)
+            if r.get("post_id") == post_id and r.get("is_deleted") != "1"
+        }
+        for c in _drop_from_archive(COMMENTS_ARCHIVE, "comment_id", cm_ids):
+            c.pop("archived_at", None)
+            append_csv(COMMENTS, c)
+
+    if tags:
+        def _link(rows: List[dict]):
+            have = {(r["post_id"], r["hashtag"]) for r in rows}
+            added = [{"post_id": post_id, "hashtag": t} for t in tags if (post_id, t) not in have]
+            return rows + added if added else None
+
+        update_csv(POST_TAGS, _link)
+    return True
+
+
+# ----------------------------
+# 백그라운드 작업
+# ----------------------------
+_job_started = False
+_job_guard = threading.Lock()
+
+
+def start_background_compaction(interval_sec: int = 6 * 3600,
+                                retention_days: int = RETENTION_DAYS) -> bool:
+    """프로세스당 한 번만 데몬 스레드를 띄워 주기적으로 compact() 실행. 새로 띄웠으면 True"""
+    global _job_started
+    if is_replica():  # 복제본은 primary 의 정리 결과를 변경 스트림으로 받는다
+        return False
+    with _job_guard:
+        if _job_started:
+            return False
+        _job_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_sec):
+            try:
+                compact(retention_days)
+            except Exception:  # 다음 주기에 다시 시도
+                _log.exception("compaction failed")
+
+    threading.Thread(target=_loop, name="compaction", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="삭제된 게시물/댓글 아카이브 + 핫 테이블 정리")
+    ap.add_argument("--days", type=int, default=RETENTION_DAYS, help="삭제 후 보존 기간(일)")
+    args = ap.parse_args()
+    print(compact(args.days))
@@ -0,0 +1,348 @@
+# services/feed_query.py
+# 피드 질의 플래너: 해시태그 / 팔로잉 범위 / 검색어 / 기간 / 정렬을 선언적인 FeedQuery 하나로 받아
+# 인덱스 통계로 조건별 선택도를 어림한 뒤 가장 적게 훑는 경로(드라이버)부터 읽는다.
+#   - tag     : 해시태그 → post_id 포스팅 (post_hashtags 증분 읽기로 유지)
+#   - authors : 팔로잉 작성자들의 글 (작성자 → post_id 포스팅, 처음 쓸 때 posts 에서 만든다)
+#   - recent  : 최근 글부터(월별 파티션이면 기간 밖 월은 건너뜀) 순서대로 훑기
+#   - hot     : 인기순이면 항상 이것. 미리 정렬된 랭킹 상위 K(services/ranking)를 순서대로 가져오고,
+#               모자라면 나머지만 최근 글부터 채운다
+# id 집합 드라이버는 가진 집합끼리 교집합을 만든 뒤 id 역순(= 작성 역순)으로 조금씩 행을 가져오고,
+# 어느 경로든 나머지 조건은 행 단위로 거르며, 최신 limit 개를 채우면 더 읽지 않는다.
+# 정렬(좋아요/댓글순)은 그렇게 고른 limit 개 안에서만 한다(댓글 수는 후보 전체를 한 번에 센다).
+#   python -m services.feed_query --tag 여행 --explain
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from repo.csv_repo import read_csv_cached, read_csv_since
+from repo.offset_index import lookup_rows
+from repo.partitions import load_manifest, recent_chunks
+from services.reposts import resolve_originals
+from utils.ids import id_num
+from utils.time import KST
+
+POSTS = os.path.join("data", "posts.csv")
+POST_TAGS = os.path.join("data", "post_hashtags.csv")
+COMMENTS = os.path.join("data", "comments.csv")
+USERS = os.path.join("data", "users.csv")
+
+SORTS = ("recent", "likes", "comments", "hot")
+# id 로 행을 하나 가져오는 비용(캐시된 행 하나를 훑는 비용 대비)
+FETCH_COST = 20.0
+# id 집합 드라이버가 한 번에 가져오는 최소 행 수
+FETCH_BATCH = 64
+
+
+@dataclass
+class FeedQuery:
+    """
+    tag: 해시태그(정규화된 소문자, # 없이)
+    authors: 이 작성자들의 글만 (팔로잉 범위). None 이면 제한 없음
+    search: 본문/작성자 부분 문자열(리포스트는 원본 기준)
+    since: 이 시각(ISO, KST) 이후 글만
+    sort: recent | likes | comments | hot,  window: 인기순 랭킹 기간(all | 24h | 7d | 30d)
+    """
+    tag: str = ""
+    authors: Optional[Set[str]] = None
+    search: str = ""
+    since: Optional[str] = None
+    sort: str = "recent"
+    window: str = "all"
+    limit: int = 500
+
+    @staticmethod
+    def since_days(days: Optional[int]) -> Optional[str]:
+        return (datetime.now(tz=KST) - timedelta(days=days)).isoformat() if days else None
+
+
+@dataclass
+class Plan:
+    driver: str                               # tag | authors | recent | hot
+    estimates: Dict[str, float] = field(default_factory=dict)   # 조건별 예상 행 수
+    costs: Dict[str, float] = field(default_factory=dict)       # 드라이버별 예상 비용
+    scanned: int = 0                          # 실제로 살펴본 행 수
+
+
+# ----------------------------
+# 포스팅: 컬럼 값 → post_id
+# ----------------------------
+class Postings:
+    """key 컬럼 값(해시태그, 작성자) → post_id (쓰인 순). 테이블에 붙은 행만 이어서 반영하고, 재작성되면 다시 만든다"""
+
+    def __init__(self, path: str, key: str):
+        self.path, self.key = path, key
+        self.lists: Dict[str, List[str]] = {}
+        self.cursor: Optional[Tuple[int, int]] = None
+
+    def refresh(self) -> None:
+        rows, self.cursor, reset = read_csv_since(self.path, self.cursor)
+        if reset:
+            self.lists = {}
+        for r in rows:
+            self.lists.setdefault(r.get(self.key, ""), []).append(r["post_id"])
+
+    def count(self, keys: Iterable[str]) -> int:
+        return sum(len(self.lists.get(k, ())) for k in keys)
+
+    def post_ids(self, keys: Iterable[str]) -> Set[str]:
+        return {pid for k in keys for pid in self.lists.get(k, ())}
+
+
+# 태그 포스팅은 작아서 항상, 작성자 포스팅은 팔로잉 범위를 그걸로 읽기로 처음 정했을 때 만든다
+_SOURCES = {"tag": (POST_TAGS, "hashtag"), "authors": (POSTS, "author_id")}
+_postings: Dict[str, Postings] = {}
+_guard = threading.RLock()
+
+
+def _get_postings(name: str, build: bool = True) -> Optional[Postings]:
+    """build=False 면 이미 만들어 둔 것만 갱신해서 돌려준다(없으면 None)"""
+    with _guard:
+        idx = _postings.get(name)
+        if idx is None:
+            if not build:
+                return None
+            idx = _postings[name] = Postings(*_SOURCES[name])
+        idx.refresh()
+        return idx
+
+
+# ----------------------------
+# 통계
+# ----------------------------
+def _table_stats(since: Optional[str]) -> Tuple[int, int]:
+    """(전체 글 수, since 이후 예상 글 수). 월별 파티션이면 manifest, 아니면 작성 시각이 고르다고 보고 비례 계산"""
+    m = load_manifest(POSTS)
+    if m is not None:
+        parts = m["partitions"].values()
+        total = sum(s.get("rows", 0) for s in parts)
+        if not since:
+            return total, total
+        return total, sum(s["rows"] for s in parts if s.get("rows") and s["max_at"] >= since)
+    rows = read_csv_cached(POSTS)
+    total = len(rows)
+    if not since or not rows:
+        return total, total
+    try:
+        first = datetime.fromisoformat(rows[0]["created_at"])
+        start = datetime.fromisoformat(since)
+    except (KeyError, TypeError, ValueError):
+        return total, total
+    span = (datetime.now(tz=KST) - first).total_seconds()
+    window = (datetime.now(tz=KST) - start).total_seconds()
+    return total, total if span <= 0 else min(total, int(total * window / span) + 1)
+
+
+def plan(q: FeedQuery, tag_ids: Optional[Set[str]] = None, hot_ids: Optional[List[str]] = None) -> Plan:
+    """
+    조건별 예상 행 수로 드라이버를 고른다.
+    - 최근 글부터 훑기: 기간 안 글 수와 "limit 개를 채우려면 훑어야 할 글 수"(= limit / 다른 조건 선택도) 중 작은 쪽
+    - id 집합: 후보 수(다른 조건으로 일찍 멈출 수 있으면 그만큼) × id 로 행을 가져오는 비용
+    - 인기순(hot_ids 가 주어짐): 순서가 랭킹에서 오므로 비용과 상관없이 랭킹 순서대로 가져온다
+    """
+    total, in_window = _table_stats(q.since)
+    total = max(total, 1)
+    est: Dict[str, float] = {"total": total, "window": in_window}
+    if q.tag:
+        est["tag"] = len(tag_ids if tag_ids is not None else _tag_ids(q.tag.lstrip("#").lower()))
+    if q.authors is not None:
+        idx = _get_postings("authors", build=False)
+        if idx is not None:
+            est["authors"] = idx.count(q.authors)
+        else:  # 포스팅을 아직 만들지 않았으면 팔로잉 비율로 어림(만드는 비용은 한 번뿐이라 계산에 넣지 않는다)
+            users = max(len(read_csv_cached(USERS)), 1)
+            est["authors"] = total * min(len(q.authors) / users, 1.0)
+
+    def sel(name: str) -> float:
+        return min(est[name] / total, 1.0)
+
+    def need(skip: str) -> float:
+        """skip 외 조건들의 선택도로 limit 개를 채우려면 훑어야 할 글 수"""
+        p = 1.0
+        for name in ("tag", "authors", "window"):
+            if name in est and name != skip:
+                p *= sel(name)
+        return q.limit / p if p > 0 else float("inf")
+
+    costs = {"recent": min(in_window, need("window"))}
+    if "tag" in est:
+        costs["tag"] = min(est["tag"], need("tag")) * FETCH_COST
+    if "authors" in est:
+        costs["authors"] = min(est["authors"], need("authors")) * FETCH_COST
+    if hot_ids is not None:
+        est["hot"] = len(hot_ids)
+        costs["hot"] = min(est["hot"], need("window")) * FETCH_COST
+        return Plan(driver="hot", estimates=est, costs=costs)
+    driver = min(costs, key=costs.get)
+    return Plan(driver=driver, estimates=est, costs=costs)
+
+
+# ----------------------------
+# 실행
+# ----------------------------
+def _tag_ids(tag: str) -> Set[str]:
+    return _get_postings("tag").post_ids([tag])
+
+
+def matches_search(row: dict, q: str, originals: Dict[str, dict]) -> bool:
+    """q(소문자)가 본문/작성자에 들어 있는지. 리포스트는 원본 행으로 검사"""
+    orig_id = row.get("original_post_id", "")
+    target = originals.get(orig_id, row) if orig_id else row
+    return q in (target.get("content") or "").lower() or q in (target.get("author_id") or "").lower()
+
+
+def _filter(rows: List[dict], q: FeedQuery, checks: List[Callable[[dict], bool]], search: str) -> List[dict]:
+    out = [r for r in rows
+           if r.get("is_deleted") != "1"
+           and (q.since is None or r.get("created_at", "") >= q.since)
+           and all(c(r) for c in checks)]
+    if search and out:
+        originals = resolve_originals(out)  # 리포스트 원본은 이 묶음에 필요한 것만 한 번에
+        out = [r for r in out if matches_search(r, search, originals)]
+    return out
+
+
+def _scan_recent(q: FeedQuery, checks: List[Callable[[dict], bool]], search: str, p: Plan) -> List[dict]:
+    out: List[dict] = []
+    for rows in recent_chunks(POSTS, q.since):
+        p.scanned += len(rows)
+        page = _filter(rows, q, checks, search)
+        page.sort(key=lambda r: r["created_at"], reverse=True)
+        out.extend(page)
+        if len(out) >= q.limit:
+            break
+    return out[:q.limit]
+
+
+def _fetch_ids(ids: Set[str], q: FeedQuery, checks: List[Callable[[dict], bool]], search: str,
+               p: Plan) -> List[dict]:
+    """id 역순(작성 역순)으로 조금씩 가져와 거르고, limit 을 채우거나 since 이전 글에 닿으면 멈춘다"""
+    ordered = sorted(ids, key=id_num, reverse=True)
+    out: List[dict] = []
+    i = 0
+    while i < len(ordered) and len(out) < q.limit:
+        chunk = ordered[i:i + max(2 * (q.limit - len(out)), FETCH_BATCH)]
+        i += len(chunk)
+        found = lookup_rows(POSTS, chunk)
+        rows = [found[pid] for pid in chunk if pid in found]
+        p.scanned += len(rows)
+        out.extend(_filter(rows, q, checks, search))
+        if q.since and any(r.get("created_at", "") < q.since for r in rows):
+            break  # id 는 작성 순서로 늘어나므로 남은 것은 모두 기간 밖
+    out.sort(key=lambda r: r["created_at"], reverse=True)
+    return out[:q.limit]
+
+
+def _fetch_ranked(ids: List[str], q: FeedQuery, checks: List[Callable[[dict], bool]], search: str,
+                  p: Plan) -> List[dict]:
+    """ids 순서(인기순) 그대로 조금씩 가져와 거르고, limit 을 채우면 멈춘다"""
+    out: List[dict] = []
+    i = 0
+    while i < len(ids) and len(out) < q.limit:
+        chunk = ids[i:i + max(2 * (q.limit - len(out)), FETCH_BATCH)]
+        i += len(chunk)
+        found = lookup_rows(POSTS, chunk)
+        rows = [found[pid] for pid in chunk if pid in found]
+        p.scanned += len(rows)
+        out.extend(_filter(rows, q, checks, search))
+    return out[:q.limit]
+
+
+def _comment_counts(post_ids: Set[str]) -> Dict[str, int]:
+    """후보 글들의 (삭제되지 않은) 댓글 수를 comments 한 번 훑어서"""
+    counts = dict.fromkeys(post_ids, 0)
+    for r in read_csv_cached(COMMENTS):
+        pid = r.get("post_id")
+        if pid in counts and r.get("is_deleted") != "1":
+            counts[pid] += 1
+    return counts
+
+
+def _sort(rows: List[dict], q: FeedQuery) -> None:
+    """rows 는 이미 최신순. 같은 값이면 최신 글이 앞에 오도록 안정 정렬 (인기순은 드라이버가 이미 순서대로 가져옴)"""
+    if q.sort == "likes":
+        from services.reaction_buffer import get_buffer  # 좋아요순을 쓸 때만 필요
+        likes = get_buffer().counts(r["post_id"] for r in rows)
+        rows.sort(key=lambda r: likes[r["post_id"]], reverse=True)
+    elif q.sort == "comments":
+        counts = _comment_counts({r["post_id"] for r in rows})
+        rows.sort(key=lambda r: counts[r["post_id"]], reverse=True)
+
+
+def run_query(q: FeedQuery) -> Tuple[List[dict], Plan]:
+    """
+    FeedQuery 를 실행. 반환: (조건을 모두 만족하는 최신 limit 개를 q.sort 로 정렬한 행, 실행 계획)
+    인기순은 랭킹 상위부터 조건을 만족하는 limit 개(모자라면 나머지는 최신순)
+    """
+    if q.sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    tag = (q.tag or "").lstrip("#").lower()
+    tag_ids = _tag_ids(tag) if tag else None
+    hot_ids: Optional[List[str]] = None
+    if q.sort == "hot":
+        from services.ranking import hot_post_ids  # 인기순을 쓸 때만 필요
+        hot_ids = hot_post_ids(q.window)
+    p = plan(q, tag_ids, hot_ids)
+    search = (q.search or "").strip().lower()
+
+    # 드라이버가 아닌 id 집합 조건: 이미 손에 있는 집합이면 교집합, 아니면 행 단위 검사
+    candidates: Optional[Set[str]] = None
+    checks: List[Callable[[dict], bool]] = []
+    if p.driver == "authors":
+        candidates = _get_postings("authors").post_ids(q.authors)
+    if tag_ids is not None:
+        candidates = tag_ids if candidates is None else candidates & tag_ids
+    if q.authors is not None and p.driver != "authors":
+        authors = q.authors
+        checks.append(lambda r: r.get("author_id") in authors)
+    if p.driver in ("recent", "hot") and tag_ids is not None:
+        checks.append(lambda r: r["post_id"] in tag_ids)
+    if p.driver == "recent":
+        rows = _scan_recent(q, checks, search, p)
+    elif p.driver == "hot":
+        rows = _fetch_ranked(hot_ids or [], q, checks, search, p)
+        if len(rows) < q.limit:  # 기간 안 랭킹이 모자라면 나머지 자리만 최신순으로 채운다
+            taken = {r["post_id"] for r in rows}
+            rest = replace(q, limit=q.limit - len(rows))
+            rows += _scan_recent(rest, checks + [lambda r: r["post_id"] not in taken], search, p)
+    else:
+        rows = _fetch_ids(candidates or set(), q, checks, search, p)
+    _sort(rows, q)
+    return rows, p
+
+
+def feed(q: FeedQuery) -> List[dict]:
+    return run_query(q)[0]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="피드 질의 실행 + 실행 계획 출력")
+    ap.add_argument("--tag", default="")
+    ap.add_argument("--following-of", default="", help="이 user_id 가 팔로우하는 사람들의 글만")
+    ap.add_argument("--search", default="")
+    ap.add_argument("--days", type=int, default=None, help="최근 N일")
+    ap.add_argument("--sort", choices=SORTS, default="recent")
+    ap.add_argument("--window", choices=("all", "24h", "7d", "30d"), default="all", help="인기순 랭킹 기간")
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--explain", action="store_true", help="행 대신 계획만 출력")
+    args = ap.parse_args()
+    authors = None
+    if args.following_of:
+        from services.follows import get_following  # CLI 에서만 필요
+        authors = set(get_following(args.following_of))
+    query = FeedQuery(tag=args.tag, authors=authors, search=args.search,
+                      since=FeedQuery.since_days(args.days), sort=args.sort, window=args.window,
+                      limit=args.limit)
+    t0 = time.perf_counter()
+    result, used = run_query(query)
+    ms = (time.perf_counter() - t0) * 1000
+    if not args.explain:
+        for r in result:
+            print(r["post_id"], r["created_at"], r["author_id"], (r.get("content") or "")[:40])
+    print(f"driver={used.driver} rows={len(result)} scanned={used.scanned} {ms:.1f} ms")
+    print("estimates", {k: round(v) for k, v in used.estimates.items()})
+    print("costs", {k: round(v) for k, v in used.costs.items()})
@@ -1,27 +1,23 @@
 # services/follows.py
 import os
 from typing import List, Set
-from repo.csv_repo import read_csv, write_csv, append_csv
+from repo.csv_repo import select_where, count_where, append_csv_absent, update_csv
 from utils.time import now_kst_iso
 from services.activity import log_event  # 활동 로그
-from repo.csv_repo import read_csv
 
 
 FOLLOWS = os.path.join("data", "follows.csv")
 
-def _load() -> List[dict]:
-    return read_csv(FOLLOWS)
-
 def get_following(user_id: str) -> Set[str]:
     """user_id가 팔로우하는 대상들"""
-    return {r["followee_id"] for r in _load() if r["follower_id"] == user_id}
+    return set(select_where(FOLLOWS, "followee_id", {"follower_id": user_id}))
 
 def get_followers(user_id: str) -> Set[str]:
     """user_id를 팔로우하는 사람들"""
-    return {r["follower_id"] for r in _load() if r["followee_id"] == user_id}
+    return set(select_where(FOLLOWS, "follower_id", {"followee_id": user_id}))
 
 def is_following(follower_id: str, followee_id: str) -> bool:
-    return any(r for r in _load() if r["follower_id"] == follower_id and r["followee_id"] == followee_id)
+    return count_where(FOLLOWS, {"follower_id": follower_id, "followee_id": followee_id}) > 0
 
 def follow(follower_id: str, followee_id: str) -> bool:
     """
@@ -29,13 +25,14 @@ def follow(follower_id: str, followee_id: str) -> bool:
     """
     if follower_id == followee_id:
         return False
-    if is_following(follower_id, followee_id):
-        return False
-    append_csv(FOLLOWS, {
+    # 이미 팔로우 중인지 확인과 추가를 한 잠금 안에서 (동시에 눌러도 한 줄만)
+    added = append_csv_absent(FOLLOWS, [{
         "follower_id": follower_id,
         "followee_id": followee_id,
         "created_at": now_kst_iso()
-    })
+    }], ["follower_id", "followee_id"])
+    if not added:
+        return False
     log_event("USER_FOLLOWED", follower_id, "User", followee_id, {})
     return True
 
@@ -43,11 +40,12 @@ def unfollow(follower_id: str, followee_id: str) -> bool:
     """
     성공 시 True (한 줄 제거), 없으면 False
     """
-    rows = _load()
-    new_rows = [r for r in rows if not (r["follower_id"] == follower_id and r["followee_id"] == followee_id)]
-    if len(new_rows) == len(rows):
+    def _remove(rows: List[dict]):
+        new_rows = [r for r in rows if not (r["follower_id"] == follower_id and r["followee_id"] == followee_id)]
+        return new_rows if len(new_rows) < len(rows) else None
+
+    if update_csv(FOLLOWS, _remove) is None:
         return False
-    write_csv(FOLLOWS, new_rows)
     log_event("USER_UNFOLLOWED", follower_id, "User", followee_id, {})
     return True
 DATA_DIR = "data"
@@ -55,13 +53,19 @@ FOLLOWS_PATH = os.path.join(DATA_DIR, "follows.csv")
 
 def get_followers(user_id: str):
     """user_id를 팔로우하는 사람들의 집합(set[str])"""
-    if not os.path.exists(FOLLOWS_PATH):
-        return set()
-    return {r["follower_id"] for r in read_csv(FOLLOWS_PATH) if r.get("followee_id") == user_id}
+    return set(select_where(FOLLOWS_PATH, "follower_id", {"followee_id": user_id}))
 
 def follow_counts(user_id: str):
     """(followers, following) 튜플 반환"""
     followers = get_followers(user_id)
     from .follows import get_following  # 순환 import 회피용 지역 import
     following = get_following(user_id)
-    return len(followers), len(following)
\ No newline at end of file
+    return len(followers), len(following)
+
+def suggested_follows(user_id: str, limit: int = 5) -> List[dict]:
+    """
+    팔로우 추천 [{user_id, score, mutual, follows_you, co_likes}].
+    계산은 services.recommend 가 배치로 해 두고, 그 뒤에 새로 팔로우한 사람은 여기서 거른다.
+    """
+    from services.recommend import suggest_follows  # NumPy 는 추천을 볼 때만 필요하므로 지역 import
+    return suggest_follows(user_id, limit, get_following(user_id))
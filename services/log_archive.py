@@ -0,0 +1,366 @@
+# services/log_archive.py
+# activity_log.csv 의 오래된 날짜 구간을 압축해 data/archive/activity_log/ 로 옮기고 활성 로그를 줄인다.
+# - 날짜(KST)마다 파일 하나: 헤더 + 원래 줄 바이트 그대로. zstd 가 있으면 .zst, 없으면 표준 gzip(.gz)
+# - manifest.json 에 구간별 시간 범위/로그 번호 범위/행 수와, 활성 로그를 잘라낸 기록(trims)을 남긴다
+# - 읽기는 필요한 구간 파일만 열어 스트리밍으로 푼다(전체를 메모리에 올리지 않음)
+# 같은 로그 번호는 활성 로그가 우선: 보관 구간은 활성 로그 첫 행보다 작은 번호만 읽으므로
+# 압축 후 자르기 전에 죽어도 중복이 보이지 않고, 다음 실행이 이미 보관한 번호는 건너뛴다.
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from repo.csv_repo import (
+    table_lock, read_stamp, bump_version, journal_change, journal_file, check_writable, is_replica,
+)
+from utils.ids import id_num
+from utils.time import KST
+
+try:  # 선택 의존성: Python 3.14+ 표준 zstd, 또는 zstandard 패키지
+    from compression import zstd as _zstd
+    _zstandard = None
+except ImportError:
+    _zstd = None
+    try:
+        import zstandard as _zstandard
+    except ImportError:
+        _zstandard = None
+
+LOG_PATH = os.path.join("data", "activity_log.csv")
+ARCHIVE_DIR = os.path.join("data", "archive", "activity_log")
+MANIFEST = os.path.join(ARCHIVE_DIR, "manifest.json")
+
+# 이 기간(일)보다 오래된 날짜만 보관한다. compaction 의 보존 기간(30일)보다 길어야
+# 삭제 시각(POST_DELETED)을 활성 로그에서 계속 찾을 수 있다.
+KEEP_DAYS = 45
+_COPY_CHUNK = 1 << 20
+
+_log = logging.getLogger(__name__)
+
+
+# ----------------------------
+# 압축 형식
+# ----------------------------
+def default_codec() -> str:
+    return "zst" if (_zstd is not None or _zstandard is not None) else "gz"
+
+
+def _open_write(path: str, codec: str):
+    if codec == "gz":
+        return gzip.open(path, "wb", compresslevel=6)
+    if _zstd is not None:
+        return _zstd.open(path, "wb", level=9)
+    return _zstandard.ZstdCompressor(level=9).stream_writer(open(path, "wb"), closefd=True)
+
+
+def _open_read(path: str, codec: str):
+    """한 줄씩 읽을 수 있는 스트리밍 리더(필요한 만큼만 푼다)"""
+    if codec == "gz":
+        return gzip.open(path, "rb")
+    if _zstd is not None:
+        return _zstd.open(path, "rb")
+    if _zstandard is None:
+        raise RuntimeError(f"{path}: zstd archive but neither compression.zstd nor zstandard is available")
+    return io.BufferedReader(_zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+
+
+# ----------------------------
+# manifest
+# ----------------------------
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"version": 1, "segments": [], "trims": []}
+
+
+def _save_manifest(m: dict) -> None:
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(m, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, MANIFEST)
+    journal_file(MANIFEST)
+
+
+def _parse_time(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=KST)
+
+
+def segments_between(since: Optional[str] = None, until: Optional[str] = None) -> List[dict]:
+    """시간 범위 [since, until) 과 겹치는 보관 구간(오래된 순). 범위 밖 구간 파일은 열지 않는다"""
+    t_since, t_until = _parse_time(since), _parse_time(until)
+    out = []
+    for seg in sorted(load_manifest()["segments"], key=lambda s: s["first_num"]):
+        first, last = _parse_time(seg["first_ts"]), _parse_time(seg["last_ts"])
+        if t_since and last and last < t_since:
+            continue
+        if t_until and first and first >= t_until:
+            continue
+        out.append(seg)
+    return out
+
+
+def live_first_num() -> Optional[int]:
+    """활성 로그 첫 데이터 행의 로그 번호 (비었으면 None). 보관 구간은 이보다 작은 번호만 유효"""
+    if not os.path.exists(LOG_PATH):
+        return None
+    with table_lock(LOG_PATH, exclusive=False):
+        f = open(LOG_PATH, "rb")
+    with f:
+        f.readline()
+        line = f.readline()
+    head = line.split(b",", 1)[0].decode("utf-8", "replace")
+    return id_num(head) if line.endswith(b"\n") and head.startswith("l_") else None
+
+
+# ----------------------------
+# 스트리밍 읽기
+# ----------------------------
+def iter_segment_lines(seg: dict) -> Iterator[bytes]:
+    """보관 구간 파일 하나의 데이터 줄(헤더 제외)을 원래 바이트 그대로, 푸는 대로 하나씩"""
+    with _open_read(os.path.join(ARCHIVE_DIR, seg["file"]), seg["codec"]) as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def iter_archived(since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """
+    보관된 로그 행을 오래된 순으로 (created_at 이 [since, until) 인 것만).
+    겹치는 구간 파일만 열고 한 줄씩 풀어 파싱한다. 활성 로그에 아직 남은 번호는 건너뛴다.
+    """
+    t_since, t_until = _parse_time(since), _parse_time(until)
+    upper = live_first_num()
+    header = load_manifest().get("header") or []
+    for seg in segments_between(since, until):
+        for line in iter_segment_lines(seg):
+            values = next(csv.reader([line.decode("utf-8").rstrip("\r\n")]), [])
+            r = dict(zip(header, values))
+            if upper is not None and id_num(r.get("log_id", "")) >= upper:
+                return
+            if t_since or t_until:
+                created = _parse_time(r.get("created_at"))
+                if created and t_since and created < t_since:
+                    continue
+                if created and t_until and created >= t_until:
+                    return
+            yield r
+
+
+# ----------------------------
+# 보관 + 활성 로그 자르기
+# ----------------------------
+def _identity(f, lf) -> Tuple[int, int, int]:
+    st = os.fstat(f.fileno())
+    return st.st_dev, st.st_ino, read_stamp(lf)[1]
+
+
+def rebase_offset(identity: Tuple[int, int, int], offset: int) -> Optional[Tuple[Tuple[int, int, int], int]]:
+    """
+    identity 로그의 바이트 offset 이 자르기(trims) 뒤 어느 로그의 어디인지 따라간다.
+    offset 이 잘려 나간 구간 안이면 None (그 부분은 보관 구간에서 읽어야 함).
+    """
+    moved = False
+    for t in load_manifest()["trims"]:
+        if tuple(t["from"]) == tuple(identity):
+            if offset < t["cut"]:
+                return None
+            identity, offset = tuple(t["to"]), offset - t["cut"] + t["header_len"]
+            moved = True
+    return (identity, offset) if moved else None
+
+
+def archive_cold_segments(keep_days: int = KEEP_DAYS, today: Optional[str] = None,
+                          codec: Optional[str] = None) -> Dict[str, int]:
+    """
+    오늘(KST)로부터 keep_days 보다 오래된 날짜의 행을 날짜별 압축 파일로 옮기고 활성 로그에서 잘라낸다.
+    먼저 컬럼 내보내기를 돌려 잘라낼 구간이 이미 내보내져 있게 한다(분석 집계는 그대로 유지).
+    반환: {"rows": 보관한 행, "segments": 새 구간 파일 수, "trimmed_bytes": 활성 로그에서 줄인 바이트}
+    """
+    # 순환 import 회피용 지역 import (log_export 는 NumPy/pandas 를 올리므로 보관 작업 때만)
+    from services.log_export import export_closed_segments, _iter_records, _day_of
+
+    today = today or datetime.now(tz=KST).date().isoformat()
+    cutoff = (datetime.fromisoformat(today) - timedelta(days=keep_days)).date().isoformat()
+    codec = codec or default_codec()
+    if codec == "zst" and default_codec() != "zst":
+        raise RuntimeError("zstd is not available (needs Python 3.14+ or the zstandard package)")
+    check_writable(LOG_PATH)  # 복제본은 primary 가 보관·자른 결과를 그대로 받는다
+    stats = {"rows": 0, "segments": 0, "trimmed_bytes": 0}
+    if not os.path.exists(LOG_PATH):
+        return stats
+    export_closed_segments(today)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    with table_lock(LOG_PATH, exclusive=False) as lf:
+        f = open(LOG_PATH, "rb")
+        identity = _identity(f, lf)
+    with f, table_lock(MANIFEST, exclusive=True):
+        m = load_manifest()
+        header_line = f.readline()
+        data_start = len(header_line)
+        m.setdefault("header", next(csv.reader([header_line.decode("utf-8").strip("\r\n")]), []))
+        done = max((s["last_num"] for s in m["segments"]), default=0)
+
+        cut = data_start
+        day, lines, meta = None, [], {}
+
+        def _flush():
+            if not lines:
+                return
+            base, n = f"{day}.csv.{codec}", 1
+            while os.path.exists(os.path.join(ARCHIVE_DIR, base)):
+                n += 1
+                base = f"{day}.{n}.csv.{codec}"
+            path = os.path.join(ARCHIVE_DIR, base)
+            raw = sum(len(x) for x in lines)
+            with _open_write(path + ".tmp", codec) as out:
+                out.write(header_line)
+                for x in lines:
+                    out.write(x)
+            os.replace(path + ".tmp", path)
+            journal_file(path)
+            m["segments"].append(dict(meta, file=base, day=day, codec=codec, rows=len(lines),
+                                      raw_bytes=raw, bytes=os.path.getsize(path)))
+            _save_manifest(m)  # 구간마다 기록: 자르기 전에 죽어도 다음 실행이 번호로 건너뛴다
+            stats["rows"] += len(lines)
+            stats["segments"] += 1
+
+        for values, start, end in _iter_records(f, data_start):
+            r = dict(zip(m["header"], values))
+            d = _day_of(r.get("created_at", ""))
+            if d >= cutoff:
+                break
+            cut = end
+            num = id_num(r.get("log_id", ""))
+            if num <= done:
+                continue  # 지난 실행에서 이미 보관함(자르기만 못 함)
+            if d != day:
+                _flush()
+                day, lines = d, []
+                meta = {"first_log": r.get("log_id", ""), "first_num": num, "first_ts": r.get("created_at", "")}
+            f.seek(start)
+            lines.append(f.read(end - start))
+            f.seek(end)
+            meta.update(last_log=r.get("log_id", ""), last_num=num, last_ts=r.get("created_at", ""))
+        _flush()
+
+        if cut > data_start:
+            trimmed = _trim(identity, header_line, cut, m)
+            stats["trimmed_bytes"] = trimmed
+    return stats
+
+
+def _trim(identity: Tuple[int, int, int], header_line: bytes, cut: int, m: dict) -> int:
+    """
+    활성 로그에서 [헤더 뒤, cut) 를 잘라낸다. 남길 부분 대부분은 잠금 밖에서 복사하고,
+    배타 잠금은 그 사이 덧붙은 꼬리를 옮기고 교체하는 동안만 잡는다. 반환: 줄어든 바이트 수(그 사이 재작성됐으면 0)
+    """
+    d = os.path.dirname(LOG_PATH)
+    fd, tmp = tempfile.mkstemp(dir=d)
+    try:
+        with os.fdopen(fd, "wb") as out, open(LOG_PATH, "rb") as src:
+            out.write(header_line)
+            src.seek(cut)
+            while True:
+                chunk = src.read(_COPY_CHUNK)
+                if not chunk:
+                    break
+                out.write(chunk)
+            copied = src.tell()
+            with table_lock(LOG_PATH, exclusive=True) as lf:
+                if _identity(src, lf) != identity or os.stat(LOG_PATH).st_ino != identity[1]:
+                    os.remove(tmp)
+                    return 0
+                src.seek(copied)
+                out.write(src.read())
+                out.flush()
+                os.fsync(out.fileno())
+                os.replace(tmp, LOG_PATH)
+                epoch = bump_version(lf, rewrite=True)
+                journal_change(LOG_PATH, "replace", epoch)
+                st = os.stat(LOG_PATH)
+                m["trims"].append({"from": list(identity), "cut": cut, "header_len": len(header_line),
+                                   "to": [st.st_dev, st.st_ino, epoch]})
+                _save_manifest(m)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return cut - len(header_line)
+
+
+# ----------------------------
+# 백그라운드 작업
+# ----------------------------
+_job_started = False
+_job_guard = threading.Lock()
+
+
+def start_background_archiving(interval_sec: int = 24 * 3600, keep_days: int = KEEP_DAYS,
+                               export_sec: int = 3600) -> bool:
+    """
+    프로세스당 한 번만 데몬 스레드를 띄운다. 새로 띄웠으면 True
+    - export_sec 마다 닫힌 날짜를 컬럼 파일로 내보낸다(분석 화면은 읽기만 하므로 여기서 채운다)
+    - interval_sec 마다 오래된 로그 구간을 보관(보관이 먼저 내보내기를 돌린다)
+    """
+    global _job_started
+    if is_replica():
+        return False
+    with _job_guard:
+        if _job_started:
+            return False
+        _job_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        last_archive = time.monotonic()
+        while not stop.wait(min(export_sec, interval_sec)):
+            try:
+                if time.monotonic() - last_archive >= interval_sec:
+                    last_archive = time.monotonic()
+                    archive_cold_segments(keep_days)
+                else:
+                    # 순환 import 회피 + NumPy/pandas 는 이 스레드에서만 올리도록 지역 import
+                    from services.log_export import export_closed_segments
+                    export_closed_segments()
+            except Exception:  # 다음 주기에 다시 시도
+                _log.exception("log archiving failed")
+
+    threading.Thread(target=_loop, name="log_archive", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="activity_log.csv 의 오래된 날짜 구간을 압축 보관")
+    ap.add_argument("--keep-days", type=int, default=KEEP_DAYS, help="활성 로그에 남길 기간(일)")
+    ap.add_argument("--codec", choices=["gz", "zst"], default=None, help="기본: zstd 가 있으면 zst, 없으면 gz")
+    ap.add_argument("--list", action="store_true", help="보관 구간 목록만 출력")
+    args = ap.parse_args()
+    if not args.list:
+        print(archive_cold_segments(args.keep_days, codec=args.codec))
+    segs = load_manifest()["segments"]
+    raw = sum(s["raw_bytes"] for s in segs)
+    packed = sum(s["bytes"] for s in segs)
+    for s in segs:
+        print(f"{s['day']}  {s['rows']:>8} rows  {s['first_log']}..{s['last_log']}  "
+              f"{s['raw_bytes']:>10} → {s['bytes']:>9} bytes  {s['file']}")
+    print(f"{len(segs)} segments · {raw} → {packed} bytes ({packed / max(raw, 1):.0%})")
@@ -0,0 +1,429 @@
+# services/log_export.py
+# activity_log.csv 의 "닫힌" 구간(오늘 이전 날짜)을 날짜별 컬럼 파일로 내보낸다.
+# - pyarrow 가 있으면 Arrow IPC 파일 하나(segment.arrow), 없으면 컬럼마다 NumPy .npy
+# - event_type / actor_id / target_type 은 전역 사전(manifest)의 정수 코드로 저장
+# - metadata JSON 은 meta_<키> 컬럼으로 펼친다
+# - 읽을 때는 필요한 컬럼만 메모리 맵으로 연다
+import csv
+import io
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:  # 선택 의존성
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+    pa_ipc = None
+
+from repo.csv_repo import table_lock, read_stamp
+from utils.ids import id_num
+from utils.time import KST
+
+LOG_PATH = os.path.join("data", "activity_log.csv")
+EXPORT_DIR = os.path.join("data", "columnar", "activity_log")
+MANIFEST = os.path.join(EXPORT_DIR, "manifest.json")
+
+# 사전 인코딩할 컬럼 → 코드 dtype
+DICT_COLUMNS = {"event_type": np.int16, "actor_id": np.int32, "target_type": np.int8}
+BASE_COLUMNS = ["log_num", "ts", "event_type", "actor_id", "target_type", "target_id"]
+
+
+# ----------------------------
+# manifest
+# ----------------------------
+def _empty_manifest() -> dict:
+    return {
+        "version": 1,
+        "format": "arrow" if pa is not None else "npy",
+        "source": {"dev": 0, "ino": 0, "epoch": 0, "offset": 0},
+        "dicts": {c: [] for c in DICT_COLUMNS},
+        "segments": [],
+    }
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return _empty_manifest()
+
+
+def _save_manifest(m: dict) -> None:
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(m, f, ensure_ascii=False)
+    os.replace(tmp, MANIFEST)
+
+
+# ----------------------------
+# 로그 원본 읽기 (바이트 오프셋부터)
+# ----------------------------
+def _iter_records(f, offset: int) -> Iterator[Tuple[List[str], int, int]]:
+    """offset 부터 CSV 레코드를 (값 목록, 시작 오프셋, 끝 오프셋) 으로. 따옴표 안 줄바꿈 고려"""
+    f.seek(offset)
+    pos = offset
+    while True:
+        start = pos
+        chunk = b""
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            chunk += line
+            pos += len(line)
+            if chunk.count(b'"') % 2 == 0:
+                break
+        if not chunk:
+            return
+        if not chunk.endswith(b"\n"):
+            return  # 아직 쓰는 중인 마지막 줄
+        if not chunk.strip():
+            continue
+        values = next(csv.reader(io.StringIO(chunk.decode("utf-8"), newline="")), [])
+        yield values, start, pos
+
+
+def _open_log():
+    """(파일, stat, 재작성 횟수, 헤더, 데이터 시작 오프셋). 로그가 없으면 None"""
+    if not os.path.exists(LOG_PATH):
+        return None
+    with table_lock(LOG_PATH, exclusive=False) as lf:
+        f = open(LOG_PATH, "rb")
+        epoch = read_stamp(lf)[1]
+    st = os.fstat(f.fileno())
+    header_line = f.readline()
+    header = next(csv.reader([header_line.decode("utf-8").strip("\r\n")]), []) if header_line.strip() else []
+    return f, st, epoch, header, len(header_line)
+
+
+def _unexported_offset(m: dict, st, epoch: int, data_start: int) -> Optional[int]:
+    """
+    manifest 의 "여기까지 내보냄" 위치를 지금 로그 파일의 오프셋으로 (보관 작업이 앞부분을 잘라냈으면 따라간다).
+    로그가 재작성돼 이어 갈 수 없으면 None — 세그먼트는 다음 내보내기가 처음부터 다시 만든다.
+    """
+    from services.log_archive import rebase_offset  # 순환 import 회피용 지역 import
+
+    src = m["source"]
+    identity, offset = (src["dev"], src["ino"], src["epoch"]), src["offset"]
+    current = (st.st_dev, st.st_ino, epoch)
+    if identity != current:
+        moved = rebase_offset(identity, offset)
+        if moved is None or moved[0] != current:
+            return None
+        offset = moved[1]
+    if offset > st.st_size:
+        return None
+    return max(offset, data_start)
+
+
+def _ts_us(iso: str) -> int:
+    """ISO 시각 → UTC 마이크로초 (파싱 실패 시 0)"""
+    try:
+        dt = datetime.fromisoformat(iso)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=KST)
+    return int(dt.timestamp() * 1_000_000)
+
+
+def _day_of(iso: str) -> str:
+    """KST 기준 날짜 문자열 (created_at 은 KST 로 기록된다)"""
+    try:
+        dt = datetime.fromisoformat(iso)
+    except (TypeError, ValueError):
+        return "1970-01-01"
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(KST)
+    return dt.date().isoformat()
+
+
+# ----------------------------
+# 세그먼트 쓰기
+# ----------------------------
+def _encode(rows: List[Dict[str, str]], dicts: Dict[str, List[str]]) -> Dict[str, np.ndarray]:
+    cols: Dict[str, np.ndarray] = {
+        "log_num": np.array([id_num(r.get("log_id", "")) for r in rows], dtype=np.int64),
+        "ts": np.array([_ts_us(r.get("created_at", "")) for r in rows], dtype="datetime64[us]"),
+        "target_id": np.array([r.get("target_id", "") for r in rows], dtype=np.str_),
+    }
+    for c, dtype in DICT_COLUMNS.items():
+        values = dicts[c]
+        code_of = {v: i for i, v in enumerate(values)}
+        codes = []
+        for r in rows:
+            v = r.get(c, "")
+            if v not in code_of:
+                code_of[v] = len(values)
+                values.append(v)  # 사전은 덧붙이기만 하므로 기존 세그먼트 코드는 그대로 유효
+            codes.append(code_of[v])
+        cols[c] = np.array(codes, dtype=dtype)
+
+    metas = []
+    for r in rows:
+        try:
+            m = json.loads(r.get("metadata") or "{}")
+        except ValueError:
+            m = {}
+        metas.append(m if isinstance(m, dict) else {})
+    keys = sorted({k for m in metas for k in m})
+    for k in keys:
+        vals = [m.get(k, "") for m in metas]
+        vals = [v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in vals]
+        cols[f"meta_{k}"] = np.array(vals, dtype=np.str_)
+    return cols
+
+
+def _write_segment(seg_dir: str, cols: Dict[str, np.ndarray], fmt: str, dicts: Dict[str, List[str]]) -> None:
+    tmp_dir = seg_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    if fmt == "arrow":
+        arrays, names = [], []
+        for name, arr in cols.items():
+            if name in DICT_COLUMNS:
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(arr), pa.array(dicts[name], pa.string())))
+            else:
+                arrays.append(pa.array(arr))
+            names.append(name)
+        table = pa.Table.from_arrays(arrays, names=names)
+        with pa.OSFile(os.path.join(tmp_dir, "segment.arrow"), "wb") as sink:
+            with pa_ipc.new_file(sink, table.schema) as w:
+                w.write_table(table)
+    else:
+        for name, arr in cols.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), arr, allow_pickle=False)
+    shutil.rmtree(seg_dir, ignore_errors=True)
+    os.replace(tmp_dir, seg_dir)
+
+
+def export_closed_segments(today: Optional[str] = None) -> int:
+    """
+    마지막으로 내보낸 위치부터 로그를 읽어 오늘(KST) 이전 날짜의 행을 날짜별 세그먼트로 쓴다.
+    오늘 날짜 행을 만나면 멈춘다(로그는 시간순으로 덧붙는다). 로그가 재작성됐으면 처음부터 다시.
+    반환: 새로 내보낸 행 수
+    """
+    today = today or datetime.now(tz=KST).date().isoformat()
+    opened = _open_log()
+    if opened is None:
+        return 0
+    f, st, epoch, header, data_start = opened
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    # 순환 import 회피용 지역 import
+    from services.log_archive import rebase_offset, iter_archived
+
+    with f, table_lock(MANIFEST, exclusive=True):
+        m = load_manifest()
+        src = m["source"]
+        current = (st.st_dev, st.st_ino, epoch)
+        reset = False
+        if (src["dev"], src["ino"], src["epoch"]) != current:
+            # 오래된 구간을 보관하며 잘라낸 것이면 이미 내보낸 세그먼트는 그대로 두고 위치만 옮긴다
+            moved = rebase_offset((src["dev"], src["ino"], src["epoch"]), src["offset"])
+            if moved is not None and moved[0] == current:
+                src.update(dev=st.st_dev, ino=st.st_ino, epoch=epoch, offset=moved[1])
+                _save_manifest(m)
+            else:
+                reset = True
+        if reset or src["offset"] > st.st_size:
+            for seg in m["segments"]:
+                shutil.rmtree(os.path.join(EXPORT_DIR, seg["name"]), ignore_errors=True)
+            m = _empty_manifest()
+            m["source"] = {"dev": st.st_dev, "ino": st.st_ino, "epoch": epoch, "offset": data_start}
+            reset = True
+        offset = max(m["source"]["offset"], data_start)
+
+        exported = 0
+        day, rows = None, []
+
+        def _flush():
+            nonlocal exported
+            if not rows:
+                return
+            part = sum(1 for s in m["segments"] if s["day"] == day)
+            name = day if part == 0 else f"{day}.{part}"
+            cols = _encode(rows, m["dicts"])
+            _write_segment(os.path.join(EXPORT_DIR, name), cols, m["format"], m["dicts"])
+            m["segments"].append({
+                "name": name, "day": day, "rows": len(rows),
+                "first_log": rows[0].get("log_id", ""), "last_log": rows[-1].get("log_id", ""),
+                "columns": list(cols),
+            })
+            m["source"]["offset"] = offset
+            _save_manifest(m)  # 세그먼트마다 기록: 중간에 죽어도 다음 실행이 이어서 한다
+            exported += len(rows)
+
+        if reset:
+            # 처음부터 다시 만들 때는 보관된(압축된) 구간부터 내보낸다
+            for r in iter_archived():
+                d = _day_of(r.get("created_at", ""))
+                if d != day:
+                    _flush()
+                    day, rows = d, []
+                rows.append(r)
+            _flush()
+            day, rows = None, []
+
+        for values, start, end in _iter_records(f, offset):
+            r = dict(zip(header, values))
+            d = _day_of(r.get("created_at", ""))
+            if d >= today:
+                break
+            if d != day:
+                _flush()
+                day, rows = d, []
+            rows.append(r)
+            offset = end
+        _flush()
+    return exported
+
+
+# ----------------------------
+# 읽기
+# ----------------------------
+def _segments_current(m: dict) -> bool:
+    """세그먼트가 지금 로그와 이어지는지(아니면 로그가 재작성된 것이라 CSV 만 읽는다)"""
+    opened = _open_log()
+    if opened is None:
+        return True
+    f, st, epoch, _, data_start = opened
+    with f:
+        return _unexported_offset(m, st, epoch, data_start) is not None
+
+
+def _segments(since: Optional[str], until: Optional[str]) -> List[dict]:
+    m = load_manifest()
+    if not _segments_current(m):
+        return []
+    return [
+        s for s in m["segments"]
+        if (since is None or s["day"] >= since) and (until is None or s["day"] <= until)
+    ]
+
+
+def _read_segment(m: dict, seg: dict, columns: List[str]) -> Dict[str, np.ndarray]:
+    seg_dir = os.path.join(EXPORT_DIR, seg["name"])
+    wanted = [c for c in columns if c in seg["columns"]]
+    if m["format"] == "arrow":
+        with pa.memory_map(os.path.join(seg_dir, "segment.arrow"), "r") as src:
+            table = pa_ipc.open_file(src).read_all().select(wanted)
+        out = {}
+        for c in wanted:
+            col = table.column(c).combine_chunks()
+            out[c] = col.indices.to_numpy() if c in DICT_COLUMNS else col.to_numpy(zero_copy_only=False)
+        return out
+    return {c: np.load(os.path.join(seg_dir, f"{c}.npy"), mmap_mode="r") for c in wanted}
+
+
+def load_columns(columns: Iterable[str] = BASE_COLUMNS,
+                 since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    내보낸 세그먼트에서 필요한 컬럼만 읽어 이어 붙인다(날짜 범위 since~until, KST 'YYYY-MM-DD').
+    사전 컬럼은 정수 코드 그대로 — 값은 load_manifest()["dicts"] 로 찾는다.
+    세그먼트에 없는 meta_ 컬럼은 빈 문자열로 채운다.
+    """
+    columns = list(columns)
+    m = load_manifest()
+    if m["format"] == "arrow" and pa is None:
+        raise RuntimeError("columnar export was written with pyarrow, which is not installed")
+    parts: Dict[str, List[np.ndarray]] = {c: [] for c in columns}
+    for seg in _segments(since, until):
+        got = _read_segment(m, seg, columns)
+        for c in columns:
+            parts[c].append(got[c] if c in got else np.full(seg["rows"], "", dtype=np.str_))
+    out = {}
+    for c in columns:
+        if parts[c]:
+            out[c] = parts[c][0] if len(parts[c]) == 1 else np.concatenate(parts[c])
+        else:
+            out[c] = np.empty(0, dtype=DICT_COLUMNS.get(c, np.str_) if c != "ts" else "datetime64[us]")
+    return out
+
+
+def closed_days() -> List[str]:
+    """세그먼트로 읽을 수 있는 날짜들 (나머지는 load_open_columns 가 CSV 에서 읽는다)"""
+    return sorted({s["day"] for s in _segments(None, None)})
+
+
+def _open_rows() -> List[Dict[str, str]]:
+    """아직 내보내지 않은 구간(보통 오늘)을 CSV 에서 직접 읽는다"""
+    opened = _open_log()
+    if opened is None:
+        return []
+    f, st, epoch, header, data_start = opened
+    with f:
+        offset = _unexported_offset(load_manifest(), st, epoch, data_start)
+        return [dict(zip(header, values)) for values, _, _ in _iter_records(f, offset or data_start)]
+
+
+def load_open_columns(columns: Iterable[str] = BASE_COLUMNS) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+    """
+    아직 내보내지 않은 구간을 세그먼트와 같은 인코딩의 컬럼으로.
+    새 사전 값이 나올 수 있으므로 manifest 사전의 복사본에 덧붙여 함께 돌려준다.
+    """
+    columns = list(columns)
+    dicts = {c: list(v) for c, v in load_manifest()["dicts"].items()}
+    tail = _open_rows()
+    enc = _encode(tail, dicts) if tail else {}
+    cols = {}
+    for c in columns:
+        if c in enc:
+            cols[c] = enc[c]
+        elif c in DICT_COLUMNS:
+            cols[c] = np.empty(0, dtype=DICT_COLUMNS[c])
+        elif c == "ts":
+            cols[c] = np.empty(0, dtype="datetime64[us]")
+        elif c == "log_num":
+            cols[c] = np.empty(0, dtype=np.int64)
+        else:
+            cols[c] = np.full(len(tail), "", dtype=np.str_)
+    return cols, dicts
+
+
+def load_frame(columns: Iterable[str] = BASE_COLUMNS, since: Optional[str] = None,
+               until: Optional[str] = None, include_open: bool = True) -> pd.DataFrame:
+    """
+    분석/활동 탭용 DataFrame. 내보낸 컬럼 파일을 읽고(읽기만 한다. 내보내기는 백그라운드 작업/CLI),
+    include_open 이면 아직 내보내지 않은 구간을 CSV 에서 붙인다.
+    - 사전 컬럼은 Categorical, ts 는 KST 시각
+    """
+    columns = list(columns)
+    cols = load_columns(columns, since, until)
+    dicts = {c: list(v) for c, v in load_manifest()["dicts"].items()}
+
+    today = datetime.now(tz=KST).date().isoformat()
+    if include_open and (until is None or until >= today):
+        extra, dicts = load_open_columns(columns)
+        cols = {c: np.concatenate([np.asarray(cols[c]), extra[c]]) for c in columns}
+
+    data = {}
+    for c in columns:
+        arr = cols[c]
+        if c in DICT_COLUMNS:
+            data[c] = pd.Categorical.from_codes(np.asarray(arr, dtype=np.int64), categories=pd.Index(dicts[c]))
+        elif c == "ts":
+            data[c] = pd.to_datetime(np.asarray(arr)).tz_localize(timezone.utc).tz_convert(KST)
+        else:
+            data[c] = arr
+    return pd.DataFrame(data)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="activity_log.csv 의 닫힌 날짜를 컬럼 파일로 내보내기")
+    ap.add_argument("--rebuild", action="store_true", help="기존 내보내기를 지우고 처음부터")
+    args = ap.parse_args()
+    if args.rebuild:
+        shutil.rmtree(EXPORT_DIR, ignore_errors=True)
+    n = export_closed_segments()
+    m = load_manifest()
+    print(f"exported {n} rows · {len(m['segments'])} segments · format={m['format']}")
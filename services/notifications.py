@@ -0,0 +1,330 @@
+# services/notifications.py
+# 사용자별 알림함. log_event 가 남기는 이벤트 중 누군가에게 알릴 것(좋아요/댓글/리포스트/팔로우)을
+# 받는 사람을 정해 data/notifications.csv 에 한 줄씩 덧붙이고(fan-out),
+# 메모리 인덱스가 그 뒤에 붙은 줄만 이어 읽어 사용자별 알림함을 유지한다.
+# - 같은 대상(글/팔로우)에 대한 같은 종류의 알림은 읽음 위치로 나뉘기 전까지 한 항목으로 묶는다 ("3명이 좋아요를 눌렀습니다")
+# - 읽음 위치는 data/notification_reads.csv 에 사용자당 한 줄(마지막으로 읽은 로그 번호)
+# - 안 읽은 수는 사용자별 카운터로 들고 있어 조회가 O(1), 목록은 최신순 키셋 페이지네이션
+# - 좋아요 취소/언팔로우는 같은 묶음에서 그 사람을 뺀다(아무도 안 남으면 항목 삭제)
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+from repo.csv_repo import append_csv, read_csv_cached, read_csv_since, table_version, update_csv
+from utils.ids import id_num
+
+NOTIFS = os.path.join("data", "notifications.csv")
+READS = os.path.join("data", "notification_reads.csv")
+
+# 알림함에 남기는 최대 묶음 수(사용자당). 넘으면 오래된 것부터 버린다
+MAX_GROUPS = 500
+
+# 이벤트 → (알림 종류, 취소 여부)
+_KINDS = {
+    "REACTION_ADDED": ("LIKE", False),
+    "REACTION_REMOVED": ("LIKE", True),
+    "COMMENT_CREATED": ("COMMENT", False),
+    "REPOST_CREATED": ("REPOST", False),
+    "USER_FOLLOWED": ("FOLLOW", False),
+    "USER_UNFOLLOWED": ("FOLLOW", True),
+}
+_VERBS = {
+    "LIKE": "좋아요를 눌렀습니다",
+    "COMMENT": "댓글을 남겼습니다",
+    "REPOST": "리포스트했습니다",
+    "FOLLOW": "나를 팔로우했습니다",
+}
+
+
+# ----------------------------
+# fan-out (쓰기)
+# ----------------------------
+def _post_author(post_id: str) -> str:
+    from services.posts import get_post  # 순환 import 회피용 지역 import
+    post = get_post(post_id)
+    return (post or {}).get("author_id", "")
+
+
+def _recipient(row: Dict[str, str], meta: Dict) -> Tuple[str, str]:
+    """로그 행 → (받는 사람, 묶음 대상 id). 알릴 사람이 없으면 ("", "")"""
+    et = row["event_type"]
+    if et in ("REACTION_ADDED", "REACTION_REMOVED"):
+        return _post_author(row["target_id"]), row["target_id"]
+    if et == "COMMENT_CREATED":
+        post_id = meta.get("post_id", "")
+        return _post_author(post_id), post_id
+    if et == "REPOST_CREATED":
+        orig = meta.get("original_post_id", "")
+        return _post_author(orig), orig
+    if et in ("USER_FOLLOWED", "USER_UNFOLLOWED"):
+        return row["target_id"], ""
+    return "", ""
+
+
+def notification_row(row: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """activity_log 행 → notifications.csv 행 (알릴 것이 아니거나 자기 자신에 대한 것이면 None)"""
+    kind = _KINDS.get(row.get("event_type", ""))
+    if kind is None:
+        return None
+    try:
+        meta = json.loads(row.get("metadata") or "{}")
+    except ValueError:
+        meta = {}
+    user_id, target_id = _recipient(row, meta)
+    if not user_id or user_id == row.get("actor_id"):
+        return None
+    return {
+        "log_id": row["log_id"],
+        "user_id": user_id,
+        "kind": kind[0],
+        "target_id": target_id,
+        "actor_id": row.get("actor_id", ""),
+        "removed": "1" if kind[1] else "0",
+        "preview": meta.get("preview", "") if kind[0] == "COMMENT" else "",
+        "created_at": row.get("created_at", ""),
+    }
+
+
+def fan_out(row: Dict[str, str]) -> bool:
+    """log_event 가 방금 기록한 행을 받는 사람의 알림함에 넣는다. 반환: 알림을 남겼는지"""
+    n = notification_row(row)
+    if n is None:
+        return False
+    append_csv(NOTIFS, n)
+    return True
+
+
+# ----------------------------
+# 알림함 인덱스 (읽기)
+# ----------------------------
+class _Group:
+    """한 알림 항목: 같은 종류 · 같은 대상에 대한 알림 묶음. seq = 마지막 이벤트의 로그 번호"""
+    __slots__ = ("kind", "target_id", "actors", "seq", "created_at", "preview")
+
+    def __init__(self, kind: str, target_id: str):
+        self.kind, self.target_id = kind, target_id
+        self.actors: Dict[str, int] = {}   # 행위자 → 로그 번호 (넣은 순서 = 오래된 순)
+        self.seq = 0
+        self.created_at = ""
+        self.preview = ""
+
+
+class _Inbox:
+    __slots__ = ("groups", "order", "latest", "read_seq", "unread")
+
+    def __init__(self):
+        self.groups: Dict[int, _Group] = {}                 # seq → 묶음
+        self.order: List[int] = []                          # seq 오름차순
+        self.latest: Dict[Tuple[str, str], _Group] = {}     # (종류, 대상) → 가장 최근 묶음
+        self.read_seq = 0
+        self.unread = 0                                     # seq > read_seq 인 묶음 수
+
+    def _unlink(self, g: _Group) -> None:
+        i = bisect_left(self.order, g.seq)
+        del self.order[i]
+        del self.groups[g.seq]
+        if g.seq > self.read_seq:
+            self.unread -= 1
+
+    def _link(self, g: _Group) -> None:
+        insort(self.order, g.seq)
+        self.groups[g.seq] = g
+        if g.seq > self.read_seq:
+            self.unread += 1
+
+    def apply(self, r: Dict[str, str]) -> None:
+        seq = id_num(r.get("log_id", ""))
+        key = (r.get("kind", ""), r.get("target_id", ""))
+        actor = r.get("actor_id", "")
+        g = self.latest.get(key)
+        if r.get("removed") == "1":
+            if g is not None and actor in g.actors:
+                del g.actors[actor]
+                if not g.actors:
+                    self._unlink(g)
+                    del self.latest[key]
+            return
+        if g is not None and (g.seq > self.read_seq or seq <= self.read_seq):
+            # 읽음 위치를 사이에 두지 않으면 같은 묶음: 합치고 맨 앞으로 올린다
+            # (처음부터 다시 만들어도 점진 반영과 같은 묶음이 나온다)
+            self._unlink(g)
+        else:
+            g = self.latest[key] = _Group(*key)
+        g.actors.pop(actor, None)
+        g.actors[actor] = seq
+        if seq >= g.seq:
+            g.seq, g.created_at = seq, r.get("created_at", "")
+            g.preview = r.get("preview", "") or g.preview
+        self._link(g)
+        while len(self.order) > MAX_GROUPS:
+            old = self.groups[self.order[0]]
+            self._unlink(old)
+            if self.latest.get((old.kind, old.target_id)) is old:
+                del self.latest[(old.kind, old.target_id)]
+
+    def set_read(self, seq: int) -> None:
+        self.read_seq = seq
+        self.unread = len(self.order) - bisect_right(self.order, seq)
+
+
+class NotificationIndex:
+    """사용자 → 알림함. notifications.csv 에 새로 붙은 줄만 반영한다(재작성되면 다시 만든다)"""
+
+    def __init__(self):
+        self.inboxes: Dict[str, _Inbox] = {}
+        self.cursor = None
+        self.reads_version: Optional[int] = None
+
+    def inbox(self, user_id: str) -> _Inbox:
+        box = self.inboxes.get(user_id)
+        if box is None:
+            box = self.inboxes[user_id] = _Inbox()
+        return box
+
+    def _sync_reads(self) -> None:
+        v = table_version(READS)
+        if v == self.reads_version:
+            return
+        for r in read_csv_cached(READS):
+            seq = int(r.get("last_read") or 0)
+            box = self.inbox(r.get("user_id", ""))
+            if seq != box.read_seq:
+                box.set_read(seq)
+        self.reads_version = v
+
+    def refresh(self) -> bool:
+        """새 알림/읽음 위치를 반영. 알림 테이블이 재작성됐으면 False(다시 만들어야 함)"""
+        self._sync_reads()
+        first = self.cursor is None
+        rows, self.cursor, reset = read_csv_since(NOTIFS, self.cursor)
+        if reset and not first:
+            return False
+        for r in rows:
+            self.inbox(r.get("user_id", "")).apply(r)
+        return True
+
+
+_index: Optional[NotificationIndex] = None
+_guard = threading.RLock()
+
+
+def get_notification_index() -> NotificationIndex:
+    global _index
+    with _guard:
+        if _index is None or not _index.refresh():
+            idx = NotificationIndex()
+            idx.refresh()
+            _index = idx
+        return _index
+
+
+def unread_count(user_id: str) -> int:
+    """안 읽은 알림 항목 수 (묶음 단위)"""
+    with _guard:
+        box = get_notification_index().inboxes.get(user_id)
+        return box.unread if box else 0
+
+
+def list_notifications(user_id: str, limit: int = 20,
+                       cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    알림 항목을 최신순으로 한 페이지.
+    항목: {kind, target_id, actors(최근 순), count, created_at, preview, unread}
+    반환: (항목들, 다음 페이지 cursor — 더 없으면 None)
+    """
+    with _guard:
+        box = get_notification_index().inboxes.get(user_id)
+        if box is None:
+            return [], None
+        end = bisect_left(box.order, int(cursor)) if cursor and cursor.isdigit() else len(box.order)
+        start = max(0, end - limit)
+        items = []
+        for seq in reversed(box.order[start:end]):
+            g = box.groups[seq]
+            items.append({
+                "kind": g.kind,
+                "target_id": g.target_id,
+                "actors": list(reversed(g.actors)),
+                "count": len(g.actors),
+                "created_at": g.created_at,
+                "preview": g.preview,
+                "unread": seq > box.read_seq,
+            })
+        return items, (str(box.order[start]) if start > 0 else None)
+
+
+def mark_all_read(user_id: str) -> int:
+    """지금까지의 알림을 모두 읽음으로. 반환: 읽음 처리한 항목 수"""
+    with _guard:
+        box = get_notification_index().inbox(user_id)
+        if not box.unread:
+            return 0
+        seq, count = box.order[-1], box.unread
+
+    def _upsert(rows: List[Dict[str, str]]):
+        for r in rows:
+            if r.get("user_id") == user_id:
+                if int(r.get("last_read") or 0) >= seq:
+                    return None
+                r["last_read"] = str(seq)
+                return rows
+        return rows + [{"user_id": user_id, "last_read": str(seq)}]
+
+    update_csv(READS, _upsert)
+    with _guard:
+        box.set_read(max(box.read_seq, seq))
+    return count
+
+
+def notification_text(item: Dict, name: Callable[[str], str] = lambda uid: uid) -> str:
+    """알림 항목 → 한 줄 문구. name 으로 user_id 를 표시 이름으로 바꾼다"""
+    verb = _VERBS.get(item["kind"], "")
+    if item["count"] > 1:
+        return f"{item['count']}명이 {verb}"
+    return f"{name(item['actors'][0])}님이 {verb}" if item["actors"] else verb
+
+
+# ----------------------------
+# 재생성 (배포 전 이벤트 채우기 / 손상 복구)
+# ----------------------------
+def rebuild_notifications() -> int:
+    """activity_log(보관 구간 포함) 전체에서 notifications.csv 를 다시 만든다. 반환: 알림 행 수"""
+    from repo.csv_repo import iter_csv, write_csv_stream
+    from services.log_archive import iter_archived  # 순환 import 회피용 지역 import
+    from services.activity import LOG_PATH
+
+    count = 0
+
+    def _rows():
+        nonlocal count
+        for src in (iter_archived(), iter_csv(LOG_PATH)):
+            for r in src:
+                n = notification_row(r)
+                if n is not None:
+                    count += 1
+                    yield n
+
+    fieldnames = ["log_id", "user_id", "kind", "target_id", "actor_id", "removed", "preview", "created_at"]
+    write_csv_stream(NOTIFS, _rows(), fieldnames)
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="알림함 재생성/확인")
+    ap.add_argument("command", choices=["rebuild", "show"])
+    ap.add_argument("--user", help="show: 이 사용자의 알림")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+    if args.command == "rebuild":
+        print(f"{rebuild_notifications()} notifications → {NOTIFS}")
+    else:
+        items, nxt = list_notifications(args.user or "", args.limit)
+        print(f"unread {unread_count(args.user or '')}")
+        for it in items:
+            print(("● " if it["unread"] else "  ") + f"{it['created_at']}  {notification_text(it)}  {it['target_id']}")
+        if nxt:
+            print(f"next cursor: {nxt}")
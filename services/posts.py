@@ -1,10 +1,13 @@
 # services/posts.py
 import os
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
 from utils.time import now_kst_iso
-from repo.csv_repo import append_csv, read_csv, write_csv, next_id
+from repo.csv_repo import append_csv, update_csv, next_id
+from repo.offset_index import lookup_row
+from repo.partitions import recent_chunks
 from services.tags import update_post_hashtags
+from services.reposts import note_repost_created, note_post_visibility
 from services.activity import log_event  # ★ 활동 로그
 
 POSTS = os.path.join("data", "posts.csv")
@@ -29,6 +32,8 @@ def create_post(author_id: str, content: str, original_post_id: Optional[str] =
         "is_deleted": "0",
     }
     append_csv(POSTS, row)
+    if original_post_id:
+        note_repost_created(post_id, original_post_id, author_id)
 
     # 로그: 새 게시물 or 리포스트
     if original_post_id:
@@ -55,19 +60,57 @@ def create_post(author_id: str, content: str, original_post_id: Optional[str] =
     return post_id
 
 
-def list_feed(limit: int = 50) -> List[Dict[str, str]]:
-    rows = read_csv(POSTS)
-    rows = [r for r in rows if r.get("is_deleted") != "1"]
-    rows.sort(key=lambda r: r["created_at"], reverse=True)
-    return rows[:limit]
+def list_feed(limit: int = 50, since: Optional[str] = None,
+              where: Optional[Callable[[Dict[str, str]], bool]] = None) -> List[Dict[str, str]]:
+    """
+    삭제되지 않은 글을 최신순으로 최대 limit 개.
+    - since: 이 시각(ISO, KST) 이후에 쓴 글만 (기간 필터)
+    - where: 추가 조건(작성자, 태그, 팔로잉 등). limit 은 조건을 통과한 글 기준
+    posts 가 월별 파티션이면 최근 월부터 훑고, limit 을 채웠거나 since 이전 월에 닿으면 더 읽지 않는다.
+    """
+    out: List[Dict[str, str]] = []
+    for rows in recent_chunks(POSTS, since):
+        page = [r for r in rows
+                if r.get("is_deleted") != "1"
+                and (since is None or r["created_at"] >= since)
+                and (where is None or where(r))]
+        page.sort(key=lambda r: r["created_at"], reverse=True)
+        out.extend(page)
+        if len(out) >= limit:
+            break
+    return out[:limit]
+
+
+def list_user_posts(user_id: str, limit: int = 200) -> List[Dict[str, str]]:
+    """프로필용: user_id 가 쓴 글 최신순 (최근 파티션부터 limit 을 채울 때까지만 읽는다)"""
+    return list_feed(limit, where=lambda r: r.get("author_id") == user_id)
 
 
 def get_post(post_id: str) -> Optional[Dict[str, str]]:
-    rows = read_csv(POSTS)
-    for r in rows:
-        if r["post_id"] == post_id:
-            return r
-    return None
+    # post_id → (월별 파티션이면 id 범위로 파티션 선택 →) 바이트 오프셋 인덱스로 해당 한 줄만 읽는다
+    return lookup_row(POSTS, post_id)
+
+
+def _set_deleted(post_id: str, actor_id: str, flag: str, verb: str) -> bool:
+    """is_deleted 를 flag 로 바꾼다. 실제로 바뀌었으면 True (충돌 시 update_csv 가 재시도)"""
+    changed = False
+
+    def _mark(rows: List[Dict[str, str]]):
+        nonlocal changed
+        changed = False
+        for r in rows:
+            if r["post_id"] == post_id:
+                if r["author_id"] != actor_id:
+                    raise PermissionError(f"you can {verb} only your own posts")
+                if r.get("is_deleted") == flag:
+                    return None
+                r["is_deleted"] = flag
+                changed = True
+                return rows
+        return None
+
+    update_csv(POSTS, _mark)
+    return changed
 
 
 def soft_delete_post(post_id: str, actor_id: str) -> None:
@@ -76,19 +119,8 @@ def soft_delete_post(post_id: str, actor_id: str) -> None:
     - 본인 글만 삭제 가능
     - 리포스트/원본 모두 동일 정책
     """
-    rows = read_csv(POSTS)
-    changed = False
-    for r in rows:
-        if r["post_id"] == post_id:
-            if r["author_id"] != actor_id:
-                raise PermissionError("you can delete only your own posts")
-            if r.get("is_deleted") == "1":
-                return
-            r["is_deleted"] = "1"
-            changed = True
-            break
-    if changed:
-        write_csv(POSTS, rows)
+    if _set_deleted(post_id, actor_id, "1", "delete"):
+        note_post_visibility(post_id, deleted=True)
         log_event(
             event_type="POST_DELETED",
             actor_id=actor_id,
@@ -102,20 +134,15 @@ def restore_post(post_id: str, actor_id: str) -> None:
     """
     소프트 삭제 복구: is_deleted=0.
     - 본인 글만 복구 가능
+    - 핫 테이블에 없으면 compaction 으로 아카이브된 글인지 확인해 되돌린다
     """
-    rows = read_csv(POSTS)
-    changed = False
-    for r in rows:
-        if r["post_id"] == post_id:
-            if r["author_id"] != actor_id:
-                raise PermissionError("you can restore only your own posts")
-            if r.get("is_deleted") == "0":
-                return
-            r["is_deleted"] = "0"
-            changed = True
-            break
-    if changed:
-        write_csv(POSTS, rows)
+    restored = _set_deleted(post_id, actor_id, "0", "restore")
+    if restored:
+        note_post_visibility(post_id, deleted=False)
+    elif get_post(post_id) is None:
+        from services.compaction import unarchive_post  # 순환 import 회피용 지역 import
+        restored = unarchive_post(post_id, actor_id)
+    if restored:
         log_event(
             event_type="POST_RESTORED",
             actor_id=actor_id,
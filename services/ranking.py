@@ -0,0 +1,296 @@
+# services/ranking.py
+import json
+import math
+import os
+import threading
+import time
+from bisect import insort
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from repo.csv_repo import read_csv_cached, read_csv_since, cursor_at
+
+POSTS = os.path.join("data", "posts.csv")
+REACTIONS = os.path.join("data", "reactions.csv")
+COMMENTS = os.path.join("data", "comments.csv")
+LOG_PATH = os.path.join("data", "activity_log.csv")
+
+# 가중치: 게시 자체 / 좋아요 / 댓글 / 리포스트
+W_POST = 1.0
+W_LIKE = 1.0
+W_COMMENT = 2.0
+W_REPOST = 3.0
+# 반감기: 이 시간이 지난 반응은 절반의 가치
+HALF_LIFE_SEC = 12 * 3600
+TAU = HALF_LIFE_SEC / math.log(2)
+# 지수가 커지면 기준 시각을 옮겨 전체를 다시 스케일(오버플로 방지)
+_REBASE_AT = 600.0
+
+TOP_K = 500
+WINDOWS: Dict[str, Optional[float]] = {
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+    "30d": 30 * 24 * 3600,
+    "all": None,
+}
+
+
+def _epoch(iso: str) -> float:
+    try:
+        return datetime.fromisoformat(iso).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class HotRanker:
+    """
+    인기순(hot) 점수 = Σ 가중치 · exp((이벤트 시각 - 기준 시각) / τ)
+    모든 글이 같은 비율로 감쇠하므로 글 사이 순서는 시간이 흘러도 바뀌지 않는다.
+    → 이벤트가 올 때만 해당 글 점수를 더하고/빼면 되고, 기간(window)별 상위 K 목록을
+      미리 정렬해 두었다가 그대로 내준다.
+    모든 반영은 id 기준으로 멱등이라 테이블 스냅샷과 로그가 겹쳐도 이중 계산되지 않는다.
+    (리포스트는 삭제된 것도 등록해 두고, 보임/숨김 상태가 실제로 바뀔 때만 원본 가중치를 더하고 뺀다)
+    """
+
+    def __init__(self):
+        self.t_ref = time.time()
+        self.score: Dict[str, float] = {}
+        self.created: Dict[str, float] = {}
+        self.hidden: Set[str] = set()                     # 삭제된 글(리포스트 포함)
+        self.likes: Dict[Tuple[str, str], float] = {}     # (post, user) → 시각
+        self.comments: Dict[str, Tuple[str, float]] = {}  # comment → (post, 시각)
+        self.reposts: Dict[str, Tuple[str, float]] = {}   # repost → (원본, 시각)
+        self.top: Dict[str, List[Tuple[float, str]]] = {w: [] for w in WINDOWS}
+        self.dirty: Set[str] = set(WINDOWS)
+        self.log_cursor = None
+
+    # ---- 스냅샷 ----
+    def to_state(self) -> dict:
+        """스냅샷용 JSON 상태 (로그 cursor 는 프로세스 안에서만 의미가 있어 뺀다)"""
+        return {
+            "t_ref": self.t_ref, "score": self.score, "created": self.created,
+            "hidden": sorted(self.hidden),
+            "likes": [[p, u, t] for (p, u), t in self.likes.items()],
+            "comments": self.comments, "reposts": self.reposts,
+            "top": self.top, "dirty": sorted(self.dirty),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "HotRanker":
+        r = cls()
+        r.t_ref, r.score, r.created = state["t_ref"], state["score"], state["created"]
+        r.hidden = set(state["hidden"])
+        r.likes = {(p, u): t for p, u, t in state["likes"]}
+        r.comments = {c: (p, t) for c, (p, t) in state["comments"].items()}
+        r.reposts = {p: (o, t) for p, (o, t) in state["reposts"].items()}
+        r.top = {w: [(neg, p) for neg, p in state["top"].get(w, [])] for w in WINDOWS}
+        r.dirty = set(state["dirty"]) | (set(WINDOWS) - set(state["top"]))
+        return r
+
+    # ---- 점수 ----
+    def _weight(self, w: float, t: float) -> float:
+        x = (t - self.t_ref) / TAU
+        if x > _REBASE_AT:
+            self._rebase(t)
+            x = (t - self.t_ref) / TAU
+        return w * math.exp(x)
+
+    def _rebase(self, t: float) -> None:
+        factor = math.exp(-(t - self.t_ref) / TAU)
+        self.t_ref = t
+        self.score = {p: s * factor for p, s in self.score.items()}
+        for w in WINDOWS:
+            self.top[w] = [(neg * factor, p) for neg, p in self.top[w]]
+
+    def _add(self, post_id: str, w: float, t: float) -> None:
+        if post_id not in self.score:
+            return
+        old = self.score[post_id]
+        self.score[post_id] = max(old + self._weight(w, t), 0.0)
+        self._touch(post_id, old)
+
+    # ---- 기간별 상위 K ----
+    def _in_window(self, post_id: str, window: str, now: float) -> bool:
+        span = WINDOWS[window]
+        return span is None or self.created.get(post_id, 0.0) >= now - span
+
+    def _touch(self, post_id: str, old: float) -> None:
+        new = self.score.get(post_id, 0.0)
+        visible = post_id not in self.hidden and post_id in self.score
+        now = time.time()
+        for w, top in self.top.items():
+            if w in self.dirty:
+                continue
+            entry = (-old, post_id)
+            present = entry in top
+            if present:
+                top.remove(entry)
+            if not visible or not self._in_window(post_id, w, now):
+                continue
+            if present and new < old and len(top) >= TOP_K - 1:
+                self.dirty.add(w)  # 밖에 있던 글이 더 높을 수 있음
+                continue
+            if len(top) < TOP_K or -new < top[-1][0]:
+                insort(top, (-new, post_id))
+                del top[TOP_K:]
+
+    def _rebuild_window(self, w: str, now: float) -> None:
+        cands = [
+            (-s, p) for p, s in self.score.items()
+            if p not in self.hidden and self._in_window(p, w, now)
+        ]
+        cands.sort()
+        self.top[w] = cands[:TOP_K]
+        self.dirty.discard(w)
+
+    def top_ids(self, window: str = "all", limit: int = 50) -> List[str]:
+        now = time.time()
+        if window not in self.dirty:
+            top = self.top[window]
+            kept = [e for e in top if self._in_window(e[1], window, now)]
+            if len(kept) < len(top):
+                self.top[window] = kept
+                if len(top) >= TOP_K:
+                    self.dirty.add(window)  # 기간 밖으로 밀려난 자리를 채워야 함
+        if window in self.dirty:
+            self._rebuild_window(window, now)
+        return [p for _, p in self.top[window][:limit]]
+
+    def value(self, post_id: str) -> float:
+        """현재 시각 기준 점수(표시/디버그용)"""
+        s = self.score.get(post_id, 0.0)
+        return s * math.exp((self.t_ref - time.time()) / TAU)
+
+    # ---- 이벤트 반영(멱등) ----
+    def post_created(self, post_id: str, t: float, original_post_id: str = "") -> None:
+        if original_post_id:
+            if post_id not in self.reposts:
+                self.reposts[post_id] = (original_post_id, t)
+                if post_id not in self.hidden:
+                    self._add(original_post_id, W_REPOST, t)
+            return
+        if post_id in self.score:
+            return
+        self.created[post_id] = t
+        self.score[post_id] = 0.0
+        self._add(post_id, W_POST, t)
+
+    def post_visibility(self, post_id: str, deleted: bool) -> None:
+        was_hidden = post_id in self.hidden
+        (self.hidden.add if deleted else self.hidden.discard)(post_id)
+        if post_id in self.reposts:
+            if deleted != was_hidden:
+                orig, t = self.reposts[post_id]
+                self._add(orig, -W_REPOST if deleted else W_REPOST, t)
+            return
+        self._touch(post_id, self.score.get(post_id, 0.0))
+
+    def like(self, post_id: str, user_id: str, t: float, added: bool) -> None:
+        key = (post_id, user_id)
+        if added and key not in self.likes:
+            self.likes[key] = t
+            self._add(post_id, W_LIKE, t)
+        elif not added and key in self.likes:
+            self._add(post_id, -W_LIKE, self.likes.pop(key))
+
+    def comment(self, comment_id: str, post_id: str, t: float, added: bool) -> None:
+        if added and comment_id not in self.comments:
+            self.comments[comment_id] = (post_id, t)
+            self._add(post_id, W_COMMENT, t)
+        elif not added and comment_id in self.comments:
+            post, ct = self.comments.pop(comment_id)
+            self._add(post, -W_COMMENT, ct)
+
+    def apply_log_row(self, r: Dict[str, str]) -> None:
+        et = r.get("event_type")
+        target = r.get("target_id", "")
+        t = _epoch(r.get("created_at", ""))
+        try:
+            meta = json.loads(r.get("metadata") or "{}")
+        except ValueError:
+            meta = {}
+        if et == "POST_CREATED":
+            self.post_created(target, t)
+        elif et == "REPOST_CREATED":
+            self.post_created(target, t, meta.get("original_post_id", ""))
+        elif et in ("POST_DELETED", "POST_RESTORED"):
+            self.post_visibility(target, et == "POST_DELETED")
+        elif et in ("REACTION_ADDED", "REACTION_REMOVED"):
+            self.like(target, r.get("actor_id", ""), t, et == "REACTION_ADDED")
+        elif et == "COMMENT_CREATED":
+            self.comment(target, meta.get("post_id", ""), t, True)
+        elif et == "COMMENT_DELETED":
+            self.comment(target, "", t, False)
+
+    # ---- 적재 ----
+    def build(self) -> None:
+        """테이블에서 처음 만든다. 로그 cursor 를 먼저 잡아서 이후 이벤트를 놓치지 않는다"""
+        _, self.log_cursor, _ = read_csv_since(LOG_PATH, None)
+        posts = read_csv_cached(POSTS)
+        for r in posts:
+            if not r.get("original_post_id"):
+                self.post_created(r["post_id"], _epoch(r.get("created_at", "")))
+        for r in posts:
+            if r.get("is_deleted") == "1":
+                self.hidden.add(r["post_id"])
+            if r.get("original_post_id"):
+                # 삭제된 리포스트도 등록(가중치 없이): 나중에 복구되면 그때 더한다
+                self.post_created(r["post_id"], _epoch(r.get("created_at", "")), r["original_post_id"])
+        for r in read_csv_cached(REACTIONS):
+            self.like(r["post_id"], r["user_id"], _epoch(r.get("created_at", "")), True)
+        for r in read_csv_cached(COMMENTS):
+            if r.get("is_deleted") != "1":
+                self.comment(r["comment_id"], r["post_id"], _epoch(r.get("created_at", "")), True)
+        self.dirty = set(WINDOWS)
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """activity_log 에 새로 붙은 이벤트만 반영. 로그가 재작성됐으면 False(재구축 필요)"""
+        rows, self.log_cursor, reset = read_csv_since(LOG_PATH, self.log_cursor)
+        if reset:
+            return False
+        for r in rows:
+            self.apply_log_row(r)
+        return True
+
+
+_ranker: Optional[HotRanker] = None
+_guard = threading.RLock()
+
+
+def _from_snapshot(state: dict, meta: dict) -> Optional[HotRanker]:
+    """스냅샷의 랭커 + 저장 당시 로그 위치(이 프로세스의 cursor 로). 그 뒤 로그가 재작성됐으면 None"""
+    cursor = cursor_at(LOG_PATH, meta["log_rows"], meta["dev"], meta["ino"], meta["epoch"])
+    if cursor is None:
+        return None
+    r = HotRanker.from_state(state)
+    r.log_cursor = cursor
+    return r
+
+
+def get_ranker() -> HotRanker:
+    """
+    프로세스 공용 랭커. 처음에는 스냅샷에 걸어 둔 것이 있으면 꺼내서 그 뒤 이벤트만 반영하고,
+    로그가 재작성됐으면 새로 만든다
+    """
+    global _ranker
+    with _guard:
+        if _ranker is None:
+            from services.snapshot import take_index  # 순환 import 회피용 지역 import
+            _ranker = take_index("ranker", _from_snapshot)
+        if _ranker is None or not _ranker.refresh():
+            r = HotRanker()
+            r.build()
+            _ranker = r
+        return _ranker
+
+
+def hot_post_ids(window: str = "all", limit: int = TOP_K) -> List[str]:
+    """기간(24h/7d/30d/all) 안의 인기 게시물 id (미리 정렬된 상위 K 에서 잘라 반환)"""
+    with _guard:
+        return get_ranker().top_ids(window, limit)
+
+
+def hot_score(post_id: str) -> float:
+    with _guard:
+        return get_ranker().value(post_id)
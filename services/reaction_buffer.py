@@ -0,0 +1,267 @@
+# services/reaction_buffer.py
+# 좋아요 토글 쓰기 버퍼: 토글을 바로 reactions.csv 에 쓰지 않고 (post_id, user_id) 별 최종 상태만
+# 잠깐 모았다가 FLUSH_SEC 마다 한 번에 반영한다.
+# - 창 안의 연타(추가→취소→추가)는 저장 상태와 비교한 순변화 하나로 합쳐지고, 되돌아오면 아무것도 쓰지 않는다
+# - 대기 중인 토글은 (post_id, user_id) 해시로 고른 스트라이프(잠금 + 글별 증감 카운터)에 들어가서
+#   인기 글 하나에 몰린 토글도 서로 다른 잠금으로 흩어진다
+# - 읽기(count/liked)는 저장 상태(reactions.csv 증분 읽기로 만든 글별 좋아요 집합) + 반영 중 + 대기 중을 합쳐 답한다
+# - 반영: 취소가 있으면 update_csv 한 번(추가도 함께), 추가만 있으면 중복 확인 + append 를 한 잠금 안에서 한 번.
+#   활동 로그는 실제로 바뀐 것만
+# 같은 프로세스 안에서는 즉시 보이고, 다른 프로세스에는 반영 주기(기본 0.25초) 뒤에 보인다.
+# 프로세스 종료 시 남은 토글을 반영한다(atexit). SM_REACTION_FLUSH_SEC=0 이면 토글마다 바로 쓴다.
+import atexit
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from repo.csv_repo import append_csv_absent, update_csv, read_csv_since, check_writable
+from utils.time import now_kst_iso
+
+REACTIONS = os.path.join("data", "reactions.csv")
+
+# 모아 두는 시간(초). 0 이면 버퍼 없이 토글마다 반영
+FLUSH_SEC = float(os.environ.get("SM_REACTION_FLUSH_SEC", "0.25"))
+# 대기 토글이 이만큼 쌓이면 주기를 기다리지 않고 반영
+MAX_PENDING = 2048
+# 스트라이프 수(2의 거듭제곱)
+STRIPES = 16
+
+Key = Tuple[str, str]   # (post_id, user_id)
+
+_log = logging.getLogger(__name__)
+
+
+class _Stripe:
+    __slots__ = ("lock", "pending", "delta")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (post_id, user_id) → (원하는 상태, 토글 시각, 좋아요 수 기여분 ±1)
+        self.pending: Dict[Key, Tuple[bool, str, int]] = {}
+        # post_id → 이 스트라이프의 대기 토글이 좋아요 수에 더하는 값
+        self.delta: Dict[str, int] = {}
+
+
+class ReactionBuffer:
+    def __init__(self, path: str = REACTIONS, stripes: int = STRIPES):
+        self.path = path
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._mask = stripes - 1
+        self._state = threading.Lock()       # 저장 상태 / 반영 중 목록
+        self._flushing = threading.Lock()    # 반영은 한 번에 하나
+        self._stored: Dict[str, Set[str]] = {}
+        self._cursor: Optional[Tuple[int, int]] = None
+        # 반영 중(파일에 쓰는 중)인 토글: 쓰기가 끝나 저장 상태에 들어갈 때까지 읽기에 합친다
+        self._inflight: Dict[Key, Tuple[bool, str, int]] = {}
+        self._inflight_delta: Dict[str, int] = {}
+        self._wake = threading.Event()
+
+    # ---- 저장 상태 ----
+    def _load_locked(self) -> None:
+        """_state 잠금 안에서: reactions.csv 에 새로 붙은 행만 반영(재작성됐으면 처음부터)"""
+        rows, self._cursor, reset = read_csv_since(self.path, self._cursor)
+        if reset:
+            self._stored = {}
+        for r in rows:
+            self._stored.setdefault(r.get("post_id", ""), set()).add(r.get("user_id", ""))
+
+    def _sync(self) -> None:
+        # 반영 중에는 건너뛴다: 새로 쓴 행과 반영 중 목록이 이중으로 세어지지 않게 반영 쪽이 함께 정리한다
+        if not self._flushing.acquire(blocking=False):
+            return
+        try:
+            with self._state:
+                self._load_locked()
+        finally:
+            self._flushing.release()
+
+    def _base(self, key: Key) -> bool:
+        """대기 중인 토글을 빼고 본 상태(반영 중인 것 포함)"""
+        with self._state:
+            entry = self._inflight.get(key)
+            return entry[0] if entry else key[1] in self._stored.get(key[0], ())
+
+    def _stripe(self, key: Key) -> _Stripe:
+        return self._stripes[hash(key) & self._mask]
+
+    # ---- 읽기 ----
+    def liked(self, post_id: str, user_id: str) -> bool:
+        self._sync()
+        key = (post_id, user_id)
+        entry = self._stripe(key).pending.get(key)
+        return entry[0] if entry else self._base(key)
+
+    def count(self, post_id: str) -> int:
+        self._sync()
+        return self._count(post_id)
+
+    def counts(self, post_ids: Iterable[str]) -> Dict[str, int]:
+        """여러 글의 좋아요 수 (저장 상태는 한 번만 맞춘다)"""
+        self._sync()
+        return {pid: self._count(pid) for pid in post_ids}
+
+    def _count(self, post_id: str) -> int:
+        with self._state:
+            n = len(self._stored.get(post_id, ())) + self._inflight_delta.get(post_id, 0)
+        return max(n + sum(s.delta.get(post_id, 0) for s in self._stripes), 0)
+
+    def liked_posts(self, user_id: str, stored: Set[str]) -> Set[str]:
+        """user_id 가 좋아요한 글: 저장 상태에서 읽은 stored 에 반영 중/대기 중 토글을 덮어쓴다"""
+        out = set(stored)
+        with self._state:
+            layers = [dict(self._inflight)]
+        for s in self._stripes:
+            with s.lock:
+                layers.append(dict(s.pending))
+        for layer in layers:
+            for (post_id, uid), (liked, _, _) in layer.items():
+                if uid == user_id:
+                    (out.add if liked else out.discard)(post_id)
+        return out
+
+    # ---- 토글 ----
+    def toggle(self, post_id: str, user_id: str) -> Tuple[bool, int]:
+        """좋아요 상태를 뒤집는다. 반환: (지금 좋아요 상태, 좋아요 수)"""
+        check_writable(self.path)
+        self._sync()
+        key = (post_id, user_id)
+        s = self._stripe(key)
+        with s.lock:
+            base = self._base(key)
+            entry = s.pending.get(key)
+            liked = not (entry[0] if entry else base)
+            before = entry[2] if entry else 0
+            if liked == base:  # 창 안에서 원래대로 돌아옴: 쓸 것이 없다
+                s.pending.pop(key, None)
+                after = 0
+            else:
+                after = 1 if liked else -1
+                s.pending[key] = (liked, now_kst_iso(), after)
+            d = s.delta.get(post_id, 0) + after - before
+            if d:
+                s.delta[post_id] = d
+            else:
+                s.delta.pop(post_id, None)
+        if FLUSH_SEC <= 0:
+            self.flush()
+        elif self.pending() >= MAX_PENDING:
+            self._wake.set()
+        return liked, self._count(post_id)
+
+    def pending(self) -> int:
+        return sum(len(s.pending) for s in self._stripes)
+
+    # ---- 반영 ----
+    def flush(self) -> int:
+        """대기 중인 토글을 reactions.csv 에 반영. 반환: 실제로 바뀐 (글, 사용자) 수"""
+        with self._flushing:
+            batch: Dict[Key, Tuple[bool, str, int]] = {}
+            deltas: Dict[str, int] = {}
+            for s in self._stripes:
+                with s.lock:
+                    if not s.pending:
+                        continue
+                    batch.update(s.pending)
+                    for post_id, d in s.delta.items():
+                        deltas[post_id] = deltas.get(post_id, 0) + d
+                    s.pending, s.delta = {}, {}
+            if not batch:
+                return 0
+            with self._state:
+                self._inflight, self._inflight_delta = batch, deltas
+            try:
+                applied = self._apply(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            with self._state:
+                self._load_locked()
+                self._inflight, self._inflight_delta = {}, {}
+        from services.activity import log_event  # 순환 import 회피용 지역 import
+        for (post_id, user_id), liked in applied:
+            log_event(
+                event_type="REACTION_ADDED" if liked else "REACTION_REMOVED",
+                actor_id=user_id,
+                target_type="Post",
+                target_id=post_id,
+                metadata={},
+            )
+        return len(applied)
+
+    def _apply(self, batch: Dict[Key, Tuple[bool, str, int]]) -> List[Tuple[Key, bool]]:
+        adds = {k: e for k, e in batch.items() if e[0]}
+        removes = {k for k, e in batch.items() if not e[0]}
+        applied: List[Tuple[Key, bool]] = []
+        if removes:
+            def _mutate(rows: List[Dict[str, str]]):
+                applied.clear()
+                kept, have, gone = [], set(), set()
+                for r in rows:
+                    k = (r["post_id"], r["user_id"])
+                    if k in removes:
+                        gone.add(k)
+                    else:
+                        kept.append(r)
+                        have.add(k)
+                new = [{"post_id": k[0], "user_id": k[1], "created_at": e[1]}
+                       for k, e in adds.items() if k not in have]
+                applied.extend((k, False) for k in gone)
+                applied.extend(((r["post_id"], r["user_id"]), True) for r in new)
+                return kept + new if gone or new else None
+
+            update_csv(self.path, _mutate)
+            return applied
+        # 다른 프로세스가 먼저 넣은 것은 다시 넣지 않는다(확인과 append 를 한 배타 잠금 안에서)
+        new = append_csv_absent(self.path, [{"post_id": k[0], "user_id": k[1], "created_at": e[1]}
+                                            for k, e in adds.items()], ["post_id", "user_id"])
+        return [((r["post_id"], r["user_id"]), True) for r in new]
+
+    def _requeue(self, batch: Dict[Key, Tuple[bool, str, int]]) -> None:
+        """반영 실패: 그 사이 새로 토글되지 않은 것만 대기열로 되돌려 다음 주기에 다시 시도"""
+        with self._state:
+            self._inflight, self._inflight_delta = {}, {}
+        for key, entry in batch.items():
+            s = self._stripe(key)
+            with s.lock:
+                if key in s.pending:
+                    continue
+                s.pending[key] = entry
+                s.delta[key[0]] = s.delta.get(key[0], 0) + entry[2]
+
+    def run(self, stop: threading.Event, interval_sec: float) -> None:
+        while not stop.is_set():
+            self._wake.wait(interval_sec)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # 다음 주기에 다시 시도
+                _log.exception("reaction flush failed")
+
+
+# ----------------------------
+# 프로세스 공용 버퍼 + 백그라운드 반영
+# ----------------------------
+_buffer: Optional[ReactionBuffer] = None
+_guard = threading.RLock()
+_stop = threading.Event()
+
+
+def get_buffer() -> ReactionBuffer:
+    """프로세스 공용 버퍼. 처음 쓸 때 반영 스레드를 띄우고 종료 시 남은 토글을 반영하도록 등록"""
+    global _buffer
+    with _guard:
+        if _buffer is None:
+            _buffer = ReactionBuffer()
+            if FLUSH_SEC > 0:
+                threading.Thread(target=_buffer.run, args=(_stop, FLUSH_SEC),
+                                 name="reaction_buffer", daemon=True).start()
+                atexit.register(flush_pending)
+        return _buffer
+
+
+def flush_pending() -> int:
+    """남은 토글을 지금 반영(종료 시, 테스트/스크립트에서 즉시 보고 싶을 때)"""
+    with _guard:
+        buf = _buffer
+    return buf.flush() if buf is not None else 0
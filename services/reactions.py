@@ -1,40 +1,17 @@
 # services/reactions.py
+# 좋아요 토글/조회는 services/reaction_buffer 를 거친다: 토글은 잠깐 모았다가 순변화만 한 번에 쓰고,
+# 조회는 저장된 상태 + 아직 쓰지 않은 토글을 합쳐서 답한다(활동 로그는 실제로 반영될 때 남는다).
 import os
-from typing import List, Dict, Tuple
-from repo.csv_repo import read_csv, write_csv, append_csv
-from utils.time import now_kst_iso
-from services.activity import log_event  # ★ 활동 로그
+from typing import Tuple
+from services.reaction_buffer import get_buffer
 
 REACTIONS = os.path.join("data", "reactions.csv")
 
 def count_likes(post_id: str) -> int:
-    return sum(1 for r in read_csv(REACTIONS) if r["post_id"] == post_id)
+    return get_buffer().count(post_id)
 
 def user_liked(post_id: str, user_id: str) -> bool:
-    return any(r for r in read_csv(REACTIONS) if r["post_id"] == post_id and r["user_id"] == user_id)
+    return get_buffer().liked(post_id, user_id)
 
 def toggle_like(post_id: str, user_id: str) -> Tuple[bool, int]:
-    rows = read_csv(REACTIONS)
-    before = len(rows)
-    # remove if exists
-    rows = [r for r in rows if not (r["post_id"] == post_id and r["user_id"] == user_id)]
-    if len(rows) < before:
-        write_csv(REACTIONS, rows)  # unliked
-        log_event(
-            event_type="REACTION_REMOVED",
-            actor_id=user_id,
-            target_type="Post",
-            target_id=post_id,
-            metadata={},
-        )
-        return (False, count_likes(post_id))
-    # else add
-    append_csv(REACTIONS, {"post_id": post_id, "user_id": user_id, "created_at": now_kst_iso()})
-    log_event(
-        event_type="REACTION_ADDED",
-        actor_id=user_id,
-        target_type="Post",
-        target_id=post_id,
-        metadata={},
-    )
-    return (True, count_likes(post_id))
+    return get_buffer().toggle(post_id, user_id)
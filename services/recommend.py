@@ -0,0 +1,391 @@
+# services/recommend.py
+# "팔로우 추천"(친구의 친구). follows/reactions 를 정수 인덱스 희소 행렬(CSR)로 만들어 전체 사용자를
+# 한 번에(배치로) 계산하고, 사용자별 상위 N 명을 캐시해 둔다.
+#   A[u, v] = u 가 v 를 팔로우,  R[u, p] = u 가 글 p 에 좋아요
+#   점수 = W_MUTUAL      · (A·A)[u, c]   내가 팔로우하는 사람 중 c 를 팔로우하는 수(두 단계 경로)
+#        + W_FOLLOWS_YOU · Aᵀ[u, c]      c 가 나를 팔로우(맞팔로우 후보)
+#        + W_CO_LIKE     · (R·Rᵀ)[u, c]  같은 글에 좋아요한 수
+#   자기 자신과 이미 팔로우 중인 사람은 뺀다.
+# - scipy 가 있으면 scipy.sparse 로 곱하고, 없으면 같은 CSR 배열에서 두 단계 경로를 NumPy 로 펼쳐 센다(결과 동일)
+# - 팔로잉이 아주 많은 중간 사용자·좋아요가 아주 많은 글은 경로 수만 제곱으로 늘리고 정보가 적어 경유지에서 뺀다
+# - 사용자 구간을 경로 수 기준으로 잘라 계산해 메모리를 일정하게 유지한다
+# - follows/reactions 세대가 바뀌었을 때만 주기적으로 다시 계산(그 사이 새 팔로우는 조회 시 exclude 로 거른다)
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:  # 선택 의존성: 없으면 NumPy 로 같은 계산
+    from scipy import sparse as _sparse
+except ImportError:  # pragma: no cover
+    _sparse = None
+
+from repo.csv_repo import read_id_columns, table_version
+
+FOLLOWS = os.path.join("data", "follows.csv")
+REACTIONS = os.path.join("data", "reactions.csv")
+
+_log = logging.getLogger(__name__)
+
+W_MUTUAL = 1.0
+W_FOLLOWS_YOU = 2.0
+W_CO_LIKE = 0.5
+TOP_N = 20
+# 경유지에서 빼는 기준: 팔로잉 수 / 좋아요 수가 이보다 많으면
+MAX_MID_FOLLOWING = 2000
+MAX_POST_LIKERS = 1000
+# 한 번에 펼치는 경로 수(메모리 상한 ≈ 이 값 × 수십 바이트)
+PATHS_PER_CHUNK = 4_000_000
+# 상위 N 을 고르기 전 점수 히스토그램 구간 수(0.25 단위, 맨 위 구간은 그 이상 전부)
+_BINS = 256
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class _CSR:
+    """행 → 열 목록 (indptr/indices). 중복 칸은 없다. 칸 키 = (행 << bits) | 열"""
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, n_rows: int, n_cols: int):
+        self.bits = max(int(n_cols).bit_length(), 1)
+        key = (rows << self.bits) | cols
+        if len(key) and not (key[1:] >= key[:-1]).all():  # 이미 정렬된 입력이 대부분
+            cols = cols[np.argsort(key)]
+        self.indices = cols.astype(np.int64)
+        self.degree = np.bincount(rows, minlength=n_rows).astype(np.int64)
+        self.indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=self.indptr[1:])
+        self.n_rows, self.n_cols = n_rows, n_cols
+        self._sp = None
+
+    def without_rows(self, drop: np.ndarray) -> "_CSR":
+        """drop(bool, 행별) 인 행을 비운 사본"""
+        rows = np.repeat(np.arange(self.n_rows, dtype=np.int64), self.degree)
+        keep = ~drop[rows]
+        return _CSR(rows[keep], self.indices[keep], self.n_rows, self.n_cols)
+
+    def transpose(self) -> "_CSR":
+        rows = np.repeat(np.arange(self.n_rows, dtype=np.int64), self.degree)
+        return _CSR(self.indices, rows, self.n_cols, self.n_rows)
+
+    def row_keys(self, r0: int, r1: int) -> np.ndarray:
+        """r0..r1 행의 칸을 ((지역 행 << bits) | 열) 키로 — 오름차순"""
+        src = np.repeat(np.arange(r1 - r0, dtype=np.int64), self.degree[r0:r1])
+        return (src << self.bits) | self.indices[self.indptr[r0]:self.indptr[r1]]
+
+    @property
+    def sp(self):
+        if self._sp is None:
+            self._sp = _sparse.csr_matrix(
+                (np.ones(len(self.indices), dtype=np.int32), self.indices, self.indptr),
+                shape=(self.n_rows, self.n_cols))
+        return self._sp
+
+
+def _paths(left: _CSR, right: _CSR, r0: int, r1: int) -> np.ndarray:
+    """
+    left[r0:r1] 행에서 right 를 거치는 두 단계 경로마다 키((지역 행 << right.bits) | 열) 하나.
+    정렬하지 않은 채로 돌려주고, 호출 측이 다른 목록과 함께 한 번에 정렬해 센다.
+    """
+    if _sparse is not None:
+        prod = (left.sp[r0:r1] @ right.sp).tocoo()
+        return np.repeat((prod.row.astype(np.int64) << right.bits) | prod.col, prod.data)
+    s, e = left.indptr[r0], left.indptr[r1]
+    mids = left.indices[s:e]
+    cnt = right.degree[mids]
+    total = int(cnt.sum())
+    if total == 0:
+        return _EMPTY
+    src = np.repeat(np.arange(r1 - r0, dtype=np.int64), left.degree[r0:r1])
+    # 경유지 m 마다 right 의 m 행 전체를 이어 붙인다: pos = indptr[m] + (i - 그 구간 시작)
+    pos = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(cnt) - cnt - right.indptr[mids], cnt)
+    return (np.repeat(src, cnt) << right.bits) | right.indices[pos]
+
+
+def _unique(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """정렬 기반 (고유 키, 개수). 수백만 개 정수에서는 np.unique(해시 기반) 보다 훨씬 빠르다"""
+    if not len(keys):
+        return _EMPTY, _EMPTY
+    keys = np.sort(keys)
+    starts = _group_starts(keys)
+    return keys[starts], np.diff(np.append(starts, len(keys)))
+
+
+def _row_work(left: _CSR, right: _CSR) -> np.ndarray:
+    """left 행마다 _paths 가 펼칠 경로 수"""
+    cs = np.zeros(len(left.indices) + 1, dtype=np.int64)
+    np.cumsum(right.degree[left.indices], out=cs[1:])
+    return cs[left.indptr[1:]] - cs[left.indptr[:-1]]
+
+
+def _group_starts(sorted_vals: np.ndarray) -> np.ndarray:
+    """정렬된 배열에서 값이 바뀌는 위치(각 묶음의 시작)"""
+    return np.flatnonzero(np.concatenate(([True], sorted_vals[1:] != sorted_vals[:-1])))
+
+
+class FollowRecommender:
+    """사용자별 추천 상위 N 명을 CSR 모양 배열로 들고 있는다(사용자 수에 비례하는 메모리)"""
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.users = _EMPTY          # 인덱스 → 사용자 번호(u_0012 → 12), 오름차순
+        self.ptr = np.zeros(1, dtype=np.int64)
+        self.cand = _EMPTY           # 추천 대상(사용자 인덱스)
+        self.score = np.empty(0, dtype=np.float32)
+        self.mutual = _EMPTY
+        self.follows_you = _EMPTY
+        self.co_likes = _EMPTY
+        self.popular = _EMPTY        # 팔로워 많은 순(추천이 없는 새 사용자용)
+        self.follows: Optional[_CSR] = None
+        self.build_sec = 0.0
+
+    # ---- 계산 ----
+    def build(self, top_n: int = TOP_N) -> "FollowRecommender":
+        """테이블에서 읽어 계산. 세대를 먼저 잡아 두므로 읽는 사이 바뀐 것은 다음 갱신 때 반영된다"""
+        self.versions = {p: table_version(p) for p in (FOLLOWS, REACTIONS)}
+        f = read_id_columns(FOLLOWS, ["follower_id", "followee_id"])
+        r = read_id_columns(REACTIONS, ["user_id", "post_id"])
+        return self.compute(f["follower_id"], f["followee_id"], r["user_id"], r["post_id"], top_n)
+
+    def compute(self, follower: np.ndarray, followee: np.ndarray,
+                liker: np.ndarray, post: np.ndarray, top_n: int = TOP_N) -> "FollowRecommender":
+        t0 = time.perf_counter()
+        ok = (follower > 0) & (followee > 0) & (follower != followee)
+        follower, followee = follower[ok], followee[ok]
+        ok = (liker > 0) & (post > 0)
+        liker, post = liker[ok], post[ok]
+
+        users = _unique(np.concatenate([follower, followee, liker]))[0]
+        posts = _unique(post)[0]
+        n = len(users)
+        index = self._dense_index(users)
+        A = self._matrix(index[follower], index[followee], n, n)
+        R = self._matrix(index[liker], self._dense_index(posts)[post], n, len(posts))
+
+        followers_of = A.transpose()                                  # Aᵀ
+        mid = A.without_rows(A.degree > MAX_MID_FOLLOWING)            # 경유지 허브 제외
+        likers_of = R.transpose()
+        likers_of = likers_of.without_rows(likers_of.degree > MAX_POST_LIKERS)
+
+        work = np.cumsum(_row_work(A, mid) + _row_work(R, likers_of) + followers_of.degree)
+        parts: List[Tuple[np.ndarray, ...]] = []
+        r0 = 0
+        while r0 < n:
+            base = work[r0 - 1] if r0 else 0
+            r1 = max(int(np.searchsorted(work, base + PATHS_PER_CHUNK, side="right")), r0 + 1)
+            r1 = min(r1, n)
+            parts.append(self._chunk(A, mid, followers_of, R, likers_of, r0, r1, top_n))
+            r0 = r1
+
+        self.users, self.follows = users, A
+        counts = np.zeros(n, dtype=np.int64)
+        if parts:
+            rows = np.concatenate([p[0] for p in parts])
+            counts = np.bincount(rows, minlength=n).astype(np.int64)
+            self.cand, self.score, self.mutual, self.follows_you, self.co_likes = (
+                np.concatenate([p[i] for p in parts]) for i in range(1, 6))
+        self.ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.ptr[1:])
+        self.popular = np.argsort(-followers_of.degree, kind="stable")[:max(top_n, 50)]
+        self.popular = self.popular[followers_of.degree[self.popular] > 0]
+        self.build_sec = time.perf_counter() - t0
+        return self
+
+    @staticmethod
+    def _dense_index(ids: np.ndarray) -> np.ndarray:
+        """정렬된 고유 번호 → 0..n-1 순번 조회표 (번호가 작은 정수라 searchsorted 보다 빠르다)"""
+        index = np.zeros(int(ids[-1]) + 1 if len(ids) else 1, dtype=np.int64)
+        index[ids] = np.arange(len(ids))
+        return index
+
+    @staticmethod
+    def _matrix(rows: np.ndarray, cols: np.ndarray, n_rows: int, n_cols: int) -> _CSR:
+        """(행, 열) 쌍 → CSR. 같은 쌍이 여러 번(중복 팔로우/좋아요 행) 있어도 한 칸"""
+        bits = max(int(n_cols).bit_length(), 1)
+        e = _unique((rows.astype(np.int64) << bits) | cols)[0]
+        return _CSR(e >> bits, e & ((1 << bits) - 1), n_rows, n_cols)
+
+    @staticmethod
+    def _chunk(A: _CSR, mid: _CSR, followers_of: _CSR, R: _CSR, likers_of: _CSR,
+               r0: int, r1: int, top_n: int) -> Tuple[np.ndarray, ...]:
+        # 네 목록(두 단계 경로 / 좋아요 겹침 / 나를 팔로우 / 이미 팔로우)을 (키 << 2) | 목록 번호로 합쳐
+        # 한 번만 정렬하고, (키, 목록)별 개수를 센 뒤 키별로 모은다
+        codes = np.concatenate([
+            _paths(A, mid, r0, r1) << 2,
+            (_paths(R, likers_of, r0, r1) << 2) | 1,
+            (followers_of.row_keys(r0, r1) << 2) | 2,
+            (A.row_keys(r0, r1) << 2) | 3,
+        ])
+        if not len(codes):
+            return (_EMPTY,) * 2 + (np.empty(0, dtype=np.float32),) + (_EMPTY,) * 3
+        codes, counts = _unique(codes)
+        keys = codes >> 2
+        starts = _group_starts(keys)
+        group = np.zeros(len(keys), dtype=np.int64)
+        group[starts[1:]] = 1
+        np.cumsum(group, out=group)
+        table = np.zeros((len(starts), 4), dtype=np.int64)  # 열: 두 단계 / 좋아요 겹침 / 나를 팔로우 / 이미 팔로우
+        table.ravel()[(group << 2) | (codes & 3)] = counts
+        keys = keys[starts]
+        src = keys >> A.bits
+        dst = keys & ((1 << A.bits) - 1)
+        score = table[:, :3] @ np.array([W_MUTUAL, W_CO_LIKE, W_FOLLOWS_YOU])
+
+        # 후보가 수천만 쌍이어도 정렬은 상위 N 근처만: 점수를 구간(0.25 단위, 0 = 제외 대상)으로 나눠
+        # 사용자별 히스토그램을 만들고, 위에서부터 세어 N 개를 처음 넘는 구간까지만 남긴다(경계 구간은 통째로)
+        valid = (table[:, 3] == 0) & (dst != src + r0)
+        q = np.where(valid, 1 + np.minimum(score * 4, _BINS - 2), 0).astype(np.int64)
+        hist = np.bincount((src * _BINS) + q, minlength=(r1 - r0) * _BINS).reshape(r1 - r0, _BINS)
+        hist[:, 0] = 0
+        at_least = np.cumsum(hist[:, ::-1], axis=1)[:, ::-1]     # [u, b] = 구간 b 이상 후보 수
+        floor = np.maximum((at_least >= top_n).sum(axis=1) - 1, 1)
+        sel = np.flatnonzero(q >= floor[src])
+        src, dst, score, table = src[sel], dst[sel], score[sel], table[sel]
+
+        # 사용자(src)별 점수 내림차순, 같은 점수는 인덱스 순 → 앞에서 top_n 개
+        # (이미 (src, dst) 순이므로 src 구간마다 점수만 안정 정렬하면 된다)
+        span = float(score.max()) + 1.0 if len(score) else 1.0
+        order = np.argsort(src * span - score, kind="stable")
+        src = src[order]
+        starts = _group_starts(src)
+        keep = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(src)))) < top_n
+        top = order[keep]
+        return (src[keep] + r0, dst[top], score[top].astype(np.float32),
+                table[top, 0], table[top, 2], table[top, 1])
+
+    # ---- 조회 ----
+    def stale(self) -> bool:
+        return any(table_version(p) != v for p, v in self.versions.items())
+
+    def _uid(self, i: int) -> str:
+        return f"u_{int(self.users[i]):04d}"
+
+    def for_user(self, user_id: str, limit: int = 5, exclude: Optional[Set[str]] = None) -> List[Dict]:
+        """
+        user_id 의 추천 목록 [{user_id, score, mutual, follows_you, co_likes}] (점수 내림차순).
+        exclude(예: 계산 이후 새로 팔로우한 사람)는 건너뛴다. 추천이 없으면 팔로워 많은 순으로 채운다.
+        """
+        from utils.ids import id_num
+
+        exclude = set(exclude or ()) | {user_id}
+        out: List[Dict] = []
+        num = id_num(user_id)
+        i = int(np.searchsorted(self.users, num))
+        if i < len(self.users) and self.users[i] == num:
+            for j in range(int(self.ptr[i]), int(self.ptr[i + 1])):
+                uid = self._uid(self.cand[j])
+                if uid in exclude:
+                    continue
+                out.append({"user_id": uid, "score": float(self.score[j]), "mutual": int(self.mutual[j]),
+                            "follows_you": bool(self.follows_you[j]), "co_likes": int(self.co_likes[j])})
+                if len(out) >= limit:
+                    return out
+        seen = exclude | {r["user_id"] for r in out}
+        if i < len(self.users) and self.users[i] == num and self.follows is not None:
+            seen |= {self._uid(c) for c in self.follows.indices[self.follows.indptr[i]:self.follows.indptr[i + 1]]}
+        for c in self.popular.tolist():
+            if len(out) >= limit:
+                break
+            uid = self._uid(c)
+            if uid not in seen:
+                out.append({"user_id": uid, "score": 0.0, "mutual": 0, "follows_you": False, "co_likes": 0})
+        return out
+
+
+_engine: Optional[FollowRecommender] = None
+_guard = threading.RLock()
+
+
+def get_recommender() -> FollowRecommender:
+    """처음 부를 때만 동기 계산. 이후 갱신은 refresh_recommendations(백그라운드 작업)가 한다"""
+    global _engine
+    with _guard:
+        if _engine is None:
+            _engine = FollowRecommender().build()
+        return _engine
+
+
+def refresh_recommendations(force: bool = False) -> bool:
+    """follows/reactions 가 바뀌었으면 새로 계산해 교체(계산 중에도 이전 결과로 조회 가능). 반환: 교체 여부"""
+    global _engine
+    with _guard:
+        current = _engine
+    if current is not None and not force and not current.stale():
+        return False
+    fresh = FollowRecommender().build()
+    with _guard:
+        _engine = fresh
+    return True
+
+
+def suggest_follows(user_id: str, limit: int = 5, exclude: Optional[Set[str]] = None) -> List[Dict]:
+    """user_id 에게 보여 줄 팔로우 추천 (FollowRecommender.for_user 참고)"""
+    return get_recommender().for_user(user_id, limit, exclude)
+
+
+# ----------------------------
+# 백그라운드 갱신
+# ----------------------------
+_job_started = False
+_job_guard = threading.Lock()
+
+
+def start_background_recommendations(interval_sec: int = 900) -> bool:
+    """프로세스당 한 번만 데몬 스레드를 띄워 테이블이 바뀌었을 때 주기적으로 추천을 다시 계산"""
+    global _job_started
+    with _job_guard:
+        if _job_started:
+            return False
+        _job_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_sec):
+            try:
+                refresh_recommendations()
+            except Exception:  # 다음 주기에 다시 시도
+                _log.exception("recommendation refresh failed")
+
+    threading.Thread(target=_loop, name="recommend", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="팔로우 추천 계산/확인")
+    ap.add_argument("--user", help="이 사용자의 추천을 출력")
+    ap.add_argument("--limit", type=int, default=10)
+    ap.add_argument("--bench", type=int, metavar="EDGES", help="합성 그래프(팔로우 EDGES개)로 계산 시간 측정")
+    ap.add_argument("--likes", type=int, default=None, help="--bench 의 좋아요 수(기본: EDGES 와 같음)")
+    args = ap.parse_args()
+    backend = "scipy.sparse" if _sparse is not None else "numpy"
+    if args.bench:
+        rng = np.random.default_rng(7)
+        n_users = max(args.bench // 20, 10)
+        n_posts = max(args.bench // 10, 10)
+
+        def _skewed(size: int, n: int) -> np.ndarray:
+            # 일부 계정/글에 몰리는 분포(지프) + 나머지는 고르게
+            z = rng.zipf(1.6, size) % n
+            u = rng.integers(0, n, size)
+            return np.where(rng.random(size) < 0.3, z, u) + 1
+
+        n_likes = args.bench if args.likes is None else args.likes
+        follower = rng.integers(1, n_users + 1, args.bench)
+        followee = _skewed(args.bench, n_users)
+        liker = rng.integers(1, n_users + 1, n_likes)
+        post = _skewed(n_likes, n_posts)
+        eng = FollowRecommender().compute(follower, followee, liker, post)
+        print(f"{backend}: {args.bench} follows + {n_likes} likes, {n_users} users → "
+              f"{len(eng.cand)} suggestions in {eng.build_sec:.2f} s")
+        print(eng.for_user("u_0001", args.limit))
+    else:
+        eng = get_recommender()
+        print(f"{backend}: {len(eng.users)} users → {len(eng.cand)} suggestions in {eng.build_sec * 1000:.1f} ms")
+        if args.user:
+            for s in eng.for_user(args.user, args.limit):
+                print(s)
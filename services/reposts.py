@@ -0,0 +1,134 @@
+# services/reposts.py
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from repo.csv_repo import read_csv_cached, table_version, adopt_own_writes
+from repo.offset_index import lookup_rows
+
+POSTS = os.path.join("data", "posts.csv")
+
+
+class RepostIndex:
+    """
+    원본 post_id → {리포스트 post_id: 리포스트한 user_id} (삭제되지 않은 리포스트만).
+    posts.csv 에서 한 번 만들고, 이후에는 create_post / 삭제 / 복구가 제자리에서 갱신한다.
+    """
+
+    def __init__(self):
+        self.by_original: Dict[str, Dict[str, str]] = {}
+        self.reposts: Dict[str, Tuple[str, str]] = {}   # 리포스트 → (원본, user), 삭제된 것 포함
+        self.versions: Dict[str, int] = {}
+
+    def build(self, rows: Iterable[dict]) -> None:
+        for r in rows:
+            orig = r.get("original_post_id")
+            if orig:
+                self.reposts[r["post_id"]] = (orig, r.get("author_id", ""))
+                if r.get("is_deleted") != "1":
+                    self.by_original.setdefault(orig, {})[r["post_id"]] = r.get("author_id", "")
+
+    def to_state(self) -> dict:
+        """스냅샷용 JSON 상태"""
+        return {"by_original": self.by_original, "reposts": self.reposts, "versions": self.versions}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RepostIndex":
+        idx = cls()
+        idx.by_original = state["by_original"]
+        idx.reposts = {r: (o, u) for r, (o, u) in state["reposts"].items()}
+        idx.versions = state["versions"]
+        return idx
+
+    def set_active(self, repost_id: str, active: bool) -> None:
+        if repost_id not in self.reposts:
+            return
+        orig, user = self.reposts[repost_id]
+        if active:
+            self.by_original.setdefault(orig, {})[repost_id] = user
+            return
+        group = self.by_original.get(orig)
+        if group is not None:
+            group.pop(repost_id, None)
+            if not group:
+                del self.by_original[orig]
+
+
+_index: Optional[RepostIndex] = None
+_guard = threading.RLock()
+
+
+def _get_index() -> RepostIndex:
+    """
+    프로세스 공용 인덱스. 처음에는 스냅샷에 걸어 둔 것이 있으면 꺼내 쓰고,
+    다른 프로세스가 posts.csv 를 바꿨으면 다시 만든다
+    """
+    global _index
+    with _guard:
+        current = {POSTS: table_version(POSTS)}
+        if _index is None:
+            from services.snapshot import take_index  # 순환 import 회피용 지역 import
+            _index = take_index("reposts", lambda state, _: RepostIndex.from_state(state))
+        if _index is None or _index.versions != current:
+            idx = RepostIndex()
+            idx.build(read_csv_cached(POSTS))
+            idx.versions = current
+            _index = idx
+        return _index
+
+
+def repost_count(post_id: str) -> int:
+    with _guard:
+        return len(_get_index().by_original.get(post_id, {}))
+
+
+def reposters(post_id: str) -> List[str]:
+    """post_id 를 리포스트한 사용자 (중복 제거, 리포스트 순)"""
+    with _guard:
+        return list(dict.fromkeys(_get_index().by_original.get(post_id, {}).values()))
+
+
+def resolve_originals(rows: Iterable[dict]) -> Dict[str, dict]:
+    """한 페이지의 리포스트들이 가리키는 원본을 한 번에 조회. 반환: 원본 post_id → 행"""
+    ids = {r.get("original_post_id") for r in rows if r.get("original_post_id")}
+    return lookup_rows(POSTS, ids) if ids else {}
+
+
+def collapse_reposts(rows: List[dict]) -> List[Tuple[dict, List[str]]]:
+    """
+    같은 원본을 가리키는 글(원본 자체 + 리포스트들)을 카드 하나로 묶는다.
+    rows 의 순서를 유지하며 각 묶음의 첫 행을 대표로 쓴다.
+    반환: (대표 행, 이 묶음에서 리포스트한 user_id 목록)
+    """
+    groups: Dict[str, Tuple[dict, List[str]]] = {}
+    out: List[Tuple[dict, List[str]]] = []
+    for r in rows:
+        orig = r.get("original_post_id") or r["post_id"]
+        if orig not in groups:
+            groups[orig] = (r, [])
+            out.append(groups[orig])
+        if r.get("original_post_id"):
+            users = groups[orig][1]
+            if r.get("author_id") not in users:
+                users.append(r.get("author_id", ""))
+    return out
+
+
+# ----------------------------
+# services.posts 가 쓰기 직후 호출
+# ----------------------------
+def note_repost_created(repost_id: str, original_post_id: str, user_id: str) -> None:
+    with _guard:
+        if _index is None:
+            return
+        _index.reposts[repost_id] = (original_post_id, user_id)
+        _index.set_active(repost_id, True)
+        adopt_own_writes(_index.versions, POSTS, 1)
+
+
+def note_post_visibility(post_id: str, deleted: bool) -> None:
+    with _guard:
+        if _index is None:
+            return
+        _index.set_active(post_id, not deleted)
+        adopt_own_writes(_index.versions, POSTS, 1)
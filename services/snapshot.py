@@ -0,0 +1,296 @@
+# services/snapshot.py
+# 메모리 파생 구조(테이블 증분 캐시, 태그 인덱스, 리포스트 인덱스, 인기순 랭커)를
+# data/snapshot.bin 하나로 저장해 두었다가 프로세스 시작 시 다시 쓴다.
+# 파일 구성: MAGIC + 포맷 버전 + 목차 길이 + 목차(JSON) + 섹션별 JSON 블롭
+# - 데이터만 담는 형식(JSON)이라 data/ 에 누가 파일을 넣어도 코드가 실행되지 않는다
+#   (복제로 받은 파일, 백업에서 되살린 파일도 그대로 읽어도 됨)
+# - 목차만 먼저 읽고, 테이블 캐시는 그 테이블을 처음 읽을 때 해당 블롭만 역직렬화한다
+# - 테이블은 (장치, inode, 재작성 횟수, 크기, mtime) 으로 검증, 그 뒤에 붙은 행만 이어 읽는다
+# - 파생 인덱스는 저장 당시 테이블 세대가 지금과 같을 때만 그대로 쓴다(아니면 평소처럼 재구축)
+import gc
+import json
+import logging
+import os
+import struct
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from repo.csv_repo import (
+    export_tail_caches, seed_tail_cache, cursor_at, table_version, storage_path, table_lock, read_stamp,
+)
+
+SNAPSHOT = os.path.join("data", "snapshot.bin")
+_MAGIC = b"SMSNAP01"
+FORMAT_VERSION = 2
+_HDR = struct.Struct("<8sIQ")   # magic, 포맷 버전, 목차 길이
+
+LOG_PATH = os.path.join("data", "activity_log.csv")
+
+_last_saved: Dict[str, int] = {}
+_guard = threading.Lock()
+_log = logging.getLogger(__name__)
+# 인덱스 섹션 이름 → (스냅샷 파일, 위치, 길이, meta). load_snapshot 은 인덱스 모듈을 import 하지 않고
+# 여기 걸어 두기만 한다(태그 인덱스/랭커는 처음 쓸 때까지 올리지 않음). 각 모듈이 take_index 로 꺼낸다.
+_indexes: Dict[str, Tuple[str, int, int, dict]] = {}
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes, decode: Callable[[Any], Any]):
+    # 작은 dict 수십만 개를 만들 때 순환 GC 가 반복해서 돌지 않게 잠시 끈다
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return decode(json.loads(data))
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _table_blob(fieldnames: List[str], rows: List[Dict[str, str]]) -> dict:
+    # 행은 컬럼 순서의 값 목록으로 (키를 행마다 반복하지 않는다)
+    return {"fieldnames": fieldnames, "rows": [[r.get(c, "") for c in fieldnames] for r in rows]}
+
+
+def _table_rows(blob: dict) -> Tuple[List[str], List[Dict[str, str]]]:
+    fieldnames = blob["fieldnames"]
+    return fieldnames, [dict(zip(fieldnames, values)) for values in blob["rows"]]
+
+
+# ----------------------------
+# 저장
+# ----------------------------
+class _Raw:
+    """이미 직렬화한 블롭(잠금 안에서 떠 둔 것)"""
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _collect() -> Dict[str, tuple]:
+    """섹션 이름 → (목차에 둘 meta, 블롭 객체)"""
+    sections: Dict[str, tuple] = {}
+    log_meta = None
+    for path, meta, fieldnames, rows in export_tail_caches():
+        target = storage_path(path)
+        if not os.path.exists(target):
+            continue
+        stat = os.stat(target)
+        meta = dict(meta, path=path, header=meta["header"].hex(),
+                    size=stat.st_size, mtime_ns=stat.st_mtime_ns if stat.st_size == meta["offset"] else None)
+        sections[f"table:{path}"] = (meta, _table_blob(fieldnames, rows))
+        if path == LOG_PATH:
+            log_meta = meta
+
+    from services import tag_index, reposts, ranking  # 순환 import 회피용 지역 import
+    for name, module in (("tag_index", tag_index), ("reposts", reposts)):
+        with module._guard:  # 갱신 중인 인덱스를 반쯤 저장하지 않도록 잠금 안에서 직렬화
+            idx = module._index
+            if idx is not None:
+                sections[name] = ({"versions": dict(idx.versions)}, _Raw(_dumps(idx.to_state())))
+    with ranking._guard:
+        r = ranking._ranker
+        if r is not None and r.log_cursor is not None and log_meta is not None:
+            cur = cursor_at(LOG_PATH, r.log_cursor[1], log_meta["dev"], log_meta["ino"], log_meta["epoch"])
+            if cur is not None and cur[0] == r.log_cursor[0]:
+                meta = {"log_rows": r.log_cursor[1], "dev": log_meta["dev"], "ino": log_meta["ino"],
+                        "epoch": log_meta["epoch"]}
+                sections["ranker"] = (meta, _Raw(_dumps(r.to_state())))
+    return sections
+
+
+def save_snapshot(path: str = SNAPSHOT) -> int:
+    """현재 프로세스의 파생 구조를 스냅샷으로 저장. 반환: 파일 크기(바이트)"""
+    sections = _collect()
+    toc: Dict[str, tuple] = {}
+    blobs = []
+    pos = 0
+    for name, (meta, obj) in sections.items():
+        data = obj.data if isinstance(obj, _Raw) else _dumps(obj)
+        toc[name] = (pos, len(data), meta)
+        blobs.append(data)
+        pos += len(data)
+    toc_bytes = _dumps(toc)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HDR.pack(_MAGIC, FORMAT_VERSION, len(toc_bytes)))
+        f.write(toc_bytes)
+        for b in blobs:
+            f.write(b)
+    os.replace(tmp, path)
+    with _guard:
+        _last_saved.clear()
+        _last_saved.update({m["path"]: table_version(m["path"]) for n, (m, _) in sections.items()
+                            if n.startswith("table:")})
+    return os.path.getsize(path)
+
+
+# ----------------------------
+# 불러오기
+# ----------------------------
+def _read_toc(path: str):
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None, None
+    raw = f.read(_HDR.size)
+    if len(raw) < _HDR.size:
+        f.close()
+        return None, None
+    magic, version, toc_len = _HDR.unpack(raw)
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        f.close()
+        return None, None
+    try:
+        toc = json.loads(f.read(toc_len))
+    except ValueError:
+        f.close()
+        return None, None
+    return f, (toc, _HDR.size + toc_len)
+
+
+def _table_valid(meta: dict) -> bool:
+    p = meta["path"]
+    header = bytes.fromhex(meta["header"])
+    target = storage_path(p)
+    if not os.path.exists(target):
+        return False
+    with table_lock(p, exclusive=False) as lf:
+        epoch = read_stamp(lf)[1]
+        stat = os.stat(target)
+        with open(target, "rb") as tf:
+            head = tf.read(len(header))
+    if (stat.st_dev, stat.st_ino, epoch) != (meta["dev"], meta["ino"], meta["epoch"]):
+        return False
+    if stat.st_size < meta["offset"] or head != header:
+        return False
+    # 크기가 그대로인데 mtime 이 다르면 csv_repo 밖에서 고쳐 쓴 것
+    if stat.st_size == meta["size"] and meta["mtime_ns"] is not None and stat.st_mtime_ns != meta["mtime_ns"]:
+        return False
+    return True
+
+
+def load_snapshot(path: str = SNAPSHOT) -> Dict[str, int]:
+    """
+    스냅샷을 등록한다. 목차만 읽고 검증한 뒤 각 섹션은 지연 로드로 걸어 둔다
+    (테이블 캐시는 첫 read_csv_cached, 인덱스는 첫 조회 때 역직렬화).
+    반환: {"tables": 등록한 테이블 수, "indexes": 복원한 인덱스 수}
+    """
+    f, parsed = _read_toc(path)
+    stats = {"tables": 0, "indexes": 0}
+    if f is None:
+        return stats
+    f.close()
+    toc, base = parsed
+
+    def _lazy(off: int, length: int, decode: Callable[[Any], Any]):
+        def load():
+            try:
+                with open(path, "rb") as bf:
+                    bf.seek(base + off)
+                    return _loads(bf.read(length), decode)
+            except Exception:  # 깨졌거나 그 사이 새 스냅샷으로 바뀜 → 평소처럼 재구축
+                return None
+        return load
+
+    for name, (off, length, meta) in toc.items():
+        if name.startswith("table:") and _table_valid(meta):
+            meta = dict(meta, header=bytes.fromhex(meta["header"]))
+            if seed_tail_cache(meta["path"], meta, _lazy(off, length, _table_rows)):
+                stats["tables"] += 1
+
+    # 인덱스도 처음 쓸 때 꺼낸다. 세대가 이미 달라졌으면 걸어 두지 않는다
+    # (랭커는 로그가 덧붙이기만 하므로 꺼낼 때 저장 이후 행만 이어 반영한다)
+    with _guard:
+        _indexes.clear()
+        for name in ("tag_index", "reposts", "ranker"):
+            if name not in toc:
+                continue
+            off, length, meta = toc[name]
+            if all(table_version(p) == v for p, v in meta.get("versions", {}).items()):
+                _indexes[name] = (path, base + off, length, meta)
+                stats["indexes"] += 1
+    return stats
+
+
+def take_index(name: str, decode: Callable[[Any, dict], Any]) -> Any:
+    """
+    load_snapshot 이 걸어 둔 인덱스 섹션을 꺼낸다(한 번만). 반환: decode(JSON 상태, meta) 의 결과.
+    없거나, 깨졌거나, 그 사이 새 스냅샷으로 바뀌었으면 None → 호출 측이 평소처럼 새로 만든다
+    """
+    with _guard:
+        entry = _indexes.pop(name, None)
+    if entry is None:
+        return None
+    path, pos, length, meta = entry
+    try:
+        with open(path, "rb") as f:
+            f.seek(pos)
+            return _loads(f.read(length), lambda state: decode(state, meta))
+    except Exception:
+        return None
+
+
+def snapshot_stale() -> bool:
+    """마지막 저장 이후 캐시된 테이블 중 바뀐 것이 있는지(또는 아직 저장한 적 없는지)"""
+    with _guard:
+        if not _last_saved:
+            return True
+        return any(table_version(p) != v for p, v in _last_saved.items())
+
+
+# ----------------------------
+# 백그라운드 저장
+# ----------------------------
+_job_started = False
+_job_guard = threading.Lock()
+
+
+def start_background_snapshots(interval_sec: int = 600) -> bool:
+    """프로세스당 한 번만 데몬 스레드를 띄워 바뀐 게 있을 때 주기적으로 스냅샷 저장"""
+    global _job_started
+    with _job_guard:
+        if _job_started:
+            return False
+        _job_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_sec):
+            try:
+                if snapshot_stale():
+                    save_snapshot()
+            except Exception:  # 다음 주기에 다시 시도
+                _log.exception("snapshot failed")
+
+    threading.Thread(target=_loop, name="snapshot", daemon=True).start()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="파생 구조 스냅샷 저장/확인")
+    ap.add_argument("command", choices=["save", "check"])
+    args = ap.parse_args()
+    if args.command == "save":
+        # 테이블 캐시와 인덱스를 한 번 만들어서 저장
+        from repo.csv_repo import read_csv_cached
+        from services.tag_index import get_tag_index
+        from services.reposts import repost_count
+        from services.ranking import get_ranker
+        for t in ("users", "posts", "follows", "reactions", "comments", "hashtags", "post_hashtags"):
+            read_csv_cached(os.path.join("data", f"{t}.csv"))
+        get_tag_index()
+        repost_count("")
+        ranker = get_ranker()
+        for w in ("24h", "7d", "30d", "all"):
+            ranker.top_ids(w)  # 기간별 상위 K 까지 만들어 둔 상태로 저장
+        print(f"saved {save_snapshot()} bytes → {SNAPSHOT}")
+    else:
+        t0 = time.perf_counter()
+        stats = load_snapshot()
+        print(f"{stats} in {(time.perf_counter() - t0) * 1000:.1f} ms")
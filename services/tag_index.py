@@ -0,0 +1,157 @@
+# services/tag_index.py
+import heapq
+import math
+import os
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from repo.csv_repo import read_csv_cached, table_version, adopt_own_writes
+from utils.hangul import to_jamo
+
+HASHTAGS = os.path.join("data", "hashtags.csv")
+POST_TAGS = os.path.join("data", "post_hashtags.csv")
+
+# 최근 사용 가중치: last_seen_at 이 이만큼 늦으면 사용 횟수 e배와 같은 점수
+RECENCY_TAU_SEC = 7 * 24 * 3600
+# 접두 범위가 이보다 작으면 바로 훑고, 크면 접두별 상위 K 를 캐시
+SCAN_LIMIT = 256
+TOP_K = 10
+
+
+def _epoch(iso: str) -> float:
+    try:
+        return datetime.fromisoformat(iso).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _query_key(prefix: str) -> str:
+    s = (prefix or "").strip().lstrip("#").lower()
+    return to_jamo(s.replace(" ", "-"))
+
+
+class TagPrefixIndex:
+    """
+    정규화된 태그의 자모 키를 정렬 배열로 들고 bisect 로 접두 범위를 찾는다.
+    점수 = ln(1 + 게시물 수) + last_seen / τ  (시간이 지나도 태그 간 순서는 그대로)
+    접두 범위가 크면 접두별 상위 K 를 캐시해 두고, 갱신 시 그 키의 접두들만 무효화.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []          # 정렬된 (자모키 + '\0' + 태그)
+        self._counts: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._top: Dict[str, List[Tuple[float, str]]] = {}
+        self.versions: Dict[str, int] = {}
+
+    @staticmethod
+    def _entry(tag: str) -> str:
+        return f"{to_jamo(tag)}\0{tag}"
+
+    def _score(self, tag: str) -> float:
+        return math.log1p(self._counts.get(tag, 0)) + self._last_seen.get(tag, 0.0) / RECENCY_TAU_SEC
+
+    def build(self, hashtags: Iterable[dict], post_tags: Iterable[dict]) -> None:
+        self._counts = dict(Counter(r["hashtag"] for r in post_tags))
+        self._last_seen = {r["hashtag"]: _epoch(r.get("last_seen_at", "")) for r in hashtags}
+        tags = set(self._counts) | set(self._last_seen)
+        self._keys = sorted(self._entry(t) for t in tags)
+        self._top.clear()
+
+    def to_state(self) -> dict:
+        """스냅샷용 JSON 상태 (접두별 상위 K 캐시는 빼고)"""
+        return {"keys": self._keys, "counts": self._counts, "last_seen": self._last_seen,
+                "versions": self.versions}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TagPrefixIndex":
+        idx = cls()
+        idx._keys, idx._counts, idx._last_seen = state["keys"], state["counts"], state["last_seen"]
+        idx.versions = state["versions"]
+        return idx
+
+    def note(self, tag: str, seen_at: str, new_posts: int = 0) -> None:
+        """태그 하나의 사용을 반영 (신규 태그면 배열에 삽입)"""
+        if tag not in self._counts and tag not in self._last_seen:
+            insort(self._keys, self._entry(tag))
+        self._counts[tag] = self._counts.get(tag, 0) + new_posts
+        self._last_seen[tag] = max(self._last_seen.get(tag, 0.0), _epoch(seen_at))
+        key = to_jamo(tag)
+        for i in range(len(key) + 1):
+            self._top.pop(key[:i], None)
+
+    def suggest(self, prefix: str, k: int = 5) -> List[str]:
+        key = _query_key(prefix)
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + "\uffff")
+        if hi - lo <= SCAN_LIMIT:
+            ranked = heapq.nlargest(k, ((self._score(t), t) for t in self._tags(lo, hi)))
+            return [t for _, t in ranked]
+        top = self._top.get(key)
+        if top is None or len(top) < k:
+            top = self._top[key] = heapq.nlargest(max(k, TOP_K), ((self._score(t), t) for t in self._tags(lo, hi)))
+        return [t for _, t in top[:k]]
+
+    def _tags(self, lo: int, hi: int):
+        for e in self._keys[lo:hi]:
+            yield e.split("\0", 1)[1]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+_index: Optional[TagPrefixIndex] = None
+_guard = threading.RLock()
+
+
+def get_tag_index() -> TagPrefixIndex:
+    """
+    프로세스 공용 인덱스. 처음에는 스냅샷에 걸어 둔 것이 있으면 꺼내 쓰고,
+    다른 프로세스가 태그 테이블을 바꿨으면 다시 만든다
+    """
+    global _index
+    with _guard:
+        current = {HASHTAGS: table_version(HASHTAGS), POST_TAGS: table_version(POST_TAGS)}
+        if _index is None:
+            from services.snapshot import take_index  # 순환 import 회피용 지역 import
+            _index = take_index("tag_index", lambda state, _: TagPrefixIndex.from_state(state))
+        if _index is None or _index.versions != current:
+            idx = TagPrefixIndex()
+            idx.build(read_csv_cached(HASHTAGS), read_csv_cached(POST_TAGS))
+            idx.versions = current
+            _index = idx
+        return _index
+
+
+def suggest_tags(prefix: str, k: int = 5) -> List[str]:
+    """자동완성: 접두(자모 단위, 예: 'ㅋ' → '코드')로 시작하는 태그를 인기/최근순으로"""
+    if not (prefix or "").strip().lstrip("#"):
+        return []
+    idx = get_tag_index()
+    with _guard:
+        return idx.suggest(prefix, k)
+
+
+def note_tag_usage(seen: Dict[str, str], added: Dict[str, int], wrote_pairs: bool) -> None:
+    """
+    services.tags 가 태그를 저장한 직후 호출: 인덱스를 제자리에서 갱신한다.
+    - seen: 태그 → 마지막 사용 시각, added: 태그 → 새로 연결된 게시물 수
+    아직 인덱스가 없으면 아무것도 하지 않는다(처음 쓸 때 만들어짐).
+    """
+    with _guard:
+        if _index is None:
+            return
+        for t, ts in seen.items():
+            _index.note(t, ts, added.get(t, 0))
+        adopt_own_writes(_index.versions, HASHTAGS, 1)
+        if wrote_pairs:
+            adopt_own_writes(_index.versions, POST_TAGS, 1)
+
+
+def invalidate_tag_index() -> None:
+    global _index
+    with _guard:
+        _index = None
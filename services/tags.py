@@ -1,13 +1,21 @@
 import os
 import re
-from typing import List, Set, Iterable
+from collections import Counter
+from typing import Dict, List, Set, Iterable, Optional, Tuple
 from utils.time import now_kst_iso
 from utils.hashtags import extract_hashtags
-from repo.csv_repo import read_csv, write_csv
+from repo.csv_repo import (
+    iter_csv, select_where, table_exists, table_version,
+    write_csv, write_csv_stream, update_csv, append_csv_absent, ConflictError,
+)
 
+POSTS = os.path.join("data", "posts.csv")
 HASHTAGS = os.path.join("data", "hashtags.csv")
 POST_TAGS = os.path.join("data", "post_hashtags.csv")
 
+# 재색인할 때 기존 매핑(수동 칩 태그 확인용)을 한 번에 들고 있는 게시물 수
+REINDEX_CHUNK = 20_000
+
 
 def _ensure_files():
     """
@@ -15,10 +23,59 @@ def _ensure_files():
     (헤더는 최초 프로젝트 세팅 때 만들었으니 여기선 내용만 보장)
     """
     for path in [HASHTAGS, POST_TAGS]:
-        if not os.path.exists(path):
+        if not table_exists(path):
             write_csv(path, [])
 
 
+def upsert_post_tags_batch(items: Iterable[Tuple[str, List[str], str]]) -> int:
+    """
+    여러 게시물의 태그를 한 번에 저장. items: (post_id, tags, seen_at)
+    - hashtags.csv: 한 번의 update_csv 로 first_seen_at/last_seen_at 갱신
+    - post_hashtags.csv: 새 (post_id, tag) 쌍만 한 번에 append (재작성 없음, 중복 확인도 같은 잠금 안에서)
+    반환: 새로 추가된 매핑 수
+    """
+    items = [(pid, list(tags), ts) for pid, tags, ts in items if tags]
+    if not items:
+        return 0
+    seen: Dict[str, Tuple[str, str]] = {}
+    for _, tags, ts in items:
+        for t in tags:
+            first, last = seen.get(t, (ts, ts))
+            seen[t] = (min(first, ts), max(last, ts))
+
+    def _touch(hashtags: List[dict]):
+        existing_tags: Set[str] = set()
+        for row in hashtags:
+            t = row["hashtag"]
+            existing_tags.add(t)
+            if t in seen:
+                row["last_seen_at"] = max(row.get("last_seen_at", ""), seen[t][1])
+        for t, (first, last) in seen.items():
+            if t not in existing_tags:
+                hashtags.append({"hashtag": t, "first_seen_at": first, "last_seen_at": last})
+        return hashtags
+
+    update_csv(HASHTAGS, _touch)
+
+    # 이미 있는 쌍인지 확인과 append 를 한 배타 잠금 안에서 (동시 작성자끼리 같은 쌍을 두 번 넣지 않게)
+    added = append_csv_absent(
+        POST_TAGS,
+        [{"post_id": pid, "hashtag": t} for pid, tags, _ in items for t in tags],
+        ["post_id", "hashtag"],
+    )
+    from services.tag_index import note_tag_usage  # 자동완성 인덱스는 쓸 때만 올린다(앱 시작 import 비용)
+    note_tag_usage(
+        {t: last for t, (_, last) in seen.items()},
+        Counter(r["hashtag"] for r in added),
+        wrote_pairs=bool(added),
+    )
+    return len(added)
+
+
+def _upsert_post_tags(post_id: str, tags: List[str]) -> None:
+    upsert_post_tags_batch([(post_id, tags, now_kst_iso())])
+
+
 # ----------------------------
 # [A] 본문에서 자동 추출해 저장
 # ----------------------------
@@ -34,42 +91,7 @@ def update_post_hashtags(post_id: str, content: str) -> List[str]:
     if not tags:
         return []
 
-    # load
-    hashtags = read_csv(HASHTAGS)
-    post_tags = read_csv(POST_TAGS)
-
-    now = now_kst_iso()
-    existing_tags: Set[str] = {row["hashtag"] for row in hashtags}
-    existing_pairs: Set[tuple] = {(row["post_id"], row["hashtag"]) for row in post_tags}
-
-    # upsert hashtags table
-    changed = False
-    for t in tags:
-        if t not in existing_tags:
-            hashtags.append({"hashtag": t, "first_seen_at": now, "last_seen_at": now})
-            existing_tags.add(t)
-            changed = True
-        else:
-            # update last_seen_at
-            for row in hashtags:
-                if row["hashtag"] == t:
-                    row["last_seen_at"] = now
-                    changed = True
-                    break
-    if changed:
-        write_csv(HASHTAGS, hashtags)
-
-    # upsert post_hashtags (no duplicates)
-    changed = False
-    for t in tags:
-        key = (post_id, t)
-        if key not in existing_pairs:
-            post_tags.append({"post_id": post_id, "hashtag": t})
-            existing_pairs.add(key)
-            changed = True
-    if changed:
-        write_csv(POST_TAGS, post_tags)
-
+    _upsert_post_tags(post_id, tags)
     return tags
 
 
@@ -77,7 +99,7 @@ def list_posts_by_hashtag(tag: str) -> List[str]:
     """해시태그로 post_id 목록을 반환 (정규화는 호출 측에서 했다고 가정하되, 여기서도 소문자화)"""
     _ensure_files()
     tag = (tag or "").lower()
-    return [row["post_id"] for row in read_csv(POST_TAGS) if row["hashtag"] == tag]
+    return select_where(POST_TAGS, "post_id", {"hashtag": tag})
 
 
 # ----------------------------
@@ -132,39 +154,128 @@ def add_hashtags(post_id: str, tags: Iterable[str]) -> List[str]:
     if not normed:
         return []
 
-    hashtags = read_csv(HASHTAGS)
-    post_tags = read_csv(POST_TAGS)
+    _upsert_post_tags(post_id, normed)
 
-    now = now_kst_iso()
-    existing_tags: Set[str] = {row["hashtag"] for row in hashtags}
-    existing_pairs: Set[tuple] = {(row["post_id"], row["hashtag"]) for row in post_tags}
+    return normed
 
-    # upsert hashtags table
-    changed_ht = False
-    for t in normed:
-        if t not in existing_tags:
-            hashtags.append({"hashtag": t, "first_seen_at": now, "last_seen_at": now})
-            existing_tags.add(t)
-            changed_ht = True
-        else:
-            # update last_seen_at
-            for row in hashtags:
-                if row["hashtag"] == t:
-                    row["last_seen_at"] = now
-                    changed_ht = True
-                    break
-    if changed_ht:
-        write_csv(HASHTAGS, hashtags)
-
-    # upsert post_hashtags
-    changed_pt = False
-    for t in normed:
-        key = (post_id, t)
-        if key not in existing_pairs:
-            post_tags.append({"post_id": post_id, "hashtag": t})
-            existing_pairs.add(key)
-            changed_pt = True
-    if changed_pt:
-        write_csv(POST_TAGS, post_tags)
-
-    return normed
\ No newline at end of file
+
+# ----------------------------
+# [C] 일괄 재색인
+# ----------------------------
+def _manual_tags(content: str, tags: List[str]) -> List[str]:
+    """
+    기존 매핑 중 수동(칩) 태그로 보이는 것: 현재 규칙으로 본문에서 추출되지 않고,
+    본문에 '#태그' 가 한 단어로 적혀 있지도 않은 태그('#abc' 가 있어도 칩 태그 'ab' 는 남는다).
+    본문에서 추출된 태그는 항상 '#...' 텍스트에서 나오므로, 추출 규칙이 바뀌어
+    더 이상 뽑히지 않는 옛 자동 태그는 여기서 걸러져 사라진다.
+    """
+    auto = set(extract_hashtags(content or ""))
+    low = (content or "").lower()
+    return [t for t in tags if t not in auto and not re.search(rf"(?<!\w)#{re.escape(t)}(?!\w)", low)]
+
+
+def _old_tags(post_ids: Set[str]) -> Dict[str, List[str]]:
+    """post_ids 글들의 기존 매핑 (post_hashtags 한 번 훑기)"""
+    old: Dict[str, List[str]] = {}
+    for row in iter_csv(POST_TAGS):
+        if row["post_id"] in post_ids:
+            old.setdefault(row["post_id"], []).append(row["hashtag"])
+    return old
+
+
+def _post_chunks(selected: Optional[Set[str]]) -> Iterable[List[dict]]:
+    """posts.csv 를 흘려 읽으며 (selected 안의) 게시물을 REINDEX_CHUNK 개씩 묶는다"""
+    chunk: List[dict] = []
+    for post in iter_csv(POSTS):
+        if selected is not None and post["post_id"] not in selected:
+            continue
+        chunk.append(post)
+        if len(chunk) >= REINDEX_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def reindex_hashtags(post_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    posts.csv 를 한 번 스트리밍하며 해시태그를 다시 추출하고(현재 utils.hashtags 규칙),
+    수동 칩 태그와 합쳐 hashtags.csv / post_hashtags.csv 를 각각 한 번만 다시 쓴다.
+    - post_ids 가 없으면 전체 재색인(게시물 테이블에 없는 글의 매핑은 버림)
+    - first_seen_at / last_seen_at 은 해당 태그가 달린 게시물의 created_at 최소/최대
+    메모리: 게시물은 REINDEX_CHUNK 개씩 흘려보내며 그 묶음의 기존 매핑만 post_hashtags 를 한 번 훑어 가져오고,
+    그 밖에는 태그별 통계만 유지한다.
+    반환: 처리 건수 요약
+    """
+    _ensure_files()
+    selected: Optional[Set[str]] = set(post_ids) if post_ids is not None else None
+
+    for _ in range(3):
+        tag_version = table_version(POST_TAGS)
+        stats = {"posts": 0, "mappings": 0}
+        seen: Dict[str, List[str]] = {}  # tag -> [first, last]
+        fresh: List[dict] = []            # 부분 재색인일 때 선택된 글의 새 매핑
+
+        def _new_rows():
+            for chunk in _post_chunks(selected):
+                old = _old_tags({post["post_id"] for post in chunk})
+                for post in chunk:
+                    pid = post["post_id"]
+                    content = post.get("content") or ""
+                    tags = list(dict.fromkeys(extract_hashtags(content) + _manual_tags(content, old.get(pid, []))))
+                    stats["posts"] += 1
+                    ts = post.get("created_at", "")
+                    for t in tags:
+                        span = seen.setdefault(t, [ts, ts])
+                        span[0], span[1] = min(span[0], ts), max(span[1], ts)
+                        stats["mappings"] += 1
+                        yield {"post_id": pid, "hashtag": t}
+
+        def _all_rows():
+            if selected is None:
+                yield from _new_rows()
+                return
+            fresh.extend(_new_rows())
+            for row in iter_csv(POST_TAGS):
+                if row["post_id"] not in selected:
+                    yield row
+            yield from fresh
+
+        try:
+            write_csv_stream(POST_TAGS, _all_rows(), ["post_id", "hashtag"], expected_version=tag_version)
+            break
+        except ConflictError:
+            continue
+    else:
+        raise ConflictError(f"{POST_TAGS}: reindex kept conflicting with writers")
+
+    def _merge(hashtags: List[dict]):
+        pending = dict(seen)
+        out = []
+        for row in hashtags:
+            span = pending.pop(row["hashtag"], None)
+            if span is None:
+                if selected is None:
+                    continue  # 전체 재색인: 더 이상 쓰이지 않는 태그 제거
+            elif selected is None:
+                row["first_seen_at"], row["last_seen_at"] = span
+            else:
+                row["first_seen_at"] = min(row.get("first_seen_at") or span[0], span[0])
+                row["last_seen_at"] = max(row.get("last_seen_at") or span[1], span[1])
+            out.append(row)
+        out.extend({"hashtag": t, "first_seen_at": f, "last_seen_at": l} for t, (f, l) in pending.items())
+        return out
+
+    update_csv(HASHTAGS, _merge)
+    from services.tag_index import invalidate_tag_index  # 자동완성 인덱스는 쓸 때만 올린다
+    invalidate_tag_index()
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="해시태그 일괄 재색인")
+    ap.add_argument("posts", nargs="*", help="재색인할 post_id (생략 시 전체)")
+    args = ap.parse_args()
+    print(reindex_hashtags(args.posts or None))
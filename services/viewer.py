@@ -0,0 +1,114 @@
+# services/viewer.py
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Set, MutableMapping, Optional
+
+from repo.csv_repo import read_csv_cached, select_where, table_version, adopt_own_writes
+from services.profile import get_profile
+from services.reaction_buffer import get_buffer
+
+POSTS = os.path.join("data", "posts.csv")
+REACTIONS = os.path.join("data", "reactions.csv")
+FOLLOWS = os.path.join("data", "follows.csv")
+USERS = os.path.join("data", "users.csv")
+
+SESSION_KEY = "viewer_ctx"
+
+
+@dataclass
+class ViewerContext:
+    """
+    로그인한 사용자(뷰어) 기준으로 자주 쓰는 사실들을 세션에 보관.
+    - following: 내가 팔로우하는 user_id
+    - liked: 내가 좋아요한 post_id
+    - profile: 내 users.csv 행 (display_name 등)
+    - own_post_ids: 내가 쓴 post_id
+    versions 는 각 부분을 읽었을 때의 테이블 세대 번호.
+    """
+    user_id: str
+    following: Set[str] = field(default_factory=set)
+    liked: Set[str] = field(default_factory=set)
+    profile: Dict[str, str] = field(default_factory=dict)
+    own_post_ids: Set[str] = field(default_factory=set)
+    versions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def display_name(self) -> str:
+        return self.profile.get("display_name") or self.profile.get("username") or self.user_id
+
+    @property
+    def username(self) -> str:
+        return self.profile.get("username") or self.user_id
+
+
+# 테이블 → 그 테이블로 채우는 부분 (버전이 바뀐 부분만 다시 읽는다)
+def _load_following(ctx: ViewerContext) -> None:
+    ctx.following = set(select_where(FOLLOWS, "followee_id", {"follower_id": ctx.user_id}))
+
+def _load_liked(ctx: ViewerContext) -> None:
+    # 아직 reactions.csv 에 반영되지 않은 내 토글(좋아요 쓰기 버퍼)까지 덮어쓴다
+    stored = set(select_where(REACTIONS, "post_id", {"user_id": ctx.user_id}))
+    ctx.liked = get_buffer().liked_posts(ctx.user_id, stored)
+
+def _load_profile(ctx: ViewerContext) -> None:
+    ctx.profile = get_profile(ctx.user_id) or {}
+
+def _load_own_posts(ctx: ViewerContext) -> None:
+    ctx.own_post_ids = {r["post_id"] for r in read_csv_cached(POSTS) if r.get("author_id") == ctx.user_id}
+
+_LOADERS = {
+    FOLLOWS: _load_following,
+    REACTIONS: _load_liked,
+    USERS: _load_profile,
+    POSTS: _load_own_posts,
+}
+
+
+def _revalidate(ctx: ViewerContext) -> None:
+    for path, load in _LOADERS.items():
+        v = table_version(path)
+        if ctx.versions.get(path) != v:
+            load(ctx)
+            ctx.versions[path] = v
+
+
+def get_viewer(session_state: MutableMapping, user_id: str) -> ViewerContext:
+    """
+    세션의 뷰어 컨텍스트를 돌려준다.
+    - 로그인 후 처음이거나 사용자가 바뀌었으면 새로 만든다
+    - 그 외에는 다른 사용자가 바꾼 테이블(세대 번호가 달라진 것)만 다시 읽는다
+    """
+    ctx: Optional[ViewerContext] = session_state.get(SESSION_KEY)
+    if ctx is None or ctx.user_id != user_id:
+        ctx = ViewerContext(user_id=user_id)
+        session_state[SESSION_KEY] = ctx
+    _revalidate(ctx)
+    return ctx
+
+
+def clear_viewer(session_state: MutableMapping) -> None:
+    session_state.pop(SESSION_KEY, None)
+
+
+# ----------------------------
+# 내 변경을 제자리에서 반영
+# ----------------------------
+def _advance(ctx: ViewerContext, path: str, writes: int = 1) -> None:
+    # 다른 사람의 쓰기가 끼어들었으면 버전을 그대로 두어 다음 get_viewer 에서 다시 읽는다
+    adopt_own_writes(ctx.versions, path, writes)
+
+def note_like(ctx: ViewerContext, post_id: str, liked: bool) -> None:
+    (ctx.liked.add if liked else ctx.liked.discard)(post_id)
+    _advance(ctx, REACTIONS)
+
+def note_follow(ctx: ViewerContext, followee_id: str, following: bool) -> None:
+    (ctx.following.add if following else ctx.following.discard)(followee_id)
+    _advance(ctx, FOLLOWS)
+
+def note_post_created(ctx: ViewerContext, post_id: str) -> None:
+    ctx.own_post_ids.add(post_id)
+    _advance(ctx, POSTS)
+
+def note_profile_updated(ctx: ViewerContext, **fields: str) -> None:
+    ctx.profile.update({k: v for k, v in fields.items() if v is not None})
+    _advance(ctx, USERS)
@@ -0,0 +1,4 @@
+def id_num(entity_id: str) -> int:
+    """'p_0012' → 12 (숫자 부분이 없으면 0). 자리수가 4자리를 넘어도 숫자 순서로 정렬할 때 사용"""
+    tail = (entity_id or "").rsplit("_", 1)[-1]
+    return int(tail) if tail.isdigit() else 0